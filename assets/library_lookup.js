@@ -51,15 +51,12 @@ function getListOfCopies(availability) {
   return '<ul>' + labels.map(lab => `<li>${lab}</li>`).join('') + '</ul>';
 }
 
-/* https://stackoverflow.com/q/1960473/1558022 */
-function onlyUnique(value, index, array) {
-  return array.indexOf(value) === index;
-}
-
 function getAvailabilityInfo(availability) {
-  const extraLocations =
+  const localLocations = new Set(availability.locallyAvailableLocations);
+
+  const extraLocations = Array.from(new Set(
     availability.availableLocations
-      .filter(av => availability.locallyAvailableLocations.indexOf(av) === -1)
+      .filter(av => !localLocations.has(av))
       .map(av => av.location)
       .map(location =>
         location.endsWith(' Community Library')
@@ -69,7 +66,7 @@ function getAvailabilityInfo(availability) {
           : location
       )
       .map(location => `<span class="location_name">${location}</span>`)
-      .filter(onlyUnique);
+  ));
 
   extraLocations.sort();
 
@@ -106,91 +103,124 @@ function getAvailabilityInfo(availability) {
   }
 }
 
-function renderBooks() {
-  const selectedBranches =
-    Array.from(document.querySelectorAll('#branch_picker input'))
-      .filter(input => input.checked)
-      .map(input => input.value);
-
-  // Store the list of selected branches in localStorage
-  window.localStorage.setItem("branchesSelected", JSON.stringify(selectedBranches));
+// Branches are stored as bitsets, with one bit for each branch.  We have
+// more than 32 branches, and JavaScript only does bitwise operations on
+// 32-bit integers, so a bitset is an array of 32-bit words: branch `i`
+// is bit `i % 32` of word `Math.floor(i / 32)`.
+//
+// This matches `get_branch_bitset` in render_data_as_html.py.
+function getBranchBitset(branchIndexes, wordCount) {
+  const words = new Array(wordCount).fill(0);
 
-  // Build a tally { bookId => how many available copies }
-  const bookAvailability = Object.fromEntries(
-    books
-      .map(function(book) {
-        const availableLocations = book.availability
-          .filter(av => av.status === 'Available');
+  for (const i of branchIndexes) {
+    words[Math.floor(i / 32)] |= 1 << (i % 32);
+  }
 
-        const locallyAvailableLocations = availableLocations
-          .filter(av => selectedBranches.includes(av.location));
+  return words;
+}
 
-        const locallyAvailableCopies = locallyAvailableLocations.length;
+function intersectBitsets(a, b) {
+  return a.map((word, i) => word & b[i]);
+}
 
-        const availableCopies = availableLocations
-          .filter(av => !selectedBranches.includes(av.location))
-          .length;
+function isEmptyBitset(words) {
+  return words.every(word => word === 0);
+}
 
-        return [book.record_details.BRN, { locallyAvailableCopies, locallyAvailableLocations, availableLocations, availableCopies } ];
-      })
-  );
+function hasBranch(words, i) {
+  return (words[Math.floor(i / 32)] & (1 << (i % 32))) !== 0;
+}
 
-  // Go through each book, and work out how many of its copies are
-  // available.  Store these in a list [<book>, count]
-  let updatedBooks = [];
-  for (book of document.querySelectorAll('#books .book')) {
-    const availability = bookAvailability[book.getAttribute('data-book-brn')];
+// The availability data, which is fetched after the page loads -- see
+// `get_client_book_data` in render_data_as_html.py.  This is null until
+// `setBookData` is called.
+let bookData = null;
+let booksByBrn = null;
+let branchIndexes = null;
 
-    if (availability.locallyAvailableCopies === 0) {
-      book.classList.add("no_local_copies");
-    } else {
-      book.classList.remove("no_local_copies");
-    }
+// The nearby branches we showed for each book the last time we rendered
+// it, so we can skip books that haven't changed.
+const renderedBranches = new Map();
 
-    const title = book.getAttribute('data-book-title');
-    const year = book.getAttribute('data-book-year');
+function setBookData(data) {
+  bookData = data;
+  booksByBrn = new Map(data.books.map(book => [book.brn, book]));
+  branchIndexes = new Map(data.branches.map((name, i) => [name, i]));
 
-    book.querySelector('.availability').innerHTML = getAvailabilityInfo(availability);
+  // Show how many books have a copy in each branch
+  for (const [name, i] of branchIndexes) {
+    const label = document.querySelector(`label[for="branch-${CSS.escape(name)}"]`);
 
-    for (tr of book.querySelectorAll('.availability tr')) {
-      if (availability.locallyAvailableLocations.includes(tr.getAttribute('data-av-location')) && tr.getAttribute('data-av-status') === 'Available') {
-        tr.classList.remove('unavailable');
-      } else {
-        tr.classList.add('unavailable');
-      }
+    if (label !== null) {
+      label.innerHTML += ` <span class="branch_count">(${data.branch_counts[i]})</span>`;
     }
-
-    updatedBooks.push({ book, title, year, locallyAvailableCopies: availability.locallyAvailableCopies });
   }
+}
 
-  // Sort the books so that any books with copies available float to the top,
-  // then sort by title alphabetically.
-  updatedBooks.sort(function(a, b) {
-    if (a.locallyAvailableCopies > 0 && b.locallyAvailableCopies === 0) {
-      return -1;
-    } else if (a.locallyAvailableCopies === 0 & b.locallyAvailableCopies > 0) {
-      return 1;
-    } else {
-      const sortTitleA = a.title.replace(/^The /, '').toLowerCase();
-      const sortTitleB = b.title.replace(/^The /, '').toLowerCase();
-
-      return sortTitleA > sortTitleB ? 1 : -1;
-    }
-  });
+function getBookAvailability(book, nearbyBranches) {
+  const locallyAvailableLocations =
+    book.copies.filter(c => hasBranch(nearbyBranches, c.branch));
 
-  let elements = document.createDocumentFragment();
-  for (book of updatedBooks) {
-    elements.appendChild(book.book.cloneNode(true));
-  }
+  const availableLocations =
+    book.copies.filter(c => !hasBranch(nearbyBranches, c.branch));
+
+  return {
+    locallyAvailableCopies: locallyAvailableLocations.length,
+    locallyAvailableLocations,
+    availableLocations,
+    availableCopies: availableLocations.length,
+  };
+}
 
-  document.querySelector('#books').innerHTML = null;
-  document.querySelector('#books').appendChild(elements);
+function renderBooks() {
+  const selectedBranches =
+    Array.from(document.querySelectorAll('#branch_picker input'))
+      .filter(input => input.checked)
+      .map(input => input.value);
+
+  // Store the list of selected branches in localStorage
+  window.localStorage.setItem("branchesSelected", JSON.stringify(selectedBranches));
 
   if (selectedBranches.length > 0) {
-document.querySelector('#selectedBranchCount').innerHTML = `(${selectedBranches.length} selected – ${selectedBranches.join("; ")})`
+    document.querySelector('#selectedBranchCount').innerHTML = `(${selectedBranches.length} selected – ${selectedBranches.join("; ")})`
   } else {
     document.querySelector('#selectedBranchCount').innerHTML = '';
   }
+
+  if (bookData === null) {
+    return;
+  }
+
+  const selectedBitset = getBranchBitset(
+    selectedBranches
+      .filter(name => branchIndexes.has(name))
+      .map(name => branchIndexes.get(name)),
+    Math.ceil(bookData.branches.length / 32)
+  );
+
+  // Go through each book, and work out which of its copies are nearby.
+  //
+  // Books with copies nearby float to the top, but we do that with the
+  // CSS `order` property rather than moving elements around.  The books
+  // are already sorted by title in the HTML.
+  for (const bookElem of document.querySelectorAll('#books .book')) {
+    const book = booksByBrn.get(bookElem.getAttribute('data-book-brn'));
+    const nearbyBranches = intersectBitsets(book.branches, selectedBitset);
+
+    const key = nearbyBranches.join(',');
+    if (renderedBranches.get(bookElem) === key) {
+      continue;
+    }
+    renderedBranches.set(bookElem, key);
+
+    const hasLocalCopies = !isEmptyBitset(nearbyBranches);
+
+    bookElem.classList.toggle("no_local_copies", !hasLocalCopies);
+    bookElem.style.order = hasLocalCopies ? 0 : 1;
+
+    bookElem.querySelector('.availability').innerHTML =
+      getAvailabilityInfo(getBookAvailability(book, nearbyBranches));
+  }
 }
 
 // Renders a date in the local timezone, including day of the week.
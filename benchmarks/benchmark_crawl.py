@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Crawl a local simulator of the library website with different numbers
+of workers, and see how fast the crawler goes.
+
+Run this from the root of the repo:
+
+    python3 benchmarks/benchmark_crawl.py --list-size 200 --latency 0.05
+
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from run_benchmarks import load_get_book_data
+from spydus_simulator import SpydusSimulator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--list-size", type=int, default=200)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="how long the simulator waits before each response (default: 0.05)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    get_book_data = load_get_book_data()
+
+    print(
+        f"{'workers':>7} {'time':>8} {'books/sec':>10} {'req/sec':>8} "
+        f"{'max in flight':>14} {'errors':>7}"
+    )
+
+    with SpydusSimulator(
+        list_size=args.list_size, latency=args.latency, error_rate=args.error_rate
+    ) as simulator:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                cwd = os.getcwd()
+                os.chdir(tmp_dir)
+
+                try:
+                    simulator.reset_stats()
+                    start = time.perf_counter()
+
+                    browser = get_book_data.LibraryBrowser(
+                        base_url=simulator.base_url,
+                        username="reader",
+                        password="password",
+                        workers=workers,
+                    )
+                    default_list = browser.get_default_list()
+
+                    # Don't print the warnings about fields with multiple entries
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        books = list(browser.get_books_in_list(default_list["url"]))
+
+                    elapsed = time.perf_counter() - start
+                    browser.fetcher.close()
+                finally:
+                    os.chdir(cwd)
+
+            assert len(books) == args.list_size
+
+            stats = simulator.stats()
+
+            print(
+                f"{workers:>7} {elapsed:>7.2f}s {len(books) / elapsed:>10.1f} "
+                f"{stats['requests_per_second']:>8.1f} "
+                f"{stats['max_concurrency']:>14} {stats['errors']:>7}"
+            )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure how many pages per second each parser backend can handle,
+with and without partial parsing.
+
+Run this from the root of the repo:
+
+    python3 benchmarks/benchmark_parsers.py
+
+"""
+
+import contextlib
+import io
+import os
+import time
+
+from library_lookup.parsers import (
+    AVAILABILITY_REGIONS,
+    RECORD_DETAILS_REGIONS,
+    get_available_backends,
+    make_soup,
+    parse_availability_info,
+    parse_record_details,
+)
+
+
+def read_fixture(name: str) -> bytes:
+    """
+    Read one of the HTML fixtures used in the tests.
+    """
+    with open(os.path.join("tests/fixtures", name), "rb") as in_file:
+        return in_file.read()
+
+
+def pages_per_second(
+    backend: str, html: bytes, *, kind: str, strained: bool, repeat: int
+) -> float:
+    """
+    Parse a page `repeat` times, and return the rate in pages per second.
+    """
+    if strained and kind == "record_details":
+        parse_only = RECORD_DETAILS_REGIONS
+    elif strained:
+        parse_only = AVAILABILITY_REGIONS
+    else:
+        parse_only = None
+
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        soup = make_soup(html, backend=backend, parse_only=parse_only)
+
+        if kind == "record_details":
+            # Don't print the warnings about fields with multiple entries
+            with contextlib.redirect_stdout(io.StringIO()):
+                parse_record_details(soup, url="/benchmark")
+        else:
+            parse_availability_info(soup)
+
+    return repeat / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    pages = [
+        ("availability.html", "availability"),
+        ("isbn_9780804692298.html", "record_details"),
+        ("isbn_9781847442260.html", "record_details"),
+    ]
+
+    print(f"{'page':<28} {'backend':<12} {'strained':<9} {'pages/sec':>10}")
+
+    for name, kind in pages:
+        html = read_fixture(name)
+
+        for backend in get_available_backends():
+            for strained in (False, True):
+                rate = pages_per_second(
+                    backend, html, kind=kind, strained=strained, repeat=200
+                )
+                print(f"{name:<28} {backend:<12} {strained!s:<9} {rate:>10.1f}")
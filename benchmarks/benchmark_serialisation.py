@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Measure how long it takes to write and read `books.json` with each
+JSON backend, in the pretty and compact formats.
+
+Run this from the root of the repo:
+
+    python3 benchmarks/benchmark_serialisation.py
+
+"""
+
+import os
+import tempfile
+import time
+
+from synthetic import make_books
+
+from library_lookup.serialisation import (
+    get_available_json_backends,
+    read_json,
+    write_json,
+)
+
+
+def round_trip_times(
+    data: object, *, path: str, backend: str, pretty: bool, repeat: int
+) -> tuple[float, float]:
+    """
+    Write and read a JSON file `repeat` times, and return the mean
+    time for each dump and load, in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        write_json(path, data, pretty=pretty, backend=backend)
+    dump_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        read_json(path, backend=backend)
+    load_time = (time.perf_counter() - start) / repeat
+
+    return dump_time, load_time
+
+
+if __name__ == "__main__":
+    print(
+        f"{'books':>6} {'backend':<8} {'format':<8} {'size':>9} {'dump':>9} {'load':>9}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "books.json")
+
+        for count in (100, 1000, 10000):
+            data = {"generated_at": "2024-07-02T09:00:00", "books": make_books(count)}
+
+            for backend in get_available_json_backends():
+                for pretty in (True, False):
+                    dump_time, load_time = round_trip_times(
+                        data,
+                        path=path,
+                        backend=backend,
+                        pretty=pretty,
+                        repeat=max(1, 1000 // count),
+                    )
+
+                    label = "pretty" if pretty else "compact"
+                    size = os.path.getsize(path) / 1024
+
+                    print(
+                        f"{count:>6} {backend:<8} {label:<8} "
+                        f"{size:>7.0f}KB "
+                        f"{dump_time * 1000:>7.1f}ms {load_time * 1000:>7.1f}ms"
+                    )
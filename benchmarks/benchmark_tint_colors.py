@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compare choosing tint colours in-process with running the external
+`dominant_colours` tool, which is what we used to do.
+
+This measures how many covers per second each approach can handle,
+and how closely the colours they choose agree.
+
+Run this from the root of the repo, after downloading some covers:
+
+    python3 benchmarks/benchmark_tint_colors.py
+
+If there's no `covers` folder, it uses some randomly generated images.
+If `dominant_colours` isn't installed, it only times the in-process
+version.
+"""
+
+from collections.abc import Callable
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from library_lookup.tint_colors import choose_tint_color_for_file, from_hex
+
+
+def choose_tint_color_with_subprocess(path: str) -> str:
+    """
+    Choose the tint colour for a file with the `dominant_colours` tool.
+    """
+    cmd = [
+        "dominant_colours",
+        "--no-palette",
+        "--max-colours=12",
+        path,
+        "--best-against-bg=#ffffff",
+    ]
+
+    return subprocess.check_output(cmd, text=True).strip()
+
+
+def create_sample_covers(directory: str, *, count: int) -> list[str]:
+    """
+    Create some cover-sized images made of a few blocks of colour,
+    and return their paths.
+    """
+    rng = np.random.default_rng(seed=0)
+    paths = []
+
+    for i in range(count):
+        background = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        im = Image.new("RGB", (300, 460), color=background)
+
+        for _ in range(4):
+            x, y = int(rng.integers(0, 300)), int(rng.integers(0, 460))
+            colour = tuple(int(c) for c in rng.integers(0, 256, size=3))
+            im.paste(colour, (x, y, x + 120, y + 160))
+
+        path = os.path.join(directory, f"{i}.jpg")
+        im.save(path)
+        paths.append(path)
+
+    return paths
+
+
+def covers_per_second(
+    paths: list[str], choose_colour: Callable[[str], str]
+) -> tuple[float, list[str]]:
+    """
+    Choose the colour for every cover, and return the rate in covers
+    per second, plus the colours.
+    """
+    start = time.perf_counter()
+    colours = [choose_colour(p) for p in paths]
+    elapsed = time.perf_counter() - start
+
+    return len(paths) / elapsed, colours
+
+
+def distance(hs1: str, hs2: str) -> float:
+    """
+    Return the Euclidean distance between two colours in RGB space.
+    """
+    return float(np.linalg.norm(np.subtract(from_hex(hs1), from_hex(hs2))))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if os.path.isdir("covers") and os.listdir("covers"):
+            paths = sorted(
+                os.path.join("covers", f)
+                for f in os.listdir("covers")
+                if not f.endswith((".tmp", ".json"))
+            )[:200]
+        else:
+            paths = create_sample_covers(tmp_dir, count=50)
+
+        print(f"Choosing tint colours for {len(paths)} covers")
+
+        rate, in_process_colours = covers_per_second(paths, choose_tint_color_for_file)
+        print(f"in-process:       {rate:>8.1f} covers/sec")
+
+        if shutil.which("dominant_colours") is None:
+            print("dominant_colours isn't installed; skipping the comparison")
+        else:
+            rate, subprocess_colours = covers_per_second(
+                paths, choose_tint_color_with_subprocess
+            )
+            print(f"dominant_colours: {rate:>8.1f} covers/sec")
+
+            distances = [
+                distance(c1, c2)
+                for c1, c2 in zip(in_process_colours, subprocess_colours)
+            ]
+
+            print(
+                f"colour agreement: {sum(d < 20 for d in distances)}/{len(distances)} "
+                "within an RGB distance of 20, "
+                f"mean distance {np.mean(distances):.1f}, "
+                f"max distance {max(distances):.1f}"
+            )
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Create an HTTP cache with a synthetic saved list, which the crawler
+can replay without touching the network.
+
+Run this from the root of the repo, then profile a crawl of it:
+
+    python3 benchmarks/make_replay_cache.py 1000 replay.sqlite
+    python3 get_book_data.py --replay replay.sqlite --profile profiles
+
+Because every response comes from the cache, each run does exactly
+the same work, so profiles can be compared between commits.
+"""
+
+import argparse
+
+import synthetic
+
+from library_lookup.http_cache import ResponseCache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("count", type=int, help="how many books are on the list")
+    parser.add_argument("path", help="where to save the cache")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+
+    for url, response in synthetic.make_site(args.count).items():
+        cache.put(url, response)
+
+    cache.close()
+
+    print(f"Saved {args.count} synthetic books to {args.path}")
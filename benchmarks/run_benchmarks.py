@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Time the parsers, the crawl and the render with 100, 1k and 10k
+synthetic books, and save the results as JSON.
+
+Run this from the root of the repo:
+
+    python3 benchmarks/run_benchmarks.py
+
+The results are saved to `benchmarks/results/<commit>.json`.  To see
+how they've changed since an earlier run, pass that file with
+`--compare`:
+
+    python3 benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json
+
+"""
+
+import argparse
+from collections.abc import Callable
+import contextlib
+import datetime
+import importlib.util
+import io
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, TypedDict
+
+from PIL import Image
+import synthetic
+
+from library_lookup.http_cache import ResponseCache
+from library_lookup.parsers import (
+    AVAILABILITY_REGIONS,
+    RECORD_DETAILS_REGIONS,
+    get_cover_image_url,
+    get_url_of_next_page,
+    make_soup,
+    parse_availability_info,
+    parse_record_details,
+)
+from library_lookup.serialisation import read_json, write_json
+
+
+class BenchmarkResult(TypedDict):
+    """
+    How long a benchmark took with a given number of books.
+    """
+
+    benchmark: str
+    size: int
+    seconds: float
+
+
+def time_it(fn: Callable[[], object]) -> float:
+    """
+    Call a function, and return how long it took in seconds.
+    """
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def benchmark_parsers(size: int) -> dict[str, float]:
+    """
+    Time how long each parser takes to parse `size` synthetic pages.
+    """
+    record_details_pages = [synthetic.make_record_details_page(i) for i in range(size)]
+    availability_pages = [synthetic.make_availability_page(i) for i in range(size)]
+    list_pages = [
+        synthetic.make_list_page(page=page, count=size)
+        for page in range((size + 19) // 20)
+    ]
+
+    def parse_all_record_details() -> None:
+        # Don't print the warnings about fields with multiple entries
+        with contextlib.redirect_stdout(io.StringIO()):
+            for html in record_details_pages:
+                soup = make_soup(html, parse_only=RECORD_DETAILS_REGIONS)
+                parse_record_details(soup, url="/benchmark")
+
+    def parse_all_availability() -> None:
+        for html in availability_pages:
+            soup = make_soup(html, parse_only=AVAILABILITY_REGIONS)
+            parse_availability_info(soup)
+
+    def parse_all_list_pages() -> None:
+        for html in list_pages:
+            soup = make_soup(html)
+            get_url_of_next_page(soup)
+
+            for img_elem in soup.find_all("img"):
+                get_cover_image_url(img_elem)
+
+    return {
+        "parse_record_details": time_it(parse_all_record_details),
+        "parse_availability_info": time_it(parse_all_availability),
+        "parse_list_pages": time_it(parse_all_list_pages),
+    }
+
+
+def load_get_book_data() -> Any:
+    """
+    Import `get_book_data.py`, which is a script rather than part of
+    the `library_lookup` package.
+    """
+    spec = importlib.util.spec_from_file_location("get_book_data", "get_book_data.py")
+    assert spec is not None and spec.loader is not None
+
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def benchmark_crawl(size: int, *, workers: int) -> dict[str, float]:
+    """
+    Time the `get_books_in_list` loop for a saved list of `size` books.
+
+    The crawl runs in offline mode, replaying responses from a cache
+    we fill with synthetic pages, so it doesn't touch the network.
+    """
+    get_book_data = load_get_book_data()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(os.path.join(tmp_dir, "cache.sqlite"))
+
+        for url, response in synthetic.make_site(size).items():
+            cache.put(url, response)
+
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+
+        try:
+            browser = get_book_data.LibraryBrowser(
+                base_url=synthetic.BASE_URL,
+                username="",
+                password="",
+                workers=workers,
+                cache=cache,
+                offline=True,
+            )
+
+            default_list = browser.get_default_list()
+
+            books: list[Any] = []
+
+            # Don't print the warnings about fields with multiple entries
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = time_it(
+                    lambda: books.extend(browser.get_books_in_list(default_list["url"]))
+                )
+        finally:
+            os.chdir(cwd)
+            cache.close()
+
+    assert len(books) == size
+
+    return {f"get_books_in_list (workers={workers})": elapsed}
+
+
+def benchmark_render(size: int) -> dict[str, float]:
+    """
+    Time `render_data_as_html.py` end-to-end with `size` books, first
+    with nothing cached and then again with the caches from the first run.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in ("templates", "assets"):
+            shutil.copytree(name, os.path.join(tmp_dir, name))
+        shutil.copy("render_data_as_html.py", tmp_dir)
+
+        books = synthetic.make_books(size)
+
+        write_json(
+            os.path.join(tmp_dir, "books.json"),
+            {"generated_at": "2024-07-02T09:00:00", "books": books},
+            pretty=True,
+        )
+
+        # Most covers are different files, but there are only a few
+        # distinct images -- this keeps the first render from being
+        # dominated by working out tint colours.
+        os.makedirs(os.path.join(tmp_dir, "covers"))
+
+        for i, book in enumerate(books):
+            Image.new("RGB", (60, 90), synthetic.COVER_COLOURS[i % 8]).save(
+                os.path.join(tmp_dir, book["image"]["path"])
+            )
+
+        def render() -> None:
+            subprocess.check_call(
+                [sys.executable, "render_data_as_html.py"],
+                cwd=tmp_dir,
+                stdout=subprocess.DEVNULL,
+            )
+
+        return {
+            "render_data_as_html (cold)": time_it(render),
+            "render_data_as_html (warm)": time_it(render),
+        }
+
+
+def get_commit() -> str:
+    """
+    Return the short hash of the current commit.
+    """
+    return subprocess.check_output(
+        ["git", "rev-parse", "--short", "HEAD"], text=True
+    ).strip()
+
+
+def print_results(
+    results: list[BenchmarkResult], *, previous: list[BenchmarkResult] | None
+) -> None:
+    """
+    Print a table of results, compared to a previous run if there is one.
+    """
+    previous_times = {
+        (r["benchmark"], r["size"]): r["seconds"] for r in (previous or [])
+    }
+
+    print(f"{'benchmark':<36} {'books':>6} {'time':>10} {'per book':>10} {'change':>8}")
+
+    for r in results:
+        per_book = r["seconds"] / r["size"]
+        line = (
+            f"{r['benchmark']:<36} {r['size']:>6} "
+            f"{r['seconds'] * 1000:>8.1f}ms {per_book * 1e6:>8.1f}µs"
+        )
+
+        try:
+            previous_seconds = previous_times[(r["benchmark"], r["size"])]
+        except KeyError:
+            pass
+        else:
+            line += f" {(r['seconds'] / previous_seconds - 1) * 100:>+7.1f}%"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="how many books to use (default: 100 1000 10000)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="how many requests the crawl has in flight at once (default: 8)",
+    )
+    parser.add_argument(
+        "--output",
+        help="where to save the results (default: benchmarks/results/<commit>.json)",
+    )
+    parser.add_argument(
+        "--compare", help="a results file from an earlier run to compare against"
+    )
+    args = parser.parse_args()
+
+    commit = get_commit()
+
+    results: list[BenchmarkResult] = []
+
+    for size in args.sizes:
+        timings = {
+            **benchmark_parsers(size),
+            **benchmark_crawl(size, workers=args.workers),
+            **benchmark_render(size),
+        }
+
+        for benchmark, seconds in timings.items():
+            results.append({"benchmark": benchmark, "size": size, "seconds": seconds})
+
+    previous = read_json(args.compare)["results"] if args.compare else None
+
+    print_results(results, previous=previous)
+
+    output = args.output or os.path.join("benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    write_json(
+        output,
+        {
+            "commit": commit,
+            "created_at": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        },
+        pretty=True,
+    )
+
+    print(f"Saved results to {output}")
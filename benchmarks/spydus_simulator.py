@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+A local stand-in for the library website, for load-testing the crawler.
+
+It serves the same flow as the real Spydus site: the homepage with the
+login form, the dashboard, my saved lists, the pages of my default list,
+and the record details, availability and cover image for each book.
+The pages are built from the fixtures in `tests/fixtures`; see
+`synthetic.py`.
+
+It can be made slow or unreliable, so we can see how the crawler copes:
+
+*   `latency` -- how long to wait before answering each request
+*   `error_rate` -- the fraction of requests for list pages, record
+    details and availability that get a 500 error
+*   `session_ttl` -- how long a login lasts, after which pages say
+    "Session must be logged in to display this page"
+*   `maintenance` -- serve the "We're down for maintenance" page
+
+It counts the requests it serves, and the most it had in flight at once.
+
+Run it from the root of the repo:
+
+    python3 benchmarks/spydus_simulator.py --list-size 500 --latency 0.05
+
+then point the crawler at it with:
+
+    python3 get_book_data.py --base-url http://127.0.0.1:8000 --no-cache
+
+"""
+
+import argparse
+import http.cookies
+import http.server
+import io
+import random
+import re
+import secrets
+import threading
+import time
+from typing import TypedDict
+import urllib.parse
+
+from PIL import Image
+import synthetic
+
+
+LOGIN_URL = "/cgi-bin/spydus.exe/PGM/WPAC/LOGIN"
+DASHBOARD_URL = "/cgi-bin/spydus.exe/PGM/WPAC/DASHBOARD"
+SAVED_LISTS_URL = "/cgi-bin/spydus.exe/PGM/WPAC/SAVEDLISTS"
+
+RECORD_RE = re.compile(r"^/cgi-bin/spydus\.exe/FULL/WPAC/ALLENQ/[0-9]+/([0-9]+),")
+AVAILABILITY_RE = re.compile(r"^/cgi-bin/spydus\.exe/XHLD/WPAC/ALLENQ/[0-9]+/([0-9]+)$")
+COVER_RE = re.compile(r"^/bds-images/l/[0-9]+/([0-9]+)\.jpg$")
+
+SESSION_EXPIRED_HTML = """
+<html>
+<head><title>Hertfordshire Libraries</title></head>
+<body><p>Session must be logged in to display this page</p></body>
+</html>
+"""
+
+MAINTENANCE_HTML = """
+<html>
+<head><title>We're down for maintenance</title></head>
+<body><p>We'll be back soon.</p></body>
+</html>
+"""
+
+
+class SimulatorStats(TypedDict):
+    """
+    The requests served by the simulator.
+    """
+
+    requests: int
+    errors: int
+    requests_by_kind: dict[str, int]
+    max_concurrency: int
+    elapsed: float
+    requests_per_second: float
+
+
+def make_cover(i: int) -> bytes:
+    """
+    Create a small JPEG to use as the i'th book's cover.
+    """
+    colour = synthetic.COVER_COLOURS[i % len(synthetic.COVER_COLOURS)]
+
+    out = io.BytesIO()
+    Image.new("RGB", (60, 90), colour).save(out, format="JPEG")
+
+    return out.getvalue()
+
+
+class SpydusSimulator:
+    """
+    A local HTTP server that behaves like the library website.
+
+    Use it as a context manager, which starts the server in
+    a background thread and stops it on exit.
+    """
+
+    def __init__(
+        self,
+        *,
+        list_size: int = 100,
+        page_size: int = 20,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        session_ttl: float | None = None,
+        maintenance: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ) -> None:
+        """
+        Create the server.  Use port 0 to pick any free port.
+        """
+        self.list_size = list_size
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.maintenance = maintenance
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Maps session token to when we logged in
+        self._sessions: dict[str, float] = {}
+
+        self._covers = [make_cover(i) for i in range(len(synthetic.COVER_COLOURS))]
+
+        self._in_flight = 0
+        self.reset_stats()
+
+        self.server = http.server.ThreadingHTTPServer((host, port), SimulatorHandler)
+        self.server.daemon_threads = True
+        setattr(self.server, "simulator", self)
+
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        The URL of the homepage.
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def __enter__(self) -> "SpydusSimulator":
+        """
+        Start serving requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """
+        Stop the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def reset_stats(self) -> None:
+        """
+        Forget about any requests we've served so far.
+        """
+        with self._lock:
+            self._requests_by_kind: dict[str, int] = {}
+            self._errors = 0
+            self._max_concurrency = 0
+            self._first_request: float | None = None
+            self._last_request: float | None = None
+
+    def stats(self) -> SimulatorStats:
+        """
+        Return the requests we've served since the stats were reset.
+        """
+        with self._lock:
+            requests = sum(self._requests_by_kind.values())
+
+            if self._first_request is None or self._last_request is None:
+                elapsed = 0.0
+            else:
+                elapsed = self._last_request - self._first_request
+
+            return {
+                "requests": requests,
+                "errors": self._errors,
+                "requests_by_kind": dict(self._requests_by_kind),
+                "max_concurrency": self._max_concurrency,
+                "elapsed": elapsed,
+                "requests_per_second": requests / elapsed if elapsed else 0.0,
+            }
+
+    def request_started(self, kind: str) -> None:
+        """
+        Record that a request has arrived.
+        """
+        with self._lock:
+            self._requests_by_kind[kind] = self._requests_by_kind.get(kind, 0) + 1
+            self._in_flight += 1
+            self._max_concurrency = max(self._max_concurrency, self._in_flight)
+
+            if self._first_request is None:
+                self._first_request = time.perf_counter()
+
+    def request_finished(self, *, is_error: bool) -> None:
+        """
+        Record that we've sent a response.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._last_request = time.perf_counter()
+
+            if is_error:
+                self._errors += 1
+
+    def should_fail(self) -> bool:
+        """
+        Decide whether to send an error for this request.
+        """
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def create_session(self) -> str:
+        """
+        Log in, and return a new session token.
+        """
+        token = secrets.token_hex(8)
+
+        with self._lock:
+            self._sessions[token] = time.monotonic()
+
+        return token
+
+    def is_logged_in(self, token: str | None) -> bool:
+        """
+        Return True if this session token is for a current login.
+        """
+        with self._lock:
+            logged_in_at = self._sessions.get(token or "")
+
+        if logged_in_at is None:
+            return False
+
+        return (
+            self.session_ttl is None
+            or time.monotonic() - logged_in_at < self.session_ttl
+        )
+
+    def get_cover(self, i: int) -> bytes:
+        """
+        Return the cover image for the i'th book.
+        """
+        return self._covers[i % len(self._covers)]
+
+
+def get_request_kind(path: str) -> str:
+    """
+    Classify a request, for the stats.
+    """
+    if path == "/":
+        return "homepage"
+    elif path == LOGIN_URL:
+        return "login"
+    elif path == DASHBOARD_URL:
+        return "dashboard"
+    elif path == SAVED_LISTS_URL:
+        return "saved_lists"
+    elif path.startswith("/cgi-bin/spydus.exe/SET/"):
+        return "list"
+    elif RECORD_RE.match(path):
+        return "record"
+    elif AVAILABILITY_RE.match(path):
+        return "availability"
+    elif path.startswith("/xmla/") or path.startswith("/bds-images/"):
+        return "cover"
+    else:
+        return "other"
+
+
+class SimulatorHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Handle a single request to the simulator.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # The headers and body are sent in separate writes, so without this
+    # every response waits ~40ms for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    @property
+    def simulator(self) -> SpydusSimulator:
+        """
+        The simulator this request is for.
+        """
+        simulator: SpydusSimulator = getattr(self.server, "simulator")
+        return simulator
+
+    def _get_session_token(self) -> str | None:
+        """
+        Return the session token sent by the client, if any.
+        """
+        cookie: http.cookies.SimpleCookie = http.cookies.SimpleCookie(
+            self.headers.get("Cookie", "")
+        )
+
+        try:
+            return cookie["SESSION"].value
+        except KeyError:
+            return None
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b"",
+        *,
+        content_type: str = "text/html; charset=utf-8",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Send a response.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_html(self, html: str, *, headers: dict[str, str] | None = None) -> None:
+        """
+        Send a successful response with an HTML body.
+        """
+        self._send(200, html.encode("utf8"), headers=headers)
+
+    def _handle(self, method: str) -> None:
+        """
+        Handle a request, and record it in the stats.
+        """
+        u = urllib.parse.urlsplit(self.path)
+        kind = get_request_kind(u.path)
+
+        self.simulator.request_started(kind)
+        is_error = False
+
+        try:
+            if self.simulator.latency:
+                time.sleep(self.simulator.latency)
+
+            if kind in {"list", "record", "availability"} and (
+                self.simulator.should_fail()
+            ):
+                is_error = True
+                self._send(500, b"Internal Server Error", content_type="text/plain")
+            else:
+                self._route(method, kind, path=u.path, query=u.query)
+        finally:
+            self.simulator.request_finished(is_error=is_error)
+
+    def _route(self, method: str, kind: str, *, path: str, query: str) -> None:
+        """
+        Send the right response for a request.
+        """
+        simulator = self.simulator
+
+        if simulator.maintenance and kind != "cover":
+            self._send_html(MAINTENANCE_HTML)
+            return
+
+        logged_in = simulator.is_logged_in(self._get_session_token())
+
+        if kind == "homepage":
+            self._send_html(homepage_html(logged_in=logged_in))
+        elif kind == "login" and method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            form = urllib.parse.parse_qs(self.rfile.read(length).decode("ascii"))
+
+            if not (form.get("BRWLID") and form.get("BRWLPWD")):
+                self._send_html(homepage_html(logged_in=False))
+                return
+
+            token = simulator.create_session()
+            self._send_html(
+                homepage_html(logged_in=True),
+                headers={"Set-Cookie": f"SESSION={token}; Path=/"},
+            )
+        elif kind == "cover":
+            self._send_cover(path=path, query=query)
+        elif kind == "other":
+            self._send(404, b"Not Found", content_type="text/plain")
+        elif not logged_in:
+            self._send_html(SESSION_EXPIRED_HTML)
+        elif kind == "dashboard":
+            self._send_html(
+                f'<html><body><a href="{SAVED_LISTS_URL}">View all saved lists</a>'
+                "</body></html>"
+            )
+        elif kind == "saved_lists":
+            self._send_html(synthetic.make_saved_lists_page(simulator.list_size))
+        elif kind == "list":
+            page = int(urllib.parse.parse_qs(query).get("PAGE", ["0"])[0])
+            self._send_html(
+                synthetic.make_list_page(
+                    page=page,
+                    count=simulator.list_size,
+                    page_size=simulator.page_size,
+                    cover_host=simulator.base_url,
+                )
+            )
+        elif kind == "record":
+            m = RECORD_RE.match(path)
+            assert m is not None
+            self._send_html(synthetic.make_record_details_page(int(m.group(1))))
+        else:
+            m = AVAILABILITY_RE.match(path)
+            assert m is not None
+            self._send_html(synthetic.make_availability_page(int(m.group(1))))
+
+    def _send_cover(self, *, path: str, query: str) -> None:
+        """
+        Send a cover image.
+
+        Like the real image service, this redirects to the image file.
+        """
+        if path.startswith("/xmla/"):
+            isbn = urllib.parse.parse_qs(query)["ISBN"][0]
+            self._send(
+                302,
+                content_type="text/plain",
+                headers={"Location": f"/bds-images/l/123456/{isbn}.jpg"},
+            )
+        else:
+            m = COVER_RE.match(path)
+            assert m is not None
+            self._send(
+                200,
+                self.simulator.get_cover(int(m.group(1))),
+                content_type="image/jpeg",
+            )
+
+    def do_GET(self) -> None:
+        """
+        Handle a GET request.
+        """
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        """
+        Handle a POST request, i.e. logging in.
+        """
+        self._handle("POST")
+
+    def log_message(self, *args: object) -> None:
+        """
+        Don't print a log line for every request.
+        """
+        pass
+
+
+def homepage_html(*, logged_in: bool) -> str:
+    """
+    Return the homepage, which has a link to the dashboard if we're
+    logged in, and the login form otherwise.
+    """
+    if logged_in:
+        body = f'<a href="{DASHBOARD_URL}">Dashboard</a>'
+    else:
+        body = f"""
+        <form id="frmLogin" method="post" action="{LOGIN_URL}">
+          <input type="text" name="BRWLID">
+          <input type="password" name="BRWLPWD">
+          <input type="submit" value="Log in">
+        </form>
+        """
+
+    return f"""
+    <html>
+    <head><title>Hertfordshire Libraries</title></head>
+    <body>{body}</body>
+    </html>
+    """
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--list-size",
+        type=int,
+        default=100,
+        help="how many books are on the saved list (default: 100)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="how long to wait before each response, in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="the fraction of catalogue requests that fail (default: 0)",
+    )
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        help="how long a login lasts, in seconds (default: forever)",
+    )
+    parser.add_argument(
+        "--maintenance",
+        action="store_true",
+        help="serve the maintenance page instead of the catalogue",
+    )
+    args = parser.parse_args()
+
+    simulator = SpydusSimulator(
+        list_size=args.list_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        session_ttl=args.session_ttl,
+        maintenance=args.maintenance,
+        port=args.port,
+    )
+
+    print(f"Serving the simulated library website at {simulator.base_url}")
+
+    with simulator:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+    stats = simulator.stats()
+
+    print(
+        f"\n{stats['requests']} requests ({stats['errors']} errors) "
+        f"in {stats['elapsed']:.1f}s, {stats['requests_per_second']:.1f} req/s, "
+        f"at most {stats['max_concurrency']} at once"
+    )
+
+    for kind, count in sorted(stats["requests_by_kind"].items()):
+        print(f"  {kind:<14} {count:>6}")
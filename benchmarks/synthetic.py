@@ -0,0 +1,267 @@
+"""
+Synthetic book data and Spydus pages for the benchmarks.
+
+The pages are based on the HTML fixtures in `tests/fixtures`, with
+the ISBNs, titles and record numbers changed so every book is different.
+"""
+
+import functools
+import os
+import random
+from typing import Any
+
+from library_lookup.fetch import Response
+
+
+BRANCHES = [
+    f"{name} Library (Hertfordshire Libraries)"
+    for name in (
+        "Ware",
+        "Radlett",
+        "Oakmere",
+        "Stevenage",
+        "Hertford",
+        "Letchworth",
+        "Hitchin",
+        "Watford",
+    )
+] + ["Luton Central Library"]
+
+
+# The server for cover images
+COVER_HOST = "https://www.bibdsl.co.uk"
+
+# A few colours for synthetic cover images
+COVER_COLOURS = [
+    (210, 60, 50),
+    (40, 90, 160),
+    (240, 200, 80),
+    (30, 30, 30),
+    (90, 160, 90),
+    (200, 120, 180),
+    (250, 250, 245),
+    (120, 80, 40),
+]
+
+
+BASE_URL = "https://herts.spydus.co.uk"
+
+# The URL of the page with my saved lists; see `LibraryBrowser`.
+SAVED_LISTS_URL = "/cgi-bin/spydus.exe/saved-lists"
+
+
+def get_isbn(i: int) -> str:
+    """
+    Return the ISBN of the i'th synthetic book.
+    """
+    return f"978{i:010d}"
+
+
+def make_books(count: int) -> list[dict[str, Any]]:
+    """
+    Create `count` books in the shape stored in `books.json`.
+    """
+    rng = random.Random(0)
+
+    return [
+        {
+            "title": f"Book number {i}",
+            "author": f"Author {i % 200}, A.",
+            "publication_year": str(1950 + i % 75),
+            "record_details": {
+                "Main title": f"Book number {i} / Author {i % 200}",
+                "Imprint": "London : Gollancz, 2022.",
+                "Collation": "320 pages ; 20 cm",
+                "ISBN": f"{get_isbn(i)} (pbk)",
+                "Summary": ["A summary of the book. " * 10],
+                "BRN": str(100000 + i),
+                "Bookmark link": f"{BASE_URL}/cgi-bin/spydus.exe/{i}",
+            },
+            "image": {
+                "url": f"{COVER_HOST}/xmla/image-service.asp?ISBN={i}",
+                "path": f"covers/{get_isbn(i)}.jpg",
+            },
+            "availability": [
+                {
+                    "location": rng.choice(BRANCHES),
+                    "collection": "Fiction",
+                    "status": rng.choice(["Available", "On loan"]),
+                    "call_number": "General fiction pbk",
+                }
+                for _ in range(rng.randint(1, 8))
+            ],
+            "fetched_at": "2024-07-02T09:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+@functools.cache
+def read_fixture(name: str) -> str:
+    """
+    Read one of the HTML fixtures used in the tests.
+    """
+    path = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", name)
+
+    with open(path, encoding="utf8") as in_file:
+        return in_file.read()
+
+
+def make_record_details_page(i: int) -> str:
+    """
+    Create the "Record details" page for the i'th synthetic book.
+    """
+    return (
+        read_fixture("isbn_9781847442260.html")
+        .replace("9781847442260", get_isbn(i))
+        .replace("3467997", str(100000 + i))
+        .replace("The first phone call from heaven", f"Book number {i}")
+    )
+
+
+def make_availability_page(i: int) -> str:
+    """
+    Create the availability popover for the i'th synthetic book.
+    """
+    return read_fixture("availability.html").replace(
+        "St Albans Library", BRANCHES[i % len(BRANCHES)]
+    )
+
+
+def make_fieldset(i: int, *, cover_host: str = COVER_HOST) -> str:
+    """
+    Create the <fieldset> for the i'th synthetic book on a saved list.
+    """
+    isbn = get_isbn(i)
+
+    return f"""
+    <fieldset class="card card-list">
+      <h2 class="card-title">
+        <a href="/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/1/{1000000 + i},{i}">
+          Book number {i}</a>
+      </h2>
+      <img alt="Thumbnail for Book number {i}"
+           class="imgsc img-fluid d-block mx-auto"
+           longdesc="{cover_host}/xmla/image-service.asp?ISBN={isbn}&amp;SIZE=s&amp;DBM=abc&amp;ERR=blank.gif&amp;SSL=true"
+           src="/docs/WPAC/images/loading.png"
+           title="Book number {i}"/>
+      <div class="card-text recdetails">
+        <span class="d-block">Author {i % 200}, A.</span>
+        <span class="d-block">{1950 + i % 75}</span>
+      </div>
+      <div class="card-text availability">
+        <a href="/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/1/{1000000 + i}">
+          View availability
+        </a>
+      </div>
+    </fieldset>
+    """
+
+
+def get_list_page_url(page: int) -> str:
+    """
+    Return the URL of a page of the saved list.
+    """
+    return f"/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/1/100?NREC=20&PAGE={page}"
+
+
+def make_list_page(
+    *, page: int, count: int, page_size: int = 20, cover_host: str = COVER_HOST
+) -> str:
+    """
+    Create a page of a saved list with `count` books in total.
+    """
+    start = page * page_size
+    end = min(start + page_size, count)
+
+    if end < count:
+        next_link = f'<a href="{get_list_page_url(page + 1)}">Next</a>'
+    else:
+        next_link = "Next"
+
+    fieldsets = "".join(
+        make_fieldset(i, cover_host=cover_host) for i in range(start, end)
+    )
+
+    return f"""
+    <html>
+    <body>
+      <div id="result-content-list">{fieldsets}</div>
+      <nav class="prvnxt result-pages-prvnxt">
+        <ul class="list-inline mb-0">
+          <li class="list-inline-item prv">Previous</li>
+          <li class="list-inline-item nxt">{next_link}</li>
+        </ul>
+      </nav>
+    </body>
+    </html>
+    """
+
+
+def make_saved_lists_page(count: int) -> str:
+    """
+    Create the page which lists my saved lists, with a default list
+    of `count` books.
+    """
+    return f"""
+    <table>
+      <tr>
+        <td data-caption="Name"><a href="{get_list_page_url(0)}">Default</a></td>
+        <td data-caption="Titles">{count}</td>
+      </tr>
+    </table>
+    """
+
+
+def _html_response(url: str, body: str) -> Response:
+    """
+    Create a successful response with an HTML body.
+    """
+    return {
+        "url": url,
+        "status": 200,
+        "headers": {"content-type": "text/html"},
+        "set_cookie": [],
+        "body": body.encode("utf8"),
+    }
+
+
+def make_site(count: int, *, page_size: int = 20) -> dict[str, Response]:
+    """
+    Create every response needed to crawl a saved list of `count` books,
+    indexed by URL.
+
+    Covers redirect to the blank image, so nothing is saved to disk.
+    """
+    responses = {
+        SAVED_LISTS_URL: _html_response(
+            BASE_URL + SAVED_LISTS_URL, make_saved_lists_page(count)
+        )
+    }
+
+    for page in range((count + page_size - 1) // page_size):
+        url = BASE_URL + get_list_page_url(page)
+        responses[url] = _html_response(
+            url, make_list_page(page=page, count=count, page_size=page_size)
+        )
+
+    for i in range(count):
+        url = f"{BASE_URL}/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/1/{1000000 + i},{i}"
+        responses[url] = _html_response(url, make_record_details_page(i))
+
+        url = f"{BASE_URL}/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/1/{1000000 + i}"
+        responses[url] = _html_response(url, make_availability_page(i))
+
+        url = (
+            f"{COVER_HOST}/xmla/image-service.asp"
+            f"?ISBN={get_isbn(i)}&SIZE=l&ERR=blank.gif&SSL=true"
+        )
+        responses[url] = {
+            "url": f"{COVER_HOST}/blank.gif",
+            "status": 200,
+            "headers": {"content-type": "image/gif"},
+            "set_cookie": [],
+            "body": b"GIF89a",
+        }
+
+    return responses
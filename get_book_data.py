@@ -3,27 +3,52 @@
 Crawl the library website to retrieve information about my saved books.
 """
 
-from collections.abc import Iterable
+import argparse
+import asyncio
+from collections.abc import Iterable, Mapping
 import datetime
-import functools
-import json
 import os
 import sys
-from typing import TypedDict
+from typing import cast, TypedDict
+import urllib.parse
 
 import bs4
 import certifi
 import mechanize
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 import tqdm
 
 from library_lookup import get_required_password
-from library_lookup.downloaders import download_cover_image, SavedImage
+from library_lookup.book_data import (
+    NdjsonBookWriter,
+    compact_ndjson,
+    iter_ndjson_books,
+)
+from library_lookup.checkpoint import CrawlCheckpoint
+from library_lookup.downloaders import CoverStore, SavedImage
+from library_lookup.fetch import AsyncFetcher, HTTPError, Response
+from library_lookup.http_cache import CachingFetcher, NotInCacheError, ResponseCache
+from library_lookup.incremental import PreviousCrawl
+from library_lookup.metrics import Metrics, get_request_kind
+from library_lookup.profiling import Profiler
+from library_lookup.serialisation import read_json
+from library_lookup.session import SessionFile, is_session_expired
+from library_lookup.store import BookStore
 from library_lookup.parsers import (
+    AVAILABILITY_REGIONS,
+    RECORD_DETAILS_REGIONS,
     AvailabilityInfo,
     RecordDetails,
     get_cover_image_url,
+    get_isbn_from_cover_image_url,
     get_url_of_next_page,
+    make_soup,
     parse_availability_info,
     parse_record_details,
 )
@@ -51,20 +76,257 @@ class FieldsetInfo(TypedDict):
     publication_year: str | None
     availability: list[AvailabilityInfo]
 
+    # When we fetched the record details
+    fetched_at: str
+
+
+class SessionExpiredError(Exception):
+    """
+    Thrown when a page says we need to log in, even after we've
+    logged in again.
+    """
+
+    def __init__(self, url: str) -> None:
+        """
+        Record the URL we couldn't see.
+        """
+        self.url = url
+        super().__init__(f"Session must be logged in to see {url}")
+
+
+def record_retry(retry_state: RetryCallState) -> None:
+    """
+    Count a retried request in the browser's metrics.
+    """
+    browser = retry_state.args[0]
+    browser.metrics.count("retries")
+
 
 class LibraryBrowser:
     """
     A headless browser that interacts with the library website.
+
+    We log in and find my saved list with mechanize, which knows how to
+    fill in forms and follow links.  Then we share its session cookies
+    with an `AsyncFetcher`, which does the crawl -- list pages, record
+    details and availability -- with lots of requests in flight.  When
+    the crawl is done, it downloads any covers we don't already have.
+
+    If there's a response cache, every response is saved to disk, and
+    in offline mode we replay responses from the cache without logging
+    in or making any network requests.
+
+    If there's a session file, we save my login there, and the next
+    browser skips straight to my saved lists.  If the session has
+    expired, we log in again and carry on.
     """
 
-    def __init__(self, *, base_url: str, username: str, password: str) -> None:
+    # We reach the page with my saved lists by clicking links, so we
+    # don't know its URL until we get there.  When we save it to the
+    # cache, we use this fixed URL so we can find it again offline.
+    SAVED_LISTS_CACHE_URL = "/cgi-bin/spydus.exe/saved-lists"
+
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        username: str,
+        password: str,
+        workers: int = 1,
+        previous_crawl: PreviousCrawl | None = None,
+        cache: ResponseCache | None = None,
+        offline: bool = False,
+        completed_books: Mapping[str, FieldsetInfo] | None = None,
+        metrics: Metrics | None = None,
+        session_file: SessionFile | None = None,
+    ) -> None:
         """
-        Set up the browser and log in with my credentials.
+        Set up the browser and log in with my credentials, unless
+        there's a saved session we can reuse.
+
+            :param workers: How many requests to have in flight at once.
+            :param previous_crawl: If set, reuse the record details and
+                cover images for books we've already seen.
+            :param cache: If set, save responses to this cache, and reuse
+                them while they're fresh.
+            :param offline: If True, replay every response from the cache.
+            :param completed_books: Books we've already fetched in full,
+                e.g. before a crawl was interrupted, indexed by ISBN.
+                These are returned as-is, without any requests.
+            :param metrics: If set, record how long each stage of the
+                crawl takes, and every request.
+            :param session_file: If set, reuse the login saved in this
+                file, and save the login there for next time.
+
         """
         self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.workers = workers
+        self.previous_crawl = previous_crawl
+        self.cache = cache
+        self.offline = offline
+        self.completed_books = completed_books or {}
+        self.covers = CoverStore()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.session_file = session_file
+
+        # How many times we've logged in, so we know if a page which
+        # says our session has expired was fetched before or after
+        # we last logged in.
+        self._logins = 0
+        self._default_list: DefaultList | None = None
+        self._saved_lists_url: str | None = None
+
+        if offline and cache is None:
+            raise ValueError("Cannot run offline without a response cache")
+
+        self.cookiejar = mechanize.CookieJar()
         self.browser = mechanize.Browser()
+        self.browser.set_cookiejar(self.cookiejar)
+
+        saved_session = None
+
+        if not offline and session_file is not None:
+            saved_session = session_file.load(base_url=base_url)
+
+        cookies = saved_session["cookies"] if saved_session is not None else {}
+        cookie_host = urllib.parse.urlsplit(base_url).netloc
+
+        self.fetcher: AsyncFetcher
+
+        if cache is None:
+            self.fetcher = AsyncFetcher(
+                cookie_host=cookie_host,
+                cookies=cookies,
+                max_connections=workers,
+                metrics=self.metrics,
+            )
+        else:
+            self.fetcher = CachingFetcher(
+                cache=cache,
+                offline=offline,
+                cookie_host=cookie_host,
+                cookies=cookies,
+                max_connections=workers,
+                metrics=self.metrics,
+            )
+
+        if saved_session is not None:
+            self._default_list = self._reuse_saved_session(
+                saved_session["saved_lists_url"]
+            )
+
+        if self._default_list is not None:
+            self.metrics.count("saved_session_reused")
+        elif not offline:
+            self._log_in()
+            self.fetcher.set_cookies(self._get_browser_cookies())
+            self.save_session()
+
+    def _log_in(self) -> None:
+        """
+        Log in to the library website, and find my default list.
+        """
+        with self.metrics.stage("login"):
+            self.cookiejar.clear()
+            self._configure_browser(username=self.username, password=self.password)
+
+        with self.metrics.stage("saved_lists"):
+            self._default_list = self._find_default_list()
+
+        self._logins += 1
+
+    def _reuse_saved_session(self, saved_lists_url: str) -> DefaultList | None:
+        """
+        Open my saved lists with the cookies from a saved session, and
+        return my default list -- or None if the session has expired.
+
+        This is one request rather than the five or more it takes to
+        log in, and it gets the current size of the list.
+        """
+        # Always ask the website, so we know if the session still works.
+        if self.cache is not None:
+            self.cache.delete(saved_lists_url)
+
+        with self.metrics.stage("saved_lists"):
+            try:
+                resp = self.fetcher.get_sync(saved_lists_url)
+            except HTTPError:
+                return None
+
+            if is_session_expired(resp["body"]):
+                return None
+
+            default_list = self._parse_saved_lists(resp["body"], url=resp["url"])
+
+        if default_list is not None:
+            self._saved_lists_url = resp["url"]
+            self._cache_saved_lists(resp["body"], url=resp["url"])
+
+        return default_list
+
+    def _get_browser_cookies(self) -> dict[str, str]:
+        """
+        Return the cookies set while we logged in.
+        """
+        return {cookie.name: cookie.value for cookie in self.cookiejar}
+
+    def save_session(self) -> None:
+        """
+        Save the current session cookies and the URL of my saved lists
+        to the session file, if there is one.
+        """
+        if self.session_file is None or self.offline:
+            return
+
+        assert self._saved_lists_url is not None
+
+        self.session_file.save(
+            base_url=self.base_url,
+            cookies=self.fetcher.get_cookies(),
+            saved_lists_url=self._saved_lists_url,
+        )
+
+    def _log_in_again(self, url: str, *, logins: int) -> str:
+        """
+        Log in again after a page said our session had expired, and
+        return the URL to retry.
+
+            :param url: The URL of the page which said our session
+                had expired.
+            :param logins: How many times we'd logged in when we
+                requested that page.  If we've logged in since then,
+                we don't need to do it again.
+
+        """
+        # Don't keep the page which said we need to log in in the cache,
+        # or we'd get it again when we retry.
+        if self.cache is not None:
+            self.cache.delete(url)
+
+        if logins != self._logins:
+            return url
+
+        print("Session has expired, logging in again", file=sys.stderr)
+        self.metrics.count("session_expired")
+
+        old_default_list = self._default_list
 
-        self._configure_browser(username=username, password=password)
+        self._log_in()
+        self.fetcher.set_cookies(self._get_browser_cookies())
+        self.save_session()
+
+        # The URL of my default list is tied to the session, so if that's
+        # the page we were trying to open, we need the new URL.
+        assert self._default_list is not None
+
+        if old_default_list is not None and url == urllib.parse.urljoin(
+            self.base_url, old_default_list["url"]
+        ):
+            return urllib.parse.urljoin(self.base_url, self._default_list["url"])
+        else:
+            return url
 
     def _configure_browser(self, *, username: str, password: str) -> None:
         """
@@ -99,7 +361,7 @@ class LibraryBrowser:
             # We can't fetch any book data, and we can't do anything else --
             # let the script stop gracefully rather than reporting an error
             # I can't do anything about.
-            soup = bs4.BeautifulSoup(homepage_html, "html.parser")
+            soup = make_soup(homepage_html)
             title = soup.find("title")
             assert title is not None
             if title.text == "We're down for maintenance":
@@ -115,24 +377,97 @@ class LibraryBrowser:
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=1, min=1, max=15),
+        retry=retry_if_not_exception_type(NotInCacheError),
+        before_sleep=record_retry,
     )
-    def _get_soup(self, url: str) -> bs4.BeautifulSoup:
+    async def _fetch_soup(
+        self,
+        url: str,
+        *,
+        parse_only: bs4.SoupStrainer | None = None,
+        required_id: str | None = None,
+    ) -> bs4.BeautifulSoup:
         """
-        Open a URL and parse the HTML with BeautifulSoup.
+        Fetch a URL and parse the HTML with BeautifulSoup.
+
+        If `parse_only` is set, only those parts of the page are parsed.
+
+        If `required_id` is set, the page should have an element with
+        this ID.  If it doesn't, we assume our session has expired and
+        we've been sent somewhere else, e.g. back to the homepage.
+
+        If the page says our session has expired, or it has the login
+        form, we log in again and retry the request.
         """
-        if url.startswith("/"):
-            resp = self.browser.open(self.base_url + url)
-        else:
-            resp = self.browser.open(url)
+        url = urllib.parse.urljoin(self.base_url, url)
+        logins = self._logins
+
+        resp = await self.fetcher.get(url)
+        soup = self._parse_response(resp, parse_only=parse_only)
+
+        if self._is_logged_out(resp, soup, required_id=required_id) and not (
+            self.offline
+        ):
+            url = self._log_in_again(url, logins=logins)
+            resp = await self.fetcher.get(url)
+            soup = self._parse_response(resp, parse_only=parse_only)
+
+        if self._is_logged_out(resp, soup, required_id=required_id):
+            raise SessionExpiredError(url)
 
-        return bs4.BeautifulSoup(resp, "html.parser")
+        return soup
+
+    def _parse_response(
+        self, resp: Response, *, parse_only: bs4.SoupStrainer | None
+    ) -> bs4.BeautifulSoup:
+        """
+        Parse the HTML in a response with BeautifulSoup.
+        """
+        with self.metrics.span(
+            f"parse:{get_request_kind(resp['url'])}", url=resp["url"]
+        ):
+            return make_soup(resp["body"], parse_only=parse_only)
+
+    def _is_logged_out(
+        self, resp: Response, soup: bs4.BeautifulSoup, *, required_id: str | None
+    ) -> bool:
+        """
+        Return True if we got this page because we're not logged in.
+        """
+        if is_session_expired(resp["body"]):
+            return True
+
+        return required_id is not None and soup.find(id=required_id) is None
+
+    def _get_list_page(self, url: str) -> bs4.BeautifulSoup:
+        """
+        Open a page of a list and parse the HTML with BeautifulSoup.
+
+        If the page doesn't have the list of books, we've probably been
+        sent back to the homepage because our session has expired.
+        """
+        return asyncio.run(self._fetch_soup(url, required_id="result-content-list"))
 
-    @functools.cache
     def get_default_list(self) -> DefaultList:
         """
         Return some basic info about my default list, including the
         URL and number of titles.
         """
+        if self.offline:
+            resp = self.fetcher.get_sync(self.SAVED_LISTS_CACHE_URL)
+            self._default_list = self._parse_saved_lists(resp["body"], url=resp["url"])
+
+        assert self._default_list is not None
+        return self._default_list
+
+    def _find_default_list(self) -> DefaultList:
+        """
+        Click through from the homepage to my saved lists, and find
+        my default list.
+
+        We remember the URL of my saved lists, so we can save it in the
+        session file and go straight there next time.
+        """
         # Go to the homepage
         self.browser.open(self.base_url)
 
@@ -142,19 +477,59 @@ class LibraryBrowser:
 
         # On the left-hand side is a list of links titled "My account".
         # One of the items is a link to my saved lists.  Click it.
-        resp = self.browser.follow_link(text="View all saved lists")
+        saved_lists_html = self.browser.follow_link(text="View all saved lists").read()
+        saved_lists_url = self.browser.geturl()
+
+        default_list = self._parse_saved_lists(saved_lists_html, url=saved_lists_url)
+        assert default_list is not None
+
+        self._saved_lists_url = saved_lists_url
+        self._cache_saved_lists(saved_lists_html, url=saved_lists_url)
+
+        return default_list
+
+    def _cache_saved_lists(self, saved_lists_html: bytes, *, url: str) -> None:
+        """
+        Save the page with my saved lists to the cache, if there is one,
+        so we can find it again offline.
+        """
+        if self.cache is not None:
+            self.cache.put(
+                self.SAVED_LISTS_CACHE_URL,
+                {
+                    "url": url,
+                    "status": 200,
+                    "headers": {},
+                    "set_cookie": [],
+                    "body": saved_lists_html,
+                },
+            )
 
+    def _parse_saved_lists(
+        self, saved_lists_html: bytes, *, url: str
+    ) -> DefaultList | None:
+        """
+        Find my default list on the page which lists my saved lists.
+
+        Returns None if this isn't the page with my saved lists, e.g.
+        because we were sent somewhere else.
+        """
         # Finally, a table which has my lists.  There's only one, which
         # is titled "Default".  Make a note of the URL and the title count.
-        soup = bs4.BeautifulSoup(resp, "html.parser")
+        soup = make_soup(saved_lists_html)
 
         titles_elem = soup.find("td", attrs={"data-caption": "Titles"})
-        assert titles_elem is not None
-        count = int(titles_elem.text)
+        default_link = soup.find("a", string="Default")
+
+        if titles_elem is None or not isinstance(default_link, bs4.Tag):
+            return None
 
-        url = self.browser.find_link(text="Default").absolute_url
+        count = int(titles_elem.text)
 
-        return {"count": count, "url": url}
+        return {
+            "count": count,
+            "url": urllib.parse.urljoin(url, default_link.attrs["href"]),
+        }
 
     def get_pages_in_list(self, url: str) -> Iterable[bs4.BeautifulSoup]:
         """
@@ -164,9 +539,16 @@ class LibraryBrowser:
             :param url: The first page of he list.
 
         """
-        while url is not None:
-            soup = self._get_soup(url)
+        yield from self._follow_next_links(self._get_list_page(url))
 
+    def _follow_next_links(
+        self, soup: bs4.BeautifulSoup
+    ) -> Iterable[bs4.BeautifulSoup]:
+        """
+        Generate a page of a list we've already fetched, then fetch
+        and generate each page after it in turn.
+        """
+        while True:
             yield soup
 
             url_of_next_page = get_url_of_next_page(soup)
@@ -174,39 +556,133 @@ class LibraryBrowser:
             if url_of_next_page is None:
                 break
 
-            url = url_of_next_page
+            soup = self._get_list_page(url_of_next_page)
+
+    def _open_page_from_checkpoint(self, url: str) -> bs4.BeautifulSoup | None:
+        """
+        Open the page of a list saved in a checkpoint, or return None
+        if the URL doesn't work any more.
+
+        The URL is tied to the session the checkpoint was saved in, so
+        if we've logged in since, we get a "Session must be logged in"
+        page or a redirect to the homepage.  We don't log in again or
+        retry -- we go back to the first page of the list instead.
+        """
+        url = urllib.parse.urljoin(self.base_url, url)
+
+        try:
+            resp = self.fetcher.get_sync(url)
+        except (HTTPError, NotInCacheError):
+            return None
+
+        soup = make_soup(resp["body"])
+
+        if soup.find("div", attrs={"id": "result-content-list"}) is None:
+            if self.cache is not None:
+                self.cache.delete(url)
+            return None
 
-    def get_books_in_list(self, url: str) -> Iterable[FieldsetInfo]:
+        return soup
+
+    def get_books_in_list(
+        self, url: str, *, checkpoint: CrawlCheckpoint | None = None
+    ) -> Iterable[FieldsetInfo]:
         """
         Generate a list of books in a list, which is all the books
         I've marked with a bookmark icon.
+
+        All the books on a page are fetched concurrently, but they're
+        still returned in the same order as they appear in the list.
+
+        If there's a checkpoint, we skip the pages it says we've already
+        done, and update it as we finish each page.  If we can, we go
+        straight to the next page; otherwise we have to follow the
+        "Next" links past the pages we've done.
         """
-        for soup in self.get_pages_in_list(url):
-            # The books on the page are stored in the following structure:
-            #
-            #     <div id="result-content-list" …>
-            #       <fieldset class="card card-list">
-            #         … info about book 1 …
-            #       </fieldset>
-            #       <fieldset class="card card-list">
-            #         … info about book 2 …
-            #       </fieldset>
-            #       …
-            #
-            result_content_list = soup.find("div", attrs={"id": "result-content-list"})
-            assert isinstance(result_content_list, bs4.Tag)
+        pages: Iterable[tuple[int, bs4.BeautifulSoup]] | None = None
+
+        if checkpoint is not None and checkpoint.next_page_url is not None:
+            resumed_page = self._open_page_from_checkpoint(checkpoint.next_page_url)
 
-            for fieldset in result_content_list.find_all("fieldset"):
-                try:
-                    yield self.parse_fieldset_info(fieldset)
-                except Exception:
-                    print(f"Unable to get info from {fieldset!r}", file=sys.stderr)
-                    raise
+            if resumed_page is not None:
+                pages = enumerate(
+                    self._follow_next_links(resumed_page),
+                    start=checkpoint.pages_completed,
+                )
 
-    def parse_fieldset_info(self, fieldset: bs4.Tag) -> FieldsetInfo:
+        if pages is None:
+            pages = enumerate(self.get_pages_in_list(url))
+
+        for page_index, soup in pages:
+            if checkpoint is not None and page_index < checkpoint.pages_completed:
+                continue
+
+            fieldsets = self._get_fieldsets_on_page(soup)
+
+            books = asyncio.run(self._get_all_fieldset_info(fieldsets))
+            yield from books
+
+            if checkpoint is not None:
+                next_page_url = get_url_of_next_page(soup)
+
+                checkpoint.complete_page(
+                    page_index,
+                    book_count=len(books),
+                    next_page_url=(
+                        urllib.parse.urljoin(self.base_url, next_page_url)
+                        if next_page_url is not None
+                        else None
+                    ),
+                )
+
+    async def _get_all_fieldset_info(
+        self, fieldsets: list[bs4.Tag]
+    ) -> list[FieldsetInfo]:
+        """
+        Get the metadata about a list of <fieldset> elements concurrently.
+        """
+        return await asyncio.gather(
+            *(self._get_fieldset_info(fieldset) for fieldset in fieldsets)
+        )
+
+    def _get_fieldsets_on_page(self, soup: bs4.BeautifulSoup) -> list[bs4.Tag]:
+        """
+        Return all the <fieldset> elements on a page of a saved list.
+        """
+        # The books on the page are stored in the following structure:
+        #
+        #     <div id="result-content-list" …>
+        #       <fieldset class="card card-list">
+        #         … info about book 1 …
+        #       </fieldset>
+        #       <fieldset class="card card-list">
+        #         … info about book 2 …
+        #       </fieldset>
+        #       …
+        #
+        result_content_list = soup.find("div", attrs={"id": "result-content-list"})
+        assert isinstance(result_content_list, bs4.Tag)
+
+        return list(result_content_list.find_all("fieldset"))
+
+    async def _get_fieldset_info(self, fieldset: bs4.Tag) -> FieldsetInfo:
+        """
+        Get all the metadata about a <fieldset>, and report which book
+        we were looking at if something goes wrong.
+        """
+        try:
+            return await self.parse_fieldset_info(fieldset)
+        except Exception:
+            print(f"Unable to get info from {fieldset!r}", file=sys.stderr)
+            raise
+
+    async def parse_fieldset_info(self, fieldset: bs4.Tag) -> FieldsetInfo:
         """
         Given a <fieldset> element from the list of books in a saved list,
         return all the metadata I want to extract.
+
+        The record details and availability are fetched at the same time.
+        The cover image isn't downloaded here; see `download_covers`.
         """
         title_elem = fieldset.find("h2", attrs={"class": "card-title"})
         assert isinstance(title_elem, bs4.Tag)
@@ -216,13 +692,14 @@ class LibraryBrowser:
         assert isinstance(anchor_elem, bs4.Tag)
         url = anchor_elem.attrs["href"]
 
-        record_details = self.get_record_details(url)
-
         img_elem = fieldset.find("img")
         assert isinstance(img_elem, bs4.Tag)
 
         image_url = get_cover_image_url(img_elem)
-        image = download_cover_image(image_url)
+        isbn = get_isbn_from_cover_image_url(image_url)
+
+        if isbn is not None and isbn in self.completed_books:
+            return self.completed_books[isbn]
 
         # The author and publication year are in a block like so:
         #
@@ -273,7 +750,7 @@ class LibraryBrowser:
         availability_elem = fieldset.find("div", attrs={"class": "availability"})
 
         if availability_elem is None:
-            availability = []
+            availability_url = None
         else:
             assert isinstance(availability_elem, bs4.Tag), availability_elem
 
@@ -281,9 +758,28 @@ class LibraryBrowser:
             assert isinstance(availability_link_elem, bs4.Tag)
             availability_url = availability_link_elem.attrs["href"]
 
-            soup = self._get_soup(availability_url)
+        # If we saw this book in a previous crawl, we can reuse the
+        # record details and cover image, and only fetch availability.
+        if self.previous_crawl is not None:
+            cached_book = self.previous_crawl.lookup(isbn)
+        else:
+            cached_book = None
 
-            availability = parse_availability_info(soup)
+        if cached_book is None:
+            record_details, availability = await asyncio.gather(
+                self._fetch_record_details(url),
+                self._fetch_availability(availability_url),
+            )
+            image = self.covers.find_existing(image_url) or {
+                "url": image_url,
+                "path": None,
+            }
+            fetched_at = datetime.datetime.now().isoformat()
+        else:
+            record_details = cached_book["record_details"]
+            image = cached_book["image"]
+            fetched_at = cached_book["fetched_at"]
+            availability = await self._fetch_availability(availability_url)
 
         return {
             "title": title,
@@ -292,8 +788,23 @@ class LibraryBrowser:
             "author": author,
             "publication_year": publication_year,
             "availability": availability,
+            "fetched_at": fetched_at,
         }
 
+    def download_covers(self, image_urls: Iterable[str]) -> dict[str, SavedImage]:
+        """
+        Download every cover we haven't already saved, and return the
+        saved covers indexed by URL.
+
+        We do this after the crawl, so the covers can be downloaded
+        together rather than one book at a time.
+        """
+        unique_urls = list(dict.fromkeys(image_urls))
+
+        images = asyncio.run(self.covers.sync(unique_urls, fetcher=self.fetcher))
+
+        return dict(zip(unique_urls, images))
+
     def get_record_details(self, url: str) -> RecordDetails:
         """
         Given the URL to a book's page in the current browser session,
@@ -307,38 +818,223 @@ class LibraryBrowser:
 
             Session must be logged in to display this page
 
-        even if you're already logged in!
+        even if you're already logged in!  If so, we log in again
+        and retry.
 
         I don't use much of this right now, but while I'm in this table it
         makes sense to grab it all and work out what to do with it later.
         """
-        soup = self._get_soup(url)
+        return asyncio.run(self._fetch_record_details(url))
+
+    async def _fetch_record_details(self, url: str) -> RecordDetails:
+        """
+        Fetch and parse the record details for a book.
+        """
+        soup = await self._fetch_soup(
+            url, parse_only=RECORD_DETAILS_REGIONS, required_id="tabRECDETAILS-body"
+        )
+
+        with self.metrics.span("extract:record", url=url):
+            return parse_record_details(soup, url=url)
+
+    async def _fetch_availability(
+        self, availability_url: str | None
+    ) -> list[AvailabilityInfo]:
+        """
+        Fetch and parse the availability popover for a book, if it has one.
+        """
+        if availability_url is None:
+            return []
+
+        soup = await self._fetch_soup(availability_url, parse_only=AVAILABILITY_REGIONS)
 
-        return parse_record_details(soup, url=url)
+        with self.metrics.span("extract:availability", url=availability_url):
+            return parse_availability_info(soup)
 
 
 if __name__ == "__main__":
-    try:
-        username = os.environ["LIBRARY_CARD_NUMBER"]
-        password = os.environ["LIBRARY_CARD_PASSWORD"]
-    except KeyError:
-        username = get_required_password("library", "username")
-        password = get_required_password("library", "password")
-
-    browser = LibraryBrowser(
-        base_url="https://herts.spydus.co.uk", username=username, password=password
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "--base-url",
+        default="https://herts.spydus.co.uk",
+        help="the library website to crawl (default: https://herts.spydus.co.uk)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="how many requests to have in flight at once (default: 1)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="reuse record details and covers from the previous books.json",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=int,
+        default=30,
+        help="in incremental mode, re-fetch books older than this many days "
+        "(default: 30)",
+    )
+    parser.add_argument(
+        "--cache",
+        default="http_cache.sqlite",
+        help="where to save HTTP responses (default: http_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't read or write the HTTP response cache",
+    )
+    parser.add_argument(
+        "--session",
+        default="library_session.json",
+        help="where to save my login, so the next crawl can skip logging in "
+        "(default: library_session.json)",
     )
+    parser.add_argument(
+        "--no-session",
+        action="store_true",
+        help="log in from scratch, and don't save the login",
+    )
+    parser.add_argument(
+        "--store",
+        help="also save the results to this SQLite database, which keeps "
+        "the availability from every crawl",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="replay every response from the HTTP cache, without "
+        "touching the library website",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="CACHE",
+        help="replay every response from this HTTP cache, e.g. one saved by an "
+        "earlier crawl or made by benchmarks/make_replay_cache.py; "
+        "the same as --offline --cache CACHE",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="save a JSON summary of how long each stage and request took",
+    )
+    parser.add_argument(
+        "--trace",
+        help="save a trace of every request and parse, which can be opened "
+        "in https://ui.perfetto.dev or chrome://tracing",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="profile each stage of the crawl, save the profiles in this "
+        "directory, and print the hottest functions",
+    )
+    args = parser.parse_args()
+
+    profiler = Profiler(args.profile) if args.profile is not None else None
+    metrics = Metrics(trace=args.trace is not None, profiler=profiler)
+
+    if args.replay is not None:
+        args.cache = args.replay
+        args.offline = True
 
-    default_list = browser.get_default_list()
+    if args.no_cache and args.offline:
+        parser.error("--offline needs the HTTP cache, so can't use --no-cache")
 
-    books = list(
-        tqdm.tqdm(
-            browser.get_books_in_list(url=default_list["url"]),
-            total=default_list["count"],
+    cache = None if args.no_cache else ResponseCache(args.cache)
+
+    previous_crawl: PreviousCrawl | None
+
+    if args.incremental:
+        previous_crawl = PreviousCrawl.from_file(
+            "books.json", max_age=datetime.timedelta(days=args.max_age)
         )
-    )
+    else:
+        previous_crawl = None
+
+    if args.offline:
+        username, password = "", ""
+    else:
+        try:
+            username = os.environ["LIBRARY_CARD_NUMBER"]
+            password = os.environ["LIBRARY_CARD_PASSWORD"]
+        except KeyError:
+            username = get_required_password("library", "username")
+            password = get_required_password("library", "password")
+
+    # Each book is written to books.ndjson as soon as we've fetched it.
+    # If a previous crawl was interrupted in the last day, this file will
+    # already exist, and we can skip the books it fetched.  If it's older
+    # than that, the availability data is stale and we start again.
+    with NdjsonBookWriter(
+        "books.ndjson",
+        generated_at=datetime.datetime.now().isoformat(),
+        max_age=datetime.timedelta(days=1),
+    ) as writer:
+        # The checkpoint records which pages of the list are already in
+        # books.ndjson, so it's only meaningful if we're resuming.
+        if not writer.is_resumed and os.path.exists("books.checkpoint.json"):
+            os.remove("books.checkpoint.json")
+
+        browser = LibraryBrowser(
+            base_url=args.base_url,
+            username=username,
+            password=password,
+            workers=args.workers,
+            previous_crawl=previous_crawl,
+            cache=cache,
+            offline=args.offline,
+            completed_books=cast(dict[str, FieldsetInfo], writer.completed_books),
+            metrics=metrics,
+            session_file=None if args.no_session else SessionFile(args.session),
+        )
+
+        default_list = browser.get_default_list()
+
+        checkpoint = CrawlCheckpoint(
+            "books.checkpoint.json", list_count=default_list["count"]
+        )
+
+        with metrics.stage("crawl"):
+            for book in tqdm.tqdm(
+                browser.get_books_in_list(
+                    url=default_list["url"], checkpoint=checkpoint
+                ),
+                initial=checkpoint.books_completed,
+                total=default_list["count"],
+            ):
+                writer.write(book)
+
+        # Save any cookies the website has updated during the crawl
+        browser.save_session()
+
+    # We only download covers once every book has been fetched, so
+    # they all go in one batch, and then save the paths in books.json.
+    with metrics.stage("covers"):
+        images = browser.download_covers(
+            book["image"]["url"] for book in iter_ndjson_books("books.ndjson")
+        )
+
+    with metrics.stage("compact"):
+        compact_ndjson("books.ndjson", "books.json", images=images)
+    os.remove("books.ndjson")
+    checkpoint.remove()
+
+    if args.store is not None:
+        with metrics.stage("store"):
+            store = BookStore(args.store)
+            store.add_crawl(read_json("books.json"))
+            store.close()
+
+    metrics.print_summary()
+
+    if profiler is not None:
+        profiler.print_summary()
 
-    data = {"generated_at": datetime.datetime.now().isoformat(), "books": books}
+    if args.metrics is not None:
+        metrics.write_summary(args.metrics)
 
-    with open("books.json", "w") as out_file:
-        out_file.write(json.dumps(data, indent=2, sort_keys=True))
+    if args.trace is not None:
+        metrics.write_trace(args.trace)
@@ -3,97 +3,169 @@
 Render the downloaded book data as an HTML page.
 """
 
+import argparse
 import datetime
-import json
 import os
-import shutil
 
-import jinja2
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from PIL import Image
-import titlecase
-
-from library_lookup.render_data_as_html import display_author_name
-from tint_colors import choose_tint_color_for_file, from_hex
-
-
-def rgba(hs: str, opacity: float) -> str:
-    """
-    Convert a hex colour to a CSS rgba colour.
-    """
-    r, g, b = from_hex(hs)
-    return f"rgba({r}, {g}, {b}, {opacity})"
+from library_lookup.book_data import compact_ndjson, load_book_data
+from library_lookup.cover_metadata import CoverMetadataIndex
+from library_lookup.metrics import Metrics
+from library_lookup.profiling import Profiler
+from library_lookup.render_data_as_html import (
+    create_jinja_environment,
+    get_client_book_data,
+    get_sort_title,
+    write_hashed_json,
+)
+from library_lookup.serialisation import write_json
+from library_lookup.site_build import IncrementalCopier
+from library_lookup.store import BookStore
+from library_lookup.tint_colors import TintColorCache
+from library_lookup.transform import transform_books
 
 
 if __name__ == "__main__":
-    book_data = json.load(open("books.json"))
-
-    for book in book_data["books"]:
-        for av in list(book["availability"]):
-            if av["location"].endswith(" (Hertfordshire Libraries)"):
-                av["location"] = av["location"].replace(
-                    " (Hertfordshire Libraries)", ""
-                )
-            else:
-                book["availability"].remove(av)
-
-    # Get a tally of all the branches in the Hertfordshire network
-    branches = set()
-    for book in book_data["books"]:
-        for av in book["availability"]:
-            if av["status"] == "Available":
-                branches.add(av["location"])
-
-    # Set up the Jinja environment
-    env = Environment(
-        loader=FileSystemLoader("templates"),
-        autoescape=select_autoescape(),
-        undefined=jinja2.StrictUndefined,
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "book_data",
+        nargs="?",
+        default="books.json",
+        help="the output of get_book_data.py: either books.json, or books.ndjson "
+        "from a crawl that's still running (default: books.json)",
+    )
+    parser.add_argument(
+        "--store",
+        help="render the latest crawl in this SQLite database, rather than a JSON file",
     )
+    parser.add_argument(
+        "--metrics",
+        help="save a JSON summary of how long each stage took",
+    )
+    parser.add_argument(
+        "--trace",
+        help="save a trace of every stage, which can be opened in "
+        "https://ui.perfetto.dev or chrome://tracing",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="profile each stage of the render, save the profiles in this "
+        "directory, and print the hottest functions",
+    )
+    args = parser.parse_args()
 
-    env.filters["author_name"] = display_author_name
-    env.filters["rgba"] = rgba
-    env.filters["titlecase"] = titlecase.titlecase
+    profiler = Profiler(args.profile) if args.profile is not None else None
+    metrics = Metrics(trace=args.trace is not None, profiler=profiler)
 
-    template = env.get_template("books_to_read.html")
+    with metrics.stage("load"):
+        if args.store is not None:
+            store = BookStore(args.store)
+            book_data = store.export()
+            store.close()
+        else:
+            book_data = load_book_data(args.book_data)
+
+    # Set up the Jinja environment.  Compiled templates are cached in
+    # `.jinja_cache`, so we only compile the template when it changes.
+    env = create_jinja_environment("templates", bytecode_cache_dir=".jinja_cache")
+
+    with metrics.stage("compile"):
+        template = env.get_template("books_to_read.html")
 
     os.makedirs("_html", exist_ok=True)
 
-    for b in book_data["books"]:
-        if b["image"]:
-            if b["image"]["path"] is not None:
-                b["tint_color"] = choose_tint_color_for_file(path=b["image"]["path"])
+    # Look up the size and tint colour of every cover up front, so we
+    # only open the covers which have changed since the last render.
+    with metrics.stage("cover_metadata"):
+        cover_metadata = CoverMetadataIndex(
+            "cover_metadata.json",
+            tint_colors=TintColorCache("colors.json", metrics=metrics),
+        )
 
-                im = Image.open(b["image"]["path"])
+        metadata_by_path = cover_metadata.get_metadata(
+            b["image"]["path"]
+            for b in book_data["books"]
+            if b["image"] and b["image"]["path"] is not None
+        )
 
-                b["image_width"] = im.width
-                b["image_height"] = im.height
+        cover_metadata.tint_colors.save()
+        cover_metadata.save()
 
-        if "pbk" in b["record_details"].get("ISBN", ""):
-            b["format"] = "paperback"
-        elif "hbk" in b["record_details"].get("ISBN", ""):
-            b["format"] = "hardback"
-        else:
-            b["format"] = None
+    # Remove copies outside the Hertfordshire network, work out the
+    # format of each book, and get a list of all the branches.
+    with metrics.stage("transform"):
+        transformed = transform_books(
+            book_data["books"], cover_metadata=metadata_by_path
+        )
+
+        books = transformed["books"]
+        branches = transformed["branches"]
+
+        # Render the books in title order.  The page moves books with copies
+        # nearby to the top, but otherwise keeps this order.
+        books.sort(key=lambda b: get_sort_title(b["title"]))
 
     # with open('book_data.json', 'x') as of:
     #     of.write(json.dumps(book_data, indent=2, sort_keys=True))
 
-    with open("_html/index.html", "w") as outfile:
-        outfile.write(
-            template.render(
-                books=book_data["books"],
-                branches=branches,
-                generated_at=datetime.datetime.fromisoformat(book_data["generated_at"]),
-            )
+    # The availability data used by `library_lookup.js` is fetched
+    # separately, so the page can be shown before it arrives.
+    with metrics.stage("client_data"):
+        client_data_name = write_hashed_json(
+            get_client_book_data(books, branches=branches),
+            directory="_html",
+            prefix="books",
+        )
+
+    with metrics.stage("render"):
+        html = template.render(
+            books=books,
+            client_data_url=client_data_name,
+            branches=branches,
+            generated_at=datetime.datetime.fromisoformat(book_data["generated_at"]),
         )
 
-    os.makedirs("_html/covers", exist_ok=True)
+    with metrics.stage("write"):
+        with open("_html/index.html", "w") as outfile:
+            outfile.write(html)
+
+    # Copy the covers and static assets into the site.  Anything which
+    # hasn't changed since the last build is skipped, and we delete
+    # covers for books which are no longer on the list.
+    with metrics.stage("copy"):
+        copier = IncrementalCopier()
+
+        os.makedirs("_html/covers", exist_ok=True)
+
+        cover_names = set()
+
+        for path in metadata_by_path:
+            name = os.path.basename(path)
+            copier.copy(path, os.path.join("_html/covers", name))
+            cover_names.add(name)
+
+        copier.prune("_html/covers", keep=cover_names)
+
+        copier.copy("assets/library_lookup.js", "_html/library_lookup.js")
+        copier.copy("assets/style.css", "_html/style.css")
+        copier.copy("assets/apple-touch-icon.png", "_html/apple-touch-icon.png")
+
+        if args.store is not None:
+            write_json("_html/books.json", book_data, pretty=True)
+        elif args.book_data.endswith(".ndjson"):
+            compact_ndjson(args.book_data, "_html/books.json")
+        else:
+            copier.copy(args.book_data, "_html/books.json")
+
+    print(f"Built _html: {copier.summary()}\n")
+
+    metrics.print_summary()
+
+    if profiler is not None:
+        profiler.print_summary()
 
-    for f in os.listdir("covers"):
-        shutil.copyfile(os.path.join("covers", f), os.path.join("_html/covers", f))
+    if args.metrics is not None:
+        metrics.write_summary(args.metrics)
 
-    shutil.copyfile("assets/library_lookup.js", "_html/library_lookup.js")
-    shutil.copyfile("assets/style.css", "_html/style.css")
-    shutil.copyfile("assets/apple-touch-icon.png", "_html/apple-touch-icon.png")
-    shutil.copyfile("books.json", "_html/books.json")
+    if args.trace is not None:
+        metrics.write_trace(args.trace)
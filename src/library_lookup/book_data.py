@@ -0,0 +1,259 @@
+"""
+Read and write the book data produced by a crawl.
+
+While we're crawling, each book is appended to an NDJSON file as soon
+as we've fetched it, so a crash doesn't throw away all the work so far.
+When the crawl finishes, the NDJSON file is compacted into `books.json`.
+
+The NDJSON file looks like:
+
+    {"generated_at": "2024-07-02T09:00:00"}
+    {"title": "Adulthood rites", …}
+    {"title": "A Cuban girl's guide to tea and tomorrow", …}
+
+The first line is a header which records when the crawl started;
+every other line is a book.
+"""
+
+from collections.abc import Iterator, Mapping
+import datetime
+import os
+from typing import Any, TypedDict
+
+from .downloaders import SavedImage
+from .parsers import get_isbn_from_cover_image_url
+from .serialisation import dumps, loads, read_json
+
+
+class BookData(TypedDict):
+    """
+    All the book data from a crawl, as stored in `books.json`.
+    """
+
+    generated_at: str
+    books: list[dict[str, Any]]
+
+
+def get_book_key(book: Mapping[str, Any]) -> str | None:
+    """
+    Return a key that identifies a book across crawls, if there is one.
+
+    This is the ISBN in the URL of the cover image, which is the one
+    stable identifier we can see on the saved list.  Some books don't
+    have an ISBN there, so we fall back to the BRN, the library's ID
+    for the book, from the record details.
+    """
+    isbn = get_isbn_from_cover_image_url(book["image"]["url"])
+    if isbn is not None:
+        return isbn
+
+    brn = book.get("record_details", {}).get("BRN")
+    if isinstance(brn, str):
+        return f"BRN:{brn}"
+
+    return None
+
+
+def read_ndjson_header(path: str) -> str:
+    """
+    Read the header of an NDJSON file, and return when the crawl started.
+    """
+    with open(path, "rb") as in_file:
+        header = loads(in_file.readline())
+
+    generated_at: str = header["generated_at"]
+    return generated_at
+
+
+def iter_ndjson_books(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Generate the books in an NDJSON file, one at a time.
+
+    If the crawl crashed halfway through writing a line, the last line
+    may be incomplete -- if so, it's skipped.
+    """
+    with open(path, "rb") as in_file:
+        in_file.readline()
+
+        for line in in_file:
+            try:
+                yield loads(line)
+            except ValueError:
+                pass
+
+
+def _to_line(obj: Mapping[str, Any]) -> str:
+    """
+    Serialise an object as a single line of NDJSON.
+    """
+    return dumps(obj).decode("utf8") + "\n"
+
+
+class NdjsonBookWriter:
+    """
+    Appends books to an NDJSON file, one line per book.
+
+    If the file already exists, e.g. from a crawl that crashed, we pick
+    up where it left off: the books already in the file are available as
+    `completed_books`, and won't be written a second time.
+
+    If the crawl that wrote the file started more than `max_age` ago,
+    its availability data is too old to reuse, so we start again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        generated_at: str,
+        max_age: datetime.timedelta | None = None,
+    ) -> None:
+        """
+        Open the NDJSON file, creating it if it doesn't exist.
+        """
+        self.path = path
+        self.completed_books: dict[str, dict[str, Any]] = {}
+
+        if os.path.exists(path) and max_age is not None:
+            started_at = datetime.datetime.fromisoformat(read_ndjson_header(path))
+
+            if datetime.datetime.fromisoformat(generated_at) - started_at > max_age:
+                os.remove(path)
+
+        # Whether we're picking up a crawl which was interrupted
+        self.is_resumed = os.path.exists(path)
+
+        if self.is_resumed:
+            self.generated_at = read_ndjson_header(path)
+            books = list(iter_ndjson_books(path))
+
+            for book in books:
+                key = get_book_key(book)
+                if key is not None:
+                    self.completed_books[key] = book
+        else:
+            self.generated_at = generated_at
+            books = []
+
+        # (Re)write the file before we start appending to it, so any
+        # incomplete line left by a crash is removed.
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf8") as out_file:
+            out_file.write(_to_line({"generated_at": self.generated_at}))
+            for book in books:
+                out_file.write(_to_line(book))
+
+        os.replace(tmp_path, path)
+
+        self._out_file = open(path, "a", encoding="utf8")
+
+    def __enter__(self) -> "NdjsonBookWriter":
+        """
+        Use the writer as a context manager.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """
+        Close the file when we leave the context manager.
+        """
+        self.close()
+
+    def write(self, book: Mapping[str, Any]) -> None:
+        """
+        Append a book to the file, unless it was already there when
+        we opened it.
+        """
+        key = get_book_key(book)
+
+        if key is not None and key in self.completed_books:
+            return
+
+        self._out_file.write(_to_line(book))
+        self._out_file.flush()
+
+    def close(self) -> None:
+        """
+        Close the underlying file.
+        """
+        self._out_file.close()
+
+
+def _iter_json_chunks(
+    generated_at: str, books: Iterator[dict[str, Any]]
+) -> Iterator[str]:
+    """
+    Generate the contents of `books.json` in chunks, one book at a time.
+
+    This gives exactly the same output as
+
+        dumps(data, pretty=True)
+
+    but without holding all the books in memory.
+    """
+    is_empty = True
+
+    for book in books:
+        yield '{\n  "books": [\n' if is_empty else ",\n"
+        is_empty = False
+
+        book_json = dumps(book, pretty=True).decode("utf8")
+        yield "    " + book_json.replace("\n", "\n    ")
+
+    if is_empty:
+        yield '{\n  "books": [],\n'
+    else:
+        yield "\n  ],\n"
+
+    yield f'  "generated_at": {dumps(generated_at).decode("utf8")}\n}}'
+
+
+def compact_ndjson(
+    ndjson_path: str,
+    json_path: str,
+    *,
+    images: Mapping[str, SavedImage] | None = None,
+) -> None:
+    """
+    Compact an NDJSON file into a JSON file like `books.json`.
+
+    If `images` is set, the image of each book is replaced with the
+    saved cover for its URL, e.g. after downloading the covers.
+
+    The JSON file is replaced atomically, so if something goes wrong,
+    the previous version is left untouched.
+    """
+    generated_at = read_ndjson_header(ndjson_path)
+    books = iter_ndjson_books(ndjson_path)
+
+    if images is not None:
+        books = (
+            {**book, "image": images.get(book["image"]["url"], book["image"])}
+            for book in books
+        )
+
+    tmp_path = json_path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf8") as out_file:
+        for chunk in _iter_json_chunks(generated_at, books):
+            out_file.write(chunk)
+
+    os.replace(tmp_path, json_path)
+
+
+def load_book_data(path: str) -> BookData:
+    """
+    Load the book data from a crawl.
+
+    This can be either a JSON file like `books.json`, or an NDJSON file
+    from a crawl which is in progress or was interrupted.
+    """
+    if path.endswith(".ndjson"):
+        return {
+            "generated_at": read_ndjson_header(path),
+            "books": list(iter_ndjson_books(path)),
+        }
+
+    data: BookData = read_json(path)
+    return data
@@ -0,0 +1,91 @@
+"""
+Record how far through my saved list a crawl has got, so an
+interrupted crawl can pick up where it left off.
+
+We save the index and the URL of the next page.  The Spydus URLs for
+the pages of a list are tied to the session, but we save the session
+between runs, so usually we can open the next page straight away.
+If the session has changed and the URL doesn't work any more, we
+follow the "Next" links from the first page until we get there --
+skipping straight past the books on the pages we've already done.
+
+This is only safe if the list hasn't changed in the meantime, so we
+also save the number of titles in the list, and throw away the
+checkpoint if it's different.
+"""
+
+import os
+from typing import TypedDict
+
+from .serialisation import read_json, write_json
+
+
+class CheckpointData(TypedDict):
+    """
+    The data saved in a checkpoint file.
+    """
+
+    list_count: int
+    pages_completed: int
+    books_completed: int
+    next_page_url: str | None
+
+
+class CrawlCheckpoint:
+    """
+    A checkpoint for a crawl of my saved list, stored in a JSON file.
+    """
+
+    def __init__(self, path: str, *, list_count: int) -> None:
+        """
+        Load the checkpoint, if there is one for a list of this size.
+        """
+        self.path = path
+        self.list_count = list_count
+        self.pages_completed = 0
+        self.books_completed = 0
+        self.next_page_url: str | None = None
+
+        try:
+            data: CheckpointData = read_json(path)
+        except FileNotFoundError:
+            return
+
+        if data["list_count"] == list_count:
+            self.pages_completed = data["pages_completed"]
+            self.books_completed = data["books_completed"]
+            self.next_page_url = data["next_page_url"]
+
+    def complete_page(
+        self, page_index: int, *, book_count: int, next_page_url: str | None = None
+    ) -> None:
+        """
+        Record that we've processed every book on a page, and where
+        to find the next page (if there is one).
+
+        The checkpoint file is replaced atomically, so it's never
+        left half-written.
+        """
+        assert page_index == self.pages_completed, (page_index, self.pages_completed)
+
+        self.pages_completed += 1
+        self.books_completed += book_count
+        self.next_page_url = next_page_url
+
+        data: CheckpointData = {
+            "list_count": self.list_count,
+            "pages_completed": self.pages_completed,
+            "books_completed": self.books_completed,
+            "next_page_url": self.next_page_url,
+        }
+
+        write_json(self.path, data)
+
+    def remove(self) -> None:
+        """
+        Delete the checkpoint, e.g. when the crawl is finished.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,127 @@
+"""
+Remember the size, format and tint colour of each cover image, so we
+don't have to open every cover each time we render the page.
+
+The index is saved as a JSON file, keyed by the path to the cover:
+
+    {
+      "covers/9780007548187.jpg": {
+        "mtime_ns": 1719910800000000000,
+        "size": 48213,
+        "width": 300,
+        "height": 460,
+        "format": "JPEG",
+        "tint_color": "#6a72a7"
+      },
+      …
+    }
+
+An entry is only used if the cover's mtime and size haven't changed
+since it was saved; otherwise we look at the cover again.
+"""
+
+from collections.abc import Iterable
+import os
+from typing import TypedDict
+
+from PIL import Image
+
+from .serialisation import read_json, write_json
+from .tint_colors import TintColorCache
+
+
+class CoverMetadata(TypedDict):
+    """
+    Information about a single cover image.
+    """
+
+    mtime_ns: int
+    size: int
+    width: int
+    height: int
+    format: str | None
+    tint_color: str
+
+
+class CoverMetadataIndex:
+    """
+    An index of cover metadata, saved in a JSON file.
+
+    The file is read once when the index is created, and only written
+    when you call `save()`.
+    """
+
+    def __init__(self, path: str, *, tint_colors: TintColorCache) -> None:
+        """
+        Load the saved index, if there is one.
+        """
+        self.path = path
+        self.tint_colors = tint_colors
+        self.is_modified = False
+
+        try:
+            self.entries: dict[str, CoverMetadata] = read_json(path)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def get_metadata(self, paths: Iterable[str]) -> dict[str, CoverMetadata]:
+        """
+        Return the metadata for every cover in a list.
+
+        Covers which are new or have changed since we last saw them
+        are opened to read their headers; everything else comes straight
+        from the index, without opening the image.
+        """
+        stats = {path: os.stat(path) for path in paths}
+
+        stale_paths = [
+            path
+            for path, stat in stats.items()
+            if path not in self.entries
+            or self.entries[path]["mtime_ns"] != stat.st_mtime_ns
+            or self.entries[path]["size"] != stat.st_size
+        ]
+
+        if stale_paths:
+            # Choose all the tint colours in one go, so any we don't
+            # already know can be chosen in parallel.
+            tint_colors = self.tint_colors.get_tint_colors(stale_paths)
+
+            for path in stale_paths:
+                # Opening an image only reads the header; the pixel data
+                # isn't decoded unless we ask for it.
+                with Image.open(path) as im:
+                    width, height = im.size
+                    image_format = im.format
+
+                self.entries[path] = {
+                    "mtime_ns": stats[path].st_mtime_ns,
+                    "size": stats[path].st_size,
+                    "width": width,
+                    "height": height,
+                    "format": image_format,
+                    "tint_color": tint_colors[path],
+                }
+
+            self.is_modified = True
+
+        return {path: self.entries[path] for path in stats}
+
+    def save(self) -> None:
+        """
+        Write the index back to the JSON file, if it's changed.
+
+        Entries for covers which have been deleted are dropped, and the
+        file is replaced atomically, so it's never left half-written.
+        """
+        for path in list(self.entries):
+            if not os.path.exists(path):
+                del self.entries[path]
+                self.is_modified = True
+
+        if not self.is_modified:
+            return
+
+        write_json(self.path, self.entries, pretty=True)
+
+        self.is_modified = False
@@ -1,14 +1,16 @@
 """
-Download a cover image from the library website.
+Download cover images from the library website.
 """
 
+import asyncio
+import datetime
 import os
-import ssl
 from typing import TypedDict
-import urllib.request
 import urllib.parse
 
-import certifi
+from .fetch import AsyncFetcher
+from .parsers import get_isbn_from_cover_image_url
+from .serialisation import read_json, write_json
 
 
 class SavedImage(TypedDict):
@@ -20,46 +22,163 @@ class SavedImage(TypedDict):
     path: str | None
 
 
-def download_cover_image(image_url: str) -> SavedImage:
+def get_cover_key(image_url: str) -> str:
     """
-    Download a cover image to a local folder, and return the path.
+    Return the key we use to remember a cover: the ISBN if there is
+    one, or the URL if there isn't.
     """
-    # We're going to save it to the 'covers' directory, which is gitignore'd.
-    # We don't know if the image is a PNG or a JPEG yet, so look for
-    # a file with a matching ISBN in the directory -- that's what we want.
-    os.makedirs("covers", exist_ok=True)
+    return get_isbn_from_cover_image_url(image_url) or image_url
 
-    try:
-        query = urllib.parse.urlsplit(image_url).query
-        isbn = urllib.parse.parse_qs(query).get("ISBN", [])[0]
 
-        existing_image = next(p for p in os.listdir("covers") if p.startswith(isbn))
-        return {"url": image_url, "path": os.path.join("covers", existing_image)}
-    except (IndexError, StopIteration):
-        pass
-
-    # TODO(2026-04-16): Use chives.fetch.download_image instead.
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-    req = urllib.request.Request(image_url)
-    req.add_header("User-Agent", "alexwlchan <alex@alexwlchan.net>")
-
-    with urllib.request.urlopen(req, context=ssl_context) as resp:
-        filename = os.path.basename(urllib.parse.urlsplit(resp.geturl()).path)
-        image_data = resp.read()
-        resp.close()
-
-    if filename == "blank.gif":
-        return {"url": image_url, "path": None}
+class CoverStore:
+    """
+    The cover images saved in a local folder, indexed by ISBN.
 
-    # Note: we assume the URl will be something like
-    #
-    #     http://www.bibdsl.co.uk/bds-images/l/123456/1234567890.jpg
-    #
-    # and use the final part as a basis for the filename.
-    out_path = os.path.join("covers", filename)
+    We only list the folder once, when the store is created, rather than
+    scanning it every time we look for a cover.
 
-    with open(out_path, "wb") as out_file:
-        out_file.write(image_data)
+    A lot of books don't have a cover, and the image service sends us
+    to a blank GIF instead.  We remember which covers were blank in
+    `blank_covers.json`, so we don't ask for them again on every run --
+    but we do check again after `blank_max_age`, in case somebody has
+    added a cover since.  The file is written once at the end of `sync`,
+    not after every blank cover.
+    """
 
-    return {"url": image_url, "path": out_path}
+    BLANK_COVERS_FILE = "blank_covers.json"
+
+    def __init__(
+        self,
+        directory: str = "covers",
+        *,
+        blank_max_age: datetime.timedelta = datetime.timedelta(days=30),
+    ) -> None:
+        """
+        Build an index of the covers that have already been saved.
+        """
+        # We're going to save covers to the 'covers' directory, which
+        # is gitignore'd.  We don't know if each image is a PNG or a JPEG
+        # until we download it, so we index them by the filename without
+        # the extension -- which is the ISBN.
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.paths_by_isbn: dict[str, str] = {}
+
+        for name in os.listdir(directory):
+            # Skip any half-written downloads; see `download`.
+            if name.endswith(".tmp") or name == self.BLANK_COVERS_FILE:
+                continue
+
+            isbn, _ = os.path.splitext(name)
+            self.paths_by_isbn[isbn] = os.path.join(directory, name)
+
+        # When we found each blank cover, indexed by `get_cover_key`.
+        self.blank_covers_path = os.path.join(directory, self.BLANK_COVERS_FILE)
+        self.blank_covers: dict[str, str] = {}
+
+        try:
+            blank_covers: dict[str, str] = read_json(self.blank_covers_path)
+        except (FileNotFoundError, ValueError):
+            blank_covers = {}
+
+        now = datetime.datetime.now()
+
+        for key, checked_at in blank_covers.items():
+            if now - datetime.datetime.fromisoformat(checked_at) <= blank_max_age:
+                self.blank_covers[key] = checked_at
+
+        self._has_new_blank_covers = False
+
+    def find_existing(self, image_url: str) -> SavedImage | None:
+        """
+        Return the saved copy of a cover image, if we've already got it.
+
+        If we already know the cover is blank, the path is None.
+        """
+        if get_cover_key(image_url) in self.blank_covers:
+            return {"url": image_url, "path": None}
+
+        isbn = get_isbn_from_cover_image_url(image_url)
+
+        if isbn is None or isbn not in self.paths_by_isbn:
+            return None
+
+        return {"url": image_url, "path": self.paths_by_isbn[isbn]}
+
+    async def download(self, image_url: str, *, fetcher: AsyncFetcher) -> SavedImage:
+        """
+        Download a cover image to the local folder, and return the path.
+
+        If we've already saved this cover, or we know it's blank, we
+        don't download it again.
+        """
+        existing_image = self.find_existing(image_url)
+        if existing_image is not None:
+            return existing_image
+
+        # TODO(2026-04-16): Use chives.fetch.download_image instead.
+        resp = await fetcher.get(image_url)
+
+        filename = os.path.basename(urllib.parse.urlsplit(resp["url"]).path)
+
+        if filename == "blank.gif":
+            self.blank_covers[get_cover_key(image_url)] = (
+                datetime.datetime.now().isoformat()
+            )
+            self._has_new_blank_covers = True
+            return {"url": image_url, "path": None}
+
+        # Note: we assume the URl will be something like
+        #
+        #     http://www.bibdsl.co.uk/bds-images/l/123456/1234567890.jpg
+        #
+        # and use the final part as a basis for the filename.
+        #
+        # We write to a temporary file first and then rename it, so if
+        # we're interrupted, we never leave a half-written image that
+        # looks like a saved cover.
+        out_path = os.path.join(self.directory, filename)
+        tmp_path = out_path + ".tmp"
+
+        with open(tmp_path, "wb") as out_file:
+            out_file.write(resp["body"])
+
+        os.replace(tmp_path, out_path)
+
+        isbn = get_isbn_from_cover_image_url(image_url)
+        if isbn is not None:
+            self.paths_by_isbn[isbn] = out_path
+
+        return {"url": image_url, "path": out_path}
+
+    async def sync(
+        self, image_urls: list[str], *, fetcher: AsyncFetcher
+    ) -> list[SavedImage]:
+        """
+        Make sure we have a saved copy of every cover in a list,
+        downloading any that are missing in parallel.
+
+        The saved images are returned in the same order as the URLs.
+
+        Any blank covers we found are saved at the end, even if some
+        of the downloads failed.
+        """
+        try:
+            return await asyncio.gather(
+                *(self.download(image_url, fetcher=fetcher) for image_url in image_urls)
+            )
+        finally:
+            self.save_blank_covers()
+
+    def save_blank_covers(self) -> None:
+        """
+        Save the blank covers to `blank_covers.json`, if we've found
+        any new ones since we last saved it.
+
+        `download` only records blank covers in memory, so we can write
+        the file once for a whole batch of covers.
+        """
+        if self._has_new_blank_covers:
+            write_json(self.blank_covers_path, self.blank_covers, pretty=True)
+            self._has_new_blank_covers = False
@@ -0,0 +1,317 @@
+"""
+An asyncio-based HTTP client for fetching lots of pages at once.
+
+The standard library doesn't have an async HTTP client, so this runs
+blocking `http.client` requests in a thread pool, and hands out
+kept-alive connections from a bounded pool.  That means we can have
+lots of requests in flight without opening a new TLS connection for
+every page and every cover image.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import http.client
+import http.cookies
+import ssl
+import threading
+from typing import TypedDict
+import urllib.parse
+
+import certifi
+
+from .metrics import Metrics, get_request_kind
+
+
+USER_AGENT = "alexwlchan <alex@alexwlchan.net>"
+
+# How long to wait for a server to accept a connection or send data,
+# in seconds.  Without a timeout, a single hung connection would hold
+# its slot in the pool forever, and stall the crawl.
+DEFAULT_TIMEOUT = 30.0
+
+
+class Response(TypedDict):
+    """
+    The response to an HTTP request.
+
+    The URL is the final URL, after following any redirects.  Header
+    names are lowercased; the `Set-Cookie` headers are kept separately
+    because there may be more than one of them.
+    """
+
+    url: str
+    status: int
+    headers: dict[str, str]
+    set_cookie: list[str]
+    body: bytes
+
+
+class HTTPError(Exception):
+    """
+    Thrown when a server returns an HTTP error, e.g. a 404 or a 500.
+    """
+
+    def __init__(self, response: Response) -> None:
+        """
+        Record the response which contained the error.
+        """
+        self.response = response
+        super().__init__(f"HTTP {response['status']} from {response['url']}")
+
+
+class ConnectionPool:
+    """
+    A pool of kept-alive HTTP connections, which can be shared
+    between threads.
+
+    At most `max_connections` requests will be in flight at once.
+    If a server doesn't respond within `timeout` seconds, the request
+    throws a `TimeoutError`.
+    """
+
+    def __init__(
+        self, *, max_connections: int, timeout: float = DEFAULT_TIMEOUT
+    ) -> None:
+        """
+        Create an empty pool.
+        """
+        self.timeout = timeout
+        self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self._idle: dict[tuple[str, str], collections.deque[http.client.HTTPConnection]]
+        self._idle = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+
+    def _get_connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """
+        Get a connection to the given host, reusing an idle connection
+        if there is one.
+        """
+        with self._lock:
+            try:
+                return self._idle[(scheme, netloc)].pop()
+            except IndexError:
+                pass
+
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                netloc, timeout=self.timeout, context=self._ssl_context
+            )
+        else:
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release_connection(
+        self, scheme: str, netloc: str, conn: http.client.HTTPConnection
+    ) -> None:
+        """
+        Return a connection to the pool, so it can be reused.
+        """
+        with self._lock:
+            self._idle[(scheme, netloc)].append(conn)
+
+    def request(
+        self, method: str, url: str, *, headers: dict[str, str], body: bytes | None
+    ) -> Response:
+        """
+        Make a single HTTP request, and read the whole response.
+
+        This doesn't follow redirects.
+        """
+        u = urllib.parse.urlsplit(url)
+        path = urllib.parse.urlunsplit(("", "", u.path or "/", u.query, ""))
+
+        with self._semaphore:
+            # If we pick up an idle connection, the server may have closed
+            # it since we last used it -- in which case, try again with
+            # a fresh connection.
+            for attempt in range(2):
+                conn = self._get_connection(u.scheme, u.netloc)
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    resp = conn.getresponse()
+                    resp_body = resp.read()
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    conn.close()
+                    if attempt == 1:
+                        raise
+                    continue
+                except Exception:
+                    conn.close()
+                    raise
+
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._release_connection(u.scheme, u.netloc, conn)
+
+                return {
+                    "url": url,
+                    "status": resp.status,
+                    "headers": {k.lower(): v for k, v in resp.getheaders()},
+                    "set_cookie": resp.msg.get_all("Set-Cookie") or [],
+                    "body": resp_body,
+                }
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def close(self) -> None:
+        """
+        Close all the idle connections in the pool.
+        """
+        with self._lock:
+            for connections in self._idle.values():
+                for conn in connections:
+                    conn.close()
+            self._idle.clear()
+
+
+class AsyncFetcher:
+    """
+    Fetch URLs concurrently with asyncio.
+
+    Cookies are only sent to `cookie_host`, so e.g. the session cookies
+    for the library website aren't sent to the cover image server.
+    Any cookies set by that host are remembered for later requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        cookie_host: str | None = None,
+        cookies: dict[str, str] | None = None,
+        max_connections: int = 8,
+        timeout: float = DEFAULT_TIMEOUT,
+        metrics: Metrics | None = None,
+    ) -> None:
+        """
+        Create a new fetcher.
+
+        If a server doesn't respond within `timeout` seconds, the request
+        throws a `TimeoutError`.  If `metrics` is set, the time and size
+        of every request is recorded there.
+        """
+        self.cookie_host = cookie_host
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.cookies = dict(cookies or {})
+        self.pool = ConnectionPool(max_connections=max_connections, timeout=timeout)
+        self._cookie_lock = threading.Lock()
+
+        # Requests run in our own thread pool, with a thread for every
+        # connection.  The default executor used by `asyncio.to_thread`
+        # only has a few threads on a machine with few CPUs, which would
+        # limit how many requests we can have in flight.
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="AsyncFetcher"
+        )
+
+    def __enter__(self) -> "AsyncFetcher":
+        """
+        Use the fetcher as a context manager.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """
+        Close all the connections when we leave the context manager.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close all the connections held by this fetcher.
+        """
+        self._executor.shutdown()
+        self.pool.close()
+
+    def _build_headers(self, url: str, extra_headers: dict[str, str]) -> dict[str, str]:
+        """
+        Build the headers to send with a request for this URL.
+        """
+        headers = {"User-Agent": USER_AGENT, **extra_headers}
+
+        if urllib.parse.urlsplit(url).netloc == self.cookie_host:
+            with self._cookie_lock:
+                if self.cookies:
+                    headers["Cookie"] = "; ".join(
+                        f"{name}={value}" for name, value in self.cookies.items()
+                    )
+
+        return headers
+
+    def set_cookies(self, cookies: dict[str, str]) -> None:
+        """
+        Replace all the cookies for the cookie host, e.g. after we've
+        logged in again.
+        """
+        with self._cookie_lock:
+            self.cookies = dict(cookies)
+
+    def get_cookies(self) -> dict[str, str]:
+        """
+        Return a copy of the cookies for the cookie host.
+        """
+        with self._cookie_lock:
+            return dict(self.cookies)
+
+    def _remember_cookies(self, resp: Response) -> None:
+        """
+        Store any cookies set by the cookie host.
+        """
+        if urllib.parse.urlsplit(resp["url"]).netloc != self.cookie_host:
+            return
+
+        for set_cookie in resp["set_cookie"]:
+            cookie: http.cookies.SimpleCookie = http.cookies.SimpleCookie()
+            cookie.load(set_cookie)
+
+            with self._cookie_lock:
+                for name, morsel in cookie.items():
+                    self.cookies[name] = morsel.value
+
+    def get_sync(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        max_redirects: int = 10,
+    ) -> Response:
+        """
+        Fetch a URL, following any redirects.
+
+        Throws an `HTTPError` if the final response is an error.
+        """
+        for _ in range(max_redirects + 1):
+            with self.metrics.span(f"request:{get_request_kind(url)}", url=url) as span:
+                resp = self.pool.request(
+                    "GET",
+                    url,
+                    headers=self._build_headers(url, headers or {}),
+                    body=None,
+                )
+                span.bytes = len(resp["body"])
+                span.args["status"] = resp["status"]
+
+            self._remember_cookies(resp)
+
+            if resp["status"] in {301, 302, 303, 307, 308}:
+                url = urllib.parse.urljoin(url, resp["headers"]["location"])
+                continue
+
+            if resp["status"] >= 400:
+                self.metrics.count("http_errors")
+                raise HTTPError(resp)
+
+            return resp
+
+        raise HTTPError(resp)
+
+    async def get(self, url: str) -> Response:
+        """
+        Fetch a URL, following any redirects.
+
+        The request runs in a worker thread, so lots of requests can be
+        in flight at once, e.g. with `asyncio.gather`.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_sync, url)
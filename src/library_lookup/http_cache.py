@@ -0,0 +1,269 @@
+"""
+An on-disk cache of HTTP responses from the library website.
+
+This means I can re-run the scraper after a failed run without
+re-fetching everything, and I can work on the parsers offline by
+replaying responses from the cache.
+"""
+
+import datetime
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, cast
+import urllib.parse
+
+from .fetch import AsyncFetcher, Response
+
+
+class NotInCacheError(Exception):
+    """
+    Thrown when we're offline, and a URL isn't in the cache.
+    """
+
+    def __init__(self, url: str) -> None:
+        """
+        Record the URL which couldn't be found.
+        """
+        self.url = url
+        super().__init__(f"Not in the cache: {url}")
+
+
+# Query parameters which are tied to the current session, and should
+# be ignored when deciding if two URLs are the same.
+#
+#     SETID  the ID of the current search session on Spydus
+#     DBM    a token in the URLs for cover images
+#
+SESSION_QUERY_PARAMS = {"SETID", "DBM"}
+
+
+# Spydus URLs have the session number in the path, and sometimes
+# the position of a record in the current search, e.g.
+#
+#     /cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142
+#                                          ^^^^^^          ^^^
+#                                          session         position
+#
+# Neither of these is the same across sessions, but the record ID
+# (70566229) is stable.
+SPYDUS_PATH_RE = re.compile(
+    r"^(?P<prefix>/cgi-bin/spydus\.exe/[^/]+/[^/]+/[^/]+)"
+    r"/[0-9]+"
+    r"(?P<suffix>/[^,]*)?"
+    r"(?:,[0-9]+)?$"
+)
+
+
+def normalise_url(url: str) -> str:
+    """
+    Normalise a URL for use as a cache key, removing any parts that
+    are tied to the current session.
+
+    See the tests for examples.
+    """
+    u = urllib.parse.urlsplit(url)
+
+    path = u.path
+
+    m = SPYDUS_PATH_RE.match(path)
+    if m is not None:
+        path = m.group("prefix") + (m.group("suffix") or "")
+
+    query = sorted(
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(u.query, keep_blank_values=True)
+        if key not in SESSION_QUERY_PARAMS
+    )
+
+    return urllib.parse.urlunsplit(
+        (
+            u.scheme.lower(),
+            u.netloc.lower(),
+            path,
+            urllib.parse.urlencode(query),
+            "",
+        )
+    )
+
+
+def get_ttl(url: str) -> datetime.timedelta:
+    """
+    Return how long a response for this URL is fresh.
+
+    Record details and covers hardly ever change, so we can keep them
+    for a long time; availability and my saved list change every day.
+    """
+    path = urllib.parse.urlsplit(url).path
+
+    if path.startswith("/cgi-bin/spydus.exe/FULL/"):
+        return datetime.timedelta(days=30)
+    elif path.startswith("/cgi-bin/spydus.exe/XHLD/"):
+        return datetime.timedelta(hours=1)
+    elif "image-service" in path or "bds-images" in path:
+        return datetime.timedelta(days=90)
+    else:
+        return datetime.timedelta(hours=1)
+
+
+class ResponseCache:
+    """
+    A cache of HTTP responses, stored in a SQLite database.
+
+    It can be shared between threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the cache, creating it if it doesn't exist already.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses(
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self) -> None:
+        """
+        Close the underlying database.
+        """
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url: str) -> tuple[Response, datetime.timedelta] | None:
+        """
+        Look up a URL in the cache.
+
+        Returns the cached response and its age, or None if the URL
+        isn't in the cache.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, body, stored_at FROM responses WHERE key = ?",
+                (normalise_url(url),),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        response_json, body, stored_at = row
+
+        response = cast(Response, {**json.loads(response_json), "body": body})
+        age = datetime.timedelta(seconds=time.time() - stored_at)
+
+        return response, age
+
+    def put(self, url: str, response: Response) -> None:
+        """
+        Store a response in the cache.
+        """
+        response_json = json.dumps(
+            {key: value for key, value in response.items() if key != "body"}
+        )
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (normalise_url(url), response_json, response["body"], time.time()),
+            )
+
+    def refresh(self, url: str) -> None:
+        """
+        Mark a cached response as fresh, e.g. when the server has told
+        us it hasn't changed.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ? WHERE key = ?",
+                (time.time(), normalise_url(url)),
+            )
+
+    def delete(self, url: str) -> None:
+        """
+        Remove a response from the cache, e.g. if we find it's an error
+        page which shouldn't have been saved.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key = ?", (normalise_url(url),)
+            )
+
+
+class CachingFetcher(AsyncFetcher):
+    """
+    A fetcher which stores responses in a `ResponseCache`.
+
+    Fresh responses are returned straight from the cache, without
+    waiting for a connection.  Stale responses are revalidated with
+    a conditional request, if the server gave us an ETag or
+    a Last-Modified date.
+
+    If `offline` is True, every response comes from the cache, however
+    old it is, and we never make a network request.
+    """
+
+    def __init__(
+        self, *, cache: ResponseCache, offline: bool = False, **kwargs: Any
+    ) -> None:
+        """
+        Create a new fetcher.
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.offline = offline
+
+    def get_sync(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        max_redirects: int = 10,
+    ) -> Response:
+        """
+        Fetch a URL, from the cache if possible.
+        """
+        cached = self.cache.get(url)
+
+        if cached is None and self.offline:
+            raise NotInCacheError(url)
+
+        conditional_headers = dict(headers or {})
+
+        if cached is not None:
+            cached_response, age = cached
+
+            if self.offline or age < get_ttl(url):
+                self.metrics.count("cache_hits")
+                return cached_response
+
+            etag = cached_response["headers"].get("etag")
+            if etag is not None:
+                conditional_headers["If-None-Match"] = etag
+
+            last_modified = cached_response["headers"].get("last-modified")
+            if last_modified is not None:
+                conditional_headers["If-Modified-Since"] = last_modified
+
+        resp = super().get_sync(
+            url, headers=conditional_headers, max_redirects=max_redirects
+        )
+
+        if cached is not None and resp["status"] == 304:
+            self.metrics.count("cache_revalidations")
+            self.cache.refresh(url)
+            return cached_response
+
+        self.cache.put(url, resp)
+        return resp
@@ -0,0 +1,133 @@
+"""
+Reuse data from a previous crawl, so we don't have to re-fetch
+information that hardly ever changes.
+
+The bibliographic data in the "Record details" table is basically
+static, and so are the cover images.  The only thing that changes from
+day to day is availability, so that's the only thing we need to fetch
+for a book we've seen before.
+"""
+
+import datetime
+import os
+import re
+from typing import Any, TypedDict
+
+from .downloaders import SavedImage
+from .parsers import RecordDetails, get_isbn_from_cover_image_url
+from .serialisation import read_json
+
+
+class CachedBook(TypedDict):
+    """
+    The parts of a book from a previous crawl that we can reuse.
+    """
+
+    record_details: RecordDetails
+    image: SavedImage
+    fetched_at: str
+
+
+def get_isbns(record_details: RecordDetails) -> list[str]:
+    """
+    Return all the ISBNs in a book's record details, without any
+    trailing descriptions, e.g. "9781847442260 (hbk)" becomes
+    "9781847442260".
+    """
+    isbn_field = record_details.get("ISBN", [])
+
+    if isinstance(isbn_field, str):
+        isbn_field = [isbn_field]
+
+    return [re.sub(r" \(.*\)$", "", isbn).strip() for isbn in isbn_field]
+
+
+class PreviousCrawl:
+    """
+    The books retrieved by a previous crawl, indexed so we can find
+    them again in the next crawl.
+
+    Books are looked up by ISBN, which is the one stable identifier
+    we can see on the saved list without opening the book's page.
+    """
+
+    def __init__(
+        self,
+        books: list[dict[str, Any]],
+        *,
+        generated_at: datetime.datetime,
+        max_age: datetime.timedelta,
+    ) -> None:
+        """
+        Build an index of books from a previous crawl.
+
+        Books are only reused if their record details were fetched less
+        than `max_age` ago.  Books from crawls before we recorded the
+        fetch time are treated as if they were fetched at `generated_at`.
+        """
+        self.max_age = max_age
+        self.books_by_key: dict[str, CachedBook] = {}
+
+        for book in books:
+            cached_book: CachedBook = {
+                "record_details": book["record_details"],
+                "image": book["image"],
+                "fetched_at": book.get("fetched_at", generated_at.isoformat()),
+            }
+
+            keys = get_isbns(book["record_details"])
+
+            image_isbn = get_isbn_from_cover_image_url(book["image"]["url"])
+            if image_isbn is not None:
+                keys.append(image_isbn)
+
+            bookmark_link = book["record_details"].get("Bookmark link")
+            if isinstance(bookmark_link, str):
+                keys.append(bookmark_link)
+
+            for key in keys:
+                self.books_by_key[key] = cached_book
+
+    @classmethod
+    def from_file(cls, path: str, *, max_age: datetime.timedelta) -> "PreviousCrawl":
+        """
+        Load a previous crawl from a JSON file like `books.json`.
+
+        If the file doesn't exist, this returns an empty crawl.
+        """
+        try:
+            data = read_json(path)
+        except FileNotFoundError:
+            return cls([], generated_at=datetime.datetime.now(), max_age=max_age)
+
+        return cls(
+            data["books"],
+            generated_at=datetime.datetime.fromisoformat(data["generated_at"]),
+            max_age=max_age,
+        )
+
+    def lookup(self, key: str | None) -> CachedBook | None:
+        """
+        Find a book from the previous crawl by its ISBN or bookmark link,
+        if it's there and hasn't expired.
+
+        We don't reuse a cover image if it's been deleted since
+        the last crawl.
+        """
+        if key is None:
+            return None
+
+        try:
+            cached_book = self.books_by_key[key]
+        except KeyError:
+            return None
+
+        fetched_at = datetime.datetime.fromisoformat(cached_book["fetched_at"])
+        if datetime.datetime.now() - fetched_at > self.max_age:
+            return None
+
+        image_path = cached_book["image"]["path"]
+        if image_path is not None and not os.path.exists(image_path):
+            return None
+
+        return cached_book
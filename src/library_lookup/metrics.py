@@ -0,0 +1,313 @@
+"""
+Record how long each part of a crawl or a render takes.
+
+Wrap each piece of work in a span:
+
+    metrics = Metrics()
+
+    with metrics.span("request:record") as span:
+        resp = fetch(url)
+        span.bytes = len(resp["body"])
+
+At the end of the run, `summary()` gives the count, total time,
+percentiles and a histogram of durations for each kind of span, which
+we can print or save as JSON.
+
+If `trace` is True, we also keep every individual span, and
+`write_trace` saves them in the Chrome trace event format.  You can open
+that in https://ui.perfetto.dev or chrome://tracing to see a timeline
+of the run, with one row per thread.
+
+The top-level stages of a run, e.g. logging in or rendering the
+template, use `stage` rather than `span`.  If there's a `Profiler`,
+they're profiled as well as timed.
+"""
+
+import bisect
+from collections.abc import Iterator
+import contextlib
+import os
+import threading
+import time
+from typing import Any, TypedDict
+import urllib.parse
+
+from .profiling import Profiler
+from .serialisation import write_json
+
+
+# The upper bounds of the histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class SpanStats(TypedDict):
+    """
+    Statistics about all the spans with the same name.
+
+    Times are in seconds.  The histogram maps bucket labels, e.g.
+    "<50ms", to the number of spans that took that long.
+    """
+
+    count: int
+    total: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    bytes: int
+    histogram: dict[str, int]
+
+
+class MetricsSummary(TypedDict):
+    """
+    A summary of everything recorded in a run.
+    """
+
+    elapsed: float
+    spans: dict[str, SpanStats]
+    counters: dict[str, int]
+
+
+class Span:
+    """
+    A single piece of work, e.g. a request or parsing a page.
+
+    Set `bytes` to record how much data it handled, e.g. the size of
+    a response, and add anything else to `args` to see it in the trace.
+    """
+
+    __slots__ = ("name", "start", "bytes", "args")
+
+    def __init__(self, name: str, start: float, args: dict[str, Any]) -> None:
+        """
+        Start a new span.
+        """
+        self.name = name
+        self.start = start
+        self.bytes = 0
+        self.args = args
+
+
+def get_request_kind(url: str) -> str:
+    """
+    Classify a request to the library website, e.g. "record" for the
+    record details or "cover" for a cover image.
+    """
+    path = urllib.parse.urlsplit(url).path
+
+    if path.startswith("/cgi-bin/spydus.exe/FULL/"):
+        return "record"
+    elif path.startswith("/cgi-bin/spydus.exe/XHLD/"):
+        return "availability"
+    elif path.startswith("/cgi-bin/spydus.exe/SET/"):
+        return "list"
+    elif "image-service" in path or "bds-images" in path:
+        return "cover"
+    else:
+        return "other"
+
+
+def get_percentile(sorted_values: list[float], percentile: float) -> float:
+    """
+    Return a percentile of a sorted, non-empty list of values.
+    """
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))
+    return sorted_values[index]
+
+
+def get_histogram(durations: list[float]) -> dict[str, int]:
+    """
+    Count how many durations fall into each histogram bucket.
+    """
+    labels = [f"<{ms}ms" for ms in HISTOGRAM_BUCKETS] + [f">={HISTOGRAM_BUCKETS[-1]}ms"]
+    counts = [0] * len(labels)
+
+    for d in durations:
+        counts[bisect.bisect_right(HISTOGRAM_BUCKETS, d * 1000)] += 1
+
+    return {label: count for label, count in zip(labels, counts) if count}
+
+
+class Metrics:
+    """
+    Timings and counters for a single run.
+
+    It can be shared between threads.
+    """
+
+    def __init__(
+        self, *, trace: bool = False, profiler: Profiler | None = None
+    ) -> None:
+        """
+        Start recording.  If `trace` is True, keep every span so we can
+        write a trace file; otherwise only keep their durations.
+
+        If there's a profiler, every stage is profiled.
+        """
+        self.trace = trace
+        self.profiler = profiler
+        self.started_at = time.perf_counter()
+
+        self._lock = threading.Lock()
+        self._durations: dict[str, list[float]] = {}
+        self._bytes: dict[str, int] = {}
+        self._counters: dict[str, int] = {}
+        self._events: list[dict[str, Any]] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Span]:
+        """
+        Time the code inside the `with` block.
+        """
+        span = Span(name, start=time.perf_counter(), args=args)
+
+        try:
+            yield span
+        finally:
+            self.record(span, end=time.perf_counter())
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **args: Any) -> Iterator[Span]:
+        """
+        Time a top-level stage of the run, and profile it if there's
+        a profiler.
+        """
+        with contextlib.ExitStack() as stack:
+            if self.profiler is not None:
+                stack.enter_context(self.profiler.stage(name))
+
+            yield stack.enter_context(self.span(name, **args))
+
+    def record(self, span: Span, *, end: float) -> None:
+        """
+        Record a span which has finished.
+        """
+        duration = end - span.start
+
+        with self._lock:
+            self._add_duration(span.name, duration, bytes=span.bytes)
+
+            if self.trace:
+                args = dict(span.args)
+                if span.bytes:
+                    args["bytes"] = span.bytes
+
+                self._events.append(
+                    {
+                        "name": span.name,
+                        "cat": span.name.split(":")[0],
+                        "ph": "X",
+                        "ts": (span.start - self.started_at) * 1e6,
+                        "dur": duration * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_native_id(),
+                        "args": args,
+                    }
+                )
+
+    def _add_duration(self, name: str, duration: float, *, bytes: int) -> None:
+        """
+        Add a duration to the stats.  The caller must hold the lock.
+        """
+        self._durations.setdefault(name, []).append(duration)
+        self._bytes[name] = self._bytes.get(name, 0) + bytes
+
+    def add_duration(self, name: str, duration: float, *, bytes: int = 0) -> None:
+        """
+        Record how long some work took, when it was timed somewhere
+        else, e.g. in another process.
+
+        This is included in the summary, but not the trace.
+        """
+        with self._lock:
+            self._add_duration(name, duration, bytes=bytes)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Add to a counter, e.g. the number of retries.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def summary(self) -> MetricsSummary:
+        """
+        Summarise everything recorded so far.
+        """
+        with self._lock:
+            durations = {name: sorted(d) for name, d in self._durations.items()}
+            bytes_by_name = dict(self._bytes)
+            counters = dict(self._counters)
+
+        spans: dict[str, SpanStats] = {}
+
+        for name, d in sorted(durations.items()):
+            spans[name] = {
+                "count": len(d),
+                "total": sum(d),
+                "mean": sum(d) / len(d),
+                "p50": get_percentile(d, 50),
+                "p90": get_percentile(d, 90),
+                "p99": get_percentile(d, 99),
+                "max": d[-1],
+                "bytes": bytes_by_name[name],
+                "histogram": get_histogram(d),
+            }
+
+        return {
+            "elapsed": time.perf_counter() - self.started_at,
+            "spans": spans,
+            "counters": counters,
+        }
+
+    def print_summary(self) -> None:
+        """
+        Print a table of timings, and a histogram for each kind of request.
+        """
+        summary = self.summary()
+
+        print(
+            f"{'span':<24} {'count':>6} {'total':>9} {'p50':>9} "
+            f"{'p90':>9} {'max':>9} {'bytes':>10}"
+        )
+
+        for name, stats in summary["spans"].items():
+            print(
+                f"{name:<24} {stats['count']:>6} {stats['total']:>8.2f}s "
+                f"{stats['p50'] * 1000:>7.1f}ms {stats['p90'] * 1000:>7.1f}ms "
+                f"{stats['max'] * 1000:>7.1f}ms {stats['bytes'] or '':>10}"
+            )
+
+        for name, count in sorted(summary["counters"].items()):
+            print(f"{name:<24} {count:>6}")
+
+        for name, stats in summary["spans"].items():
+            if not name.startswith("request:"):
+                continue
+
+            print(f"\n{name}")
+            largest = max(stats["histogram"].values())
+
+            for label, count in stats["histogram"].items():
+                bar = "#" * max(1, round(count / largest * 40))
+                print(f"  {label:>9} {count:>6} {bar}")
+
+        print(f"\nTotal time: {summary['elapsed']:.2f}s")
+
+    def write_summary(self, path: str) -> None:
+        """
+        Save the summary as a JSON file.
+        """
+        write_json(path, self.summary(), pretty=True)
+
+    def write_trace(self, path: str) -> None:
+        """
+        Save every span as a Chrome trace file.
+        """
+        if not self.trace:
+            raise ValueError("Can't write a trace unless trace=True")
+
+        with self._lock:
+            events = list(self._events)
+
+        write_json(path, {"traceEvents": events, "displayTimeUnit": "ms"})
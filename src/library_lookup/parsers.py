@@ -9,6 +9,54 @@ import urllib.parse
 import bs4
 
 
+# The tree builders BeautifulSoup can use to parse HTML, fastest first.
+#
+# lxml is written in C, and is much faster than the pure-Python parser
+# in the standard library, but it's a separate install -- so we fall back
+# to html.parser if it isn't available.  They give the same results
+# for all the pages we parse; see the tests.
+PARSER_BACKENDS = ["lxml", "html.parser"]
+
+
+def get_available_backends() -> list[str]:
+    """
+    Return the parser backends which are installed, fastest first.
+    """
+    available_backends = []
+
+    for backend in PARSER_BACKENDS:
+        try:
+            bs4.BeautifulSoup("", backend)
+        except bs4.FeatureNotFound:  # pragma: no cover
+            continue
+
+        available_backends.append(backend)
+
+    return available_backends
+
+
+DEFAULT_BACKEND = get_available_backends()[0]
+
+
+def make_soup(
+    html: str | bytes,
+    *,
+    backend: str | None = None,
+    parse_only: bs4.SoupStrainer | None = None,
+) -> bs4.BeautifulSoup:
+    """
+    Parse a page from the library website with BeautifulSoup.
+
+    By default this uses the fastest parser backend that's installed.
+
+    If you only need part of the page, pass a `parse_only` strainer,
+    e.g. `RECORD_DETAILS_REGIONS`, and BeautifulSoup will only build
+    a tree for the matching elements.  This is faster and uses less
+    memory than parsing the navigation, scripts, footer, and so on.
+    """
+    return bs4.BeautifulSoup(html, backend or DEFAULT_BACKEND, parse_only=parse_only)
+
+
 class AvailabilityInfo(TypedDict):
     """
     Information about available copies of a book.
@@ -20,6 +68,10 @@ class AvailabilityInfo(TypedDict):
     call_number: str
 
 
+# The only part of the availability popover we need is the table.
+AVAILABILITY_REGIONS = bs4.SoupStrainer("tbody")
+
+
 def parse_availability_info(soup: bs4.BeautifulSoup) -> list[AvailabilityInfo]:
     """
     Given a chunk of HTML from the "availability API", which includes a
@@ -60,6 +112,11 @@ def parse_availability_info(soup: bs4.BeautifulSoup) -> list[AvailabilityInfo]:
 RecordDetails: TypeAlias = dict[str, str | list[str]]
 
 
+# The only parts of a book's page we need are the "Record details" table
+# and the summary.
+RECORD_DETAILS_REGIONS = bs4.SoupStrainer(id=["tabRECDETAILS-body", "divtabSUMMARY"])
+
+
 def parse_record_details(soup: bs4.BeautifulSoup, *, url: str) -> RecordDetails:
     """
     Parse the "Record details" HTML table.
@@ -206,3 +263,18 @@ def get_cover_image_url(img_elem: bs4.Tag) -> str:
             url.fragment,
         )
     )
+
+
+def get_isbn_from_cover_image_url(image_url: str) -> str | None:
+    """
+    Get the ISBN from the URL of a cover image, if it has one, e.g.
+
+        https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&…
+
+    """
+    query = urllib.parse.urlsplit(image_url).query
+
+    try:
+        return urllib.parse.parse_qs(query)["ISBN"][0]
+    except KeyError:
+        return None
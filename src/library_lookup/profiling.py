@@ -0,0 +1,100 @@
+"""
+Profile the named stages of a crawl or a render with cProfile.
+
+The metrics tell us *how long* each stage takes; a profile tells us
+*why*, e.g. which BeautifulSoup calls or `find_all` loops are slow.
+
+    profiler = Profiler("profiles")
+
+    with profiler.stage("render"):
+        html = template.render(...)
+
+    profiler.print_summary()
+
+Each stage is saved as `profiles/<stage>.prof`, which you can explore
+with `python3 -m pstats profiles/render.prof` or snakeviz.
+
+cProfile only sees the thread which starts the stage, so requests
+running in the fetcher's threads (and tint colours worked out in other
+processes) aren't included -- but parsing and rendering are.
+"""
+
+from collections.abc import Iterator
+import contextlib
+import cProfile
+import os
+import pstats
+import re
+
+
+def get_profile_name(stage: str) -> str:
+    """
+    Return a filename for a stage, e.g. `parse:record` becomes
+    `parse_record.prof`.
+    """
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", stage) + ".prof"
+
+
+class Profiler:
+    """
+    Profiles each stage of a run, and saves the results to a directory.
+
+    Only one stage can be profiled at a time, because Python only allows
+    one active profiler per thread.  If a stage starts inside another,
+    e.g. logging in again in the middle of a crawl, it's included in the
+    profile of the outer stage.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Create a profiler which saves `.prof` files in `directory`.
+        """
+        self.directory = directory
+        self.stats: dict[str, pstats.Stats] = {}
+
+        self._active: str | None = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile the code inside the `with` block.
+
+        If the same stage runs more than once, the profiles are combined.
+        """
+        if self._active is not None:
+            yield
+            return
+
+        self._active = name
+        profile = cProfile.Profile()
+        profile.enable()
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active = None
+            self._save(name, profile)
+
+    def _save(self, name: str, profile: cProfile.Profile) -> None:
+        """
+        Add a finished profile to the stats for a stage, and save it.
+        """
+        if name in self.stats:
+            self.stats[name].add(profile)
+        else:
+            self.stats[name] = pstats.Stats(profile)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.stats[name].dump_stats(
+            os.path.join(self.directory, get_profile_name(name))
+        )
+
+    def print_summary(self, *, limit: int = 10) -> None:
+        """
+        Print the hottest functions in each stage, i.e. the ones where
+        we spent the most time, not counting the functions they call.
+        """
+        for name, stats in self.stats.items():
+            print(f"\n=== {name} ({get_profile_name(name)}) ===")
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
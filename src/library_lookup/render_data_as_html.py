@@ -2,9 +2,21 @@
 Functions for rendering the retrieved data as an HTML page.
 """
 
+from collections.abc import Iterable
+import functools
+import hashlib
+import os
 import re
+from typing import Any, TypedDict
 
+import jinja2
+import titlecase
 
+from .serialisation import dumps
+from .tint_colors import from_hex
+
+
+@functools.lru_cache(maxsize=4096)
 def display_author_name(label: str) -> str:
     """
     Convert an author name from Spydus into something to display
@@ -33,3 +45,215 @@ def display_author_name(label: str) -> str:
     first_name = re.sub(r" \([A-Za-z ]+\)$", "", first_name)
 
     return f"{first_name.strip()} {last_name.strip()}"
+
+
+@functools.lru_cache(maxsize=4096)
+def display_title(title: str) -> str:
+    """
+    Convert a title to title case.
+
+    This is a memoised wrapper around `titlecase.titlecase`, which is
+    slow enough to notice when it's called for every book.
+    """
+    return titlecase.titlecase(title)
+
+
+@functools.lru_cache(maxsize=4096)
+def rgba(hs: str, opacity: float) -> str:
+    """
+    Convert a hex colour to a CSS rgba colour.
+    """
+    r, g, b = from_hex(hs)
+    return f"rgba({r}, {g}, {b}, {opacity})"
+
+
+def create_jinja_environment(
+    template_dir: str, *, bytecode_cache_dir: str | None = None
+) -> jinja2.Environment:
+    """
+    Create the Jinja environment for rendering the page.
+
+    If `bytecode_cache_dir` is set, compiled templates are saved there,
+    so later renders can skip compiling any template which hasn't
+    changed.
+    """
+    if bytecode_cache_dir is not None:
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache_dir)
+    else:
+        bytecode_cache = None
+
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(template_dir),
+        autoescape=jinja2.select_autoescape(),
+        undefined=jinja2.StrictUndefined,
+        bytecode_cache=bytecode_cache,
+    )
+
+    env.filters["author_name"] = display_author_name
+    env.filters["rgba"] = rgba
+    env.filters["titlecase"] = display_title
+
+    return env
+
+
+class ClientCopy(TypedDict):
+    """
+    An available copy of a book, with only the fields used by
+    `library_lookup.js`.
+
+    The `branch` is the position of its location in the list of branches.
+    """
+
+    location: str
+    collection: str
+    call_number: str
+    branch: int
+
+
+class ClientBook(TypedDict):
+    """
+    A book, with only the fields used by `library_lookup.js`.
+
+    The `branches` field is a bitset of the branches which have an
+    available copy -- see `get_branch_bitset`.
+    """
+
+    brn: str
+    branches: list[int]
+    copies: list[ClientCopy]
+
+
+class ClientBookData(TypedDict):
+    """
+    All the data used by `library_lookup.js`.
+    """
+
+    branches: list[str]
+    branch_counts: list[int]
+    books: list[ClientBook]
+
+
+def get_branch_bitset(branch_indexes: Iterable[int], *, branch_count: int) -> list[int]:
+    """
+    Return a bitset with the given branches set.
+
+    JavaScript only does bitwise operations on 32-bit integers, and we
+    have more than 32 branches, so the bitset is a list of 32-bit words.
+    Branch `i` is bit `i % 32` of word `i // 32`.
+    """
+    words = [0] * ((branch_count + 31) // 32)
+
+    for i in branch_indexes:
+        words[i // 32] |= 1 << (i % 32)
+
+    return words
+
+
+def get_sort_title(title: str) -> str:
+    """
+    Return the key used to sort books by title, ignoring a leading "The".
+    """
+    return re.sub(r"^The ", "", title).lower()
+
+
+def get_client_book_data(
+    books: Iterable[dict[str, Any]], *, branches: Iterable[str]
+) -> ClientBookData:
+    """
+    Pick out the data that `library_lookup.js` needs to show availability.
+
+    Everything else (e.g. titles, summaries) is already in the HTML,
+    so there's no need to send it twice.  We also precompute which
+    branches have a copy of each book, so the page can filter books
+    with bitwise operations rather than looking through every copy.
+    """
+    branch_names = sorted(branches)
+    branch_indexes = {name: i for i, name in enumerate(branch_names)}
+    branch_counts = [0] * len(branch_names)
+
+    client_books: list[ClientBook] = []
+
+    for book in books:
+        copies: list[ClientCopy] = [
+            {
+                "location": av["location"],
+                "collection": av["collection"],
+                "call_number": av["call_number"],
+                "branch": branch_indexes[av["location"]],
+            }
+            for av in book["availability"]
+            if av["status"] == "Available"
+        ]
+
+        book_branches = {c["branch"] for c in copies}
+
+        for i in book_branches:
+            branch_counts[i] += 1
+
+        client_books.append(
+            {
+                "brn": book["record_details"]["BRN"],
+                "branches": get_branch_bitset(
+                    book_branches, branch_count=len(branch_names)
+                ),
+                "copies": copies,
+            }
+        )
+
+    return {
+        "branches": branch_names,
+        "branch_counts": branch_counts,
+        "books": client_books,
+    }
+
+
+HASHED_JSON_RE = re.compile(r"^(?P<prefix>.+)\.[0-9a-f]{16}\.json$")
+
+
+def write_hashed_json(data: Any, *, directory: str, prefix: str, keep: int = 2) -> str:
+    """
+    Write some data as a JSON file whose name includes a hash of its
+    contents, e.g. `books.3f2a9c04e1d7b865.json`, and return the name.
+
+    The file never changes once it's written, so browsers can cache it
+    for as long as they like.
+
+    We keep the `keep` most recent versions of the file, including this
+    one, and delete any older versions.  A browser which has an older
+    copy of `index.html` in its cache will still ask for the previous
+    version, so we don't want to delete it straight away.
+    """
+    json_bytes = dumps(data)
+    content_hash = hashlib.sha256(json_bytes).hexdigest()[:16]
+
+    name = f"{prefix}.{content_hash}.json"
+    out_path = os.path.join(directory, name)
+
+    if os.path.exists(out_path):
+        # Mark this as the most recent version, even if we wrote it
+        # a while ago.
+        os.utime(out_path)
+    else:
+        tmp_path = out_path + ".tmp"
+
+        with open(tmp_path, "wb") as out_file:
+            out_file.write(json_bytes)
+
+        os.replace(tmp_path, out_path)
+
+    older_versions = []
+
+    for other_name in os.listdir(directory):
+        m = HASHED_JSON_RE.match(other_name)
+
+        if m is not None and m.group("prefix") == prefix and other_name != name:
+            other_path = os.path.join(directory, other_name)
+            older_versions.append((os.path.getmtime(other_path), other_path))
+
+    older_versions.sort(reverse=True)
+
+    for _, other_path in older_versions[keep - 1 :]:
+        os.remove(other_path)
+
+    return name
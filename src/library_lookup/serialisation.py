@@ -0,0 +1,138 @@
+"""
+Read and write JSON, using the fastest library that's installed.
+
+orjson is written in Rust, and is much faster than the `json` module
+in the standard library, but it's a separate install -- so we fall back
+to `json` if it isn't available.
+
+There are two output formats:
+
+*   pretty, which is what we save in `books.json` -- one key per line,
+    sorted, so changes show up nicely in `git diff`
+*   compact, for files which are only read by code
+
+Both backends give byte-for-byte identical output in both formats;
+see the tests.  (This is why we write non-ASCII characters as-is,
+rather than escaping them -- orjson can't escape them.)
+"""
+
+import io
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+
+# The JSON backends we can use, fastest first.
+JSON_BACKENDS = ["orjson", "json"]
+
+
+def get_available_json_backends() -> list[str]:
+    """
+    Return the JSON backends which are installed, fastest first.
+    """
+    return [
+        backend
+        for backend in JSON_BACKENDS
+        if backend != "orjson" or orjson is not None
+    ]
+
+
+DEFAULT_JSON_BACKEND = get_available_json_backends()[0]
+
+
+def dumps(obj: Any, *, pretty: bool = False, backend: str | None = None) -> bytes:
+    """
+    Serialise an object as UTF-8 encoded JSON, with sorted keys.
+
+    :param pretty: If True, indent the JSON with two spaces, like
+        `json.dumps(obj, indent=2)`.  Otherwise, leave out all
+        the whitespace.
+
+    """
+    backend = backend or DEFAULT_JSON_BACKEND
+
+    if backend == "orjson":
+        option = orjson.OPT_SORT_KEYS
+
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, option=option)
+
+    if pretty:
+        json_string = json.dumps(obj, indent=2, sort_keys=True, ensure_ascii=False)
+    else:
+        json_string = json.dumps(
+            obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False
+        )
+
+    return json_string.encode("utf8")
+
+
+def loads(data: str | bytes, *, backend: str | None = None) -> Any:
+    """
+    Parse a JSON string.
+    """
+    backend = backend or DEFAULT_JSON_BACKEND
+
+    if backend == "orjson":
+        return orjson.loads(data)
+    else:
+        return json.loads(data)
+
+
+def write_json(
+    path: str,
+    obj: Any,
+    *,
+    pretty: bool = False,
+    backend: str | None = None,
+    mode: int | None = None,
+) -> None:
+    """
+    Write an object to a JSON file.
+
+    The file is replaced atomically, so it's never left half-written.
+
+    :param mode: If set, the permissions for the new file, e.g. 0o600
+        for a file that only the current user should be able to read.
+
+    """
+    backend = backend or DEFAULT_JSON_BACKEND
+    tmp_path = path + ".tmp"
+
+    def opener(file: str, flags: int) -> int:
+        return os.open(file, flags, 0o666 if mode is None else mode)
+
+    # When the standard library writes indented JSON, it writes it to
+    # the file as it goes, rather than building the whole string in
+    # memory first.  (Compact JSON is built in one go, because then
+    # it can use a much faster encoder written in C.)
+    with open(tmp_path, "wb", opener=opener) as out_file:
+        # If the temporary file was left over from an earlier run,
+        # `os.open` won't have changed its permissions.
+        if mode is not None:
+            os.fchmod(out_file.fileno(), mode)
+
+        if backend == "json" and pretty:
+            text_file = io.TextIOWrapper(out_file, encoding="utf8")
+            json.dump(obj, text_file, indent=2, sort_keys=True, ensure_ascii=False)
+            text_file.flush()
+            text_file.detach()
+        else:
+            out_file.write(dumps(obj, pretty=pretty, backend=backend))
+
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str, *, backend: str | None = None) -> Any:
+    """
+    Read a JSON file.
+    """
+    with open(path, "rb") as in_file:
+        return loads(in_file.read(), backend=backend)
@@ -0,0 +1,99 @@
+"""
+Save my login to the library website, so the next crawl can reuse it.
+
+Logging in and clicking through to my saved lists takes five or more
+requests, one after another, before we can fetch any books.  If we save
+the session cookies and the URL of the page with my saved lists, the
+next crawl can open that page straight away.  That one request tells
+us if the session still works, and gives us the current URL and size
+of my default list -- which we don't save, because it changes.
+
+The Spydus URLs are tied to the session, so we always save the cookies
+and the URL together.
+
+Sessions don't last forever.  When one expires, Spydus either serves
+a page which says "Session must be logged in to display this page",
+or sends us back to a page with the login form, and we need to log in
+again.  (Spydus sometimes serves the first page even when the session
+is still valid, and logging in again fixes that too.)
+
+The cookies are as good as my password, so the file is only readable
+by the current user.
+"""
+
+import datetime
+from typing import TypedDict
+
+from .serialisation import read_json, write_json
+
+
+class SavedSession(TypedDict):
+    """
+    The data saved in a session file.
+    """
+
+    base_url: str
+    cookies: dict[str, str]
+    saved_lists_url: str
+    saved_at: str
+
+
+# The message on pages we can't see because we're not logged in.
+SESSION_EXPIRED_MESSAGE = b"Session must be logged in"
+
+# The login form, which is only shown if we're not logged in, e.g. on
+# the homepage or the login page we get redirected to.
+LOGIN_FORM_MARKER = b'id="frmLogin"'
+
+
+def is_session_expired(body: bytes) -> bool:
+    """
+    Return True if this page says we need to log in again, or if it
+    has the login form.
+    """
+    return SESSION_EXPIRED_MESSAGE in body or LOGIN_FORM_MARKER in body
+
+
+class SessionFile:
+    """
+    A saved session for the library website, stored in a JSON file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Create a session file.  It doesn't need to exist yet.
+        """
+        self.path = path
+
+    def load(self, *, base_url: str) -> SavedSession | None:
+        """
+        Return the saved session for this website, or None if there
+        isn't one we can use.
+        """
+        try:
+            session: SavedSession = read_json(self.path)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if session.get("base_url") != base_url:
+            return None
+
+        return session
+
+    def save(
+        self, *, base_url: str, cookies: dict[str, str], saved_lists_url: str
+    ) -> None:
+        """
+        Save a session.
+
+        The file is created with permissions 0600, so only the current
+        user can read it, and is replaced atomically.
+        """
+        session: SavedSession = {
+            "base_url": base_url,
+            "cookies": cookies,
+            "saved_lists_url": saved_lists_url,
+            "saved_at": datetime.datetime.now().isoformat(),
+        }
+
+        write_json(self.path, session, pretty=True, mode=0o600)
@@ -0,0 +1,97 @@
+"""
+Copy files into the `_html` folder, skipping any which haven't changed
+since the last build.
+
+Most of the site is cover images, which rarely change once they've been
+downloaded, so copying them all on every build is wasted work.
+"""
+
+import os
+import shutil
+
+
+class IncrementalCopier:
+    """
+    Copies files into an output folder, and records what it did.
+
+    Where possible, files are hard-linked rather than copied, so they
+    don't take up any extra space.  This is safe because we never modify
+    a file in place -- downloads and builds replace the whole file, which
+    breaks the link.
+    """
+
+    def __init__(self, *, use_hardlinks: bool = True) -> None:
+        """
+        Create a copier with an empty report.
+        """
+        self.use_hardlinks = use_hardlinks
+
+        self.linked: list[str] = []
+        self.copied: list[str] = []
+        self.unchanged: list[str] = []
+        self.removed: list[str] = []
+
+    def copy(self, src: str, dst: str) -> None:
+        """
+        Copy a file to `dst`, unless it's already there.
+
+        A file is unchanged if it's a hard link to the source, or if it
+        has the same size and modification time.  We preserve the
+        modification time when we copy, so this holds after a build.
+        """
+        try:
+            dst_stat = os.stat(dst)
+        except FileNotFoundError:
+            pass
+        else:
+            src_stat = os.stat(src)
+
+            if os.path.samestat(src_stat, dst_stat) or (
+                src_stat.st_size == dst_stat.st_size
+                and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+            ):
+                self.unchanged.append(dst)
+                return
+
+        # We write to a temporary file first and then rename it, so
+        # the output folder never has a half-written file.
+        tmp_path = dst + ".tmp"
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        if self.use_hardlinks:
+            try:
+                os.link(src, tmp_path)
+            except OSError:
+                # e.g. the source and destination are on different
+                # filesystems, or the filesystem doesn't support links.
+                self.use_hardlinks = False
+            else:
+                os.replace(tmp_path, dst)
+                self.linked.append(dst)
+                return
+
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+        self.copied.append(dst)
+
+    def prune(self, directory: str, *, keep: set[str]) -> None:
+        """
+        Delete any files in `directory` whose names aren't in `keep`.
+        """
+        for name in os.listdir(directory):
+            if name not in keep:
+                os.remove(os.path.join(directory, name))
+                self.removed.append(os.path.join(directory, name))
+
+    def summary(self) -> str:
+        """
+        Return a one-line summary of what the copier did.
+        """
+        return (
+            f"{len(self.copied)} copied, "
+            f"{len(self.linked)} linked, "
+            f"{len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed"
+        )
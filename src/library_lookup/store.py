@@ -0,0 +1,437 @@
+"""
+A SQLite database of book data, which keeps the history of every crawl.
+
+Each crawl overwrites `books.json`, so it only ever tells us about
+today.  The store keeps every crawl, and splits the data into tables:
+
+    books           one row per book, with the latest title, author,
+                    first ISBN, etc.
+    record_details  the "Record details" table for each book
+    covers          the URL and path of each book's cover image
+    crawls          when each crawl started
+    crawl_books     which books were on my list in each crawl, in order
+    availability    a snapshot of every copy of every book, per crawl
+
+The record details and covers hardly ever change, so we only keep the
+latest version; availability is what changes from day to day, so we
+keep a snapshot from every crawl.
+
+There are indexes on ISBN, branch and status, so questions like
+"which branches have this book?" don't need to read every book, and
+`export` gives back the data in the same shape as `books.json`.
+"""
+
+from collections.abc import Mapping
+import sqlite3
+from typing import Any, TypedDict
+
+from .book_data import BookData
+from .incremental import get_isbns
+from .serialisation import dumps, loads
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books(
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT,
+    publication_year TEXT,
+    isbn TEXT,
+    fetched_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS record_details(
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (book_id, field)
+);
+
+CREATE TABLE IF NOT EXISTS covers(
+    book_id INTEGER PRIMARY KEY REFERENCES books(id),
+    url TEXT NOT NULL,
+    path TEXT
+);
+
+CREATE TABLE IF NOT EXISTS crawls(
+    id INTEGER PRIMARY KEY,
+    generated_at TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crawl_books(
+    crawl_id INTEGER NOT NULL REFERENCES crawls(id),
+    position INTEGER NOT NULL,
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    PRIMARY KEY (crawl_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS availability(
+    crawl_id INTEGER NOT NULL REFERENCES crawls(id),
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    position INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    status TEXT NOT NULL,
+    call_number TEXT NOT NULL,
+    PRIMARY KEY (crawl_id, book_id, position)
+);
+
+CREATE INDEX IF NOT EXISTS books_isbn ON books(isbn);
+CREATE INDEX IF NOT EXISTS availability_location
+    ON availability(crawl_id, location, status);
+CREATE INDEX IF NOT EXISTS availability_status ON availability(crawl_id, status);
+CREATE INDEX IF NOT EXISTS availability_book ON availability(book_id, crawl_id);
+"""
+
+
+class AvailabilitySnapshot(TypedDict):
+    """
+    How many copies of a book there were in a single crawl, and how
+    many of them were available.
+    """
+
+    generated_at: str
+    available: int
+    total: int
+
+
+def get_store_key(book: Mapping[str, Any]) -> str:
+    """
+    Return a key that identifies a book in the store.
+
+    This is the BRN, the library's ID for the book, if we have it.
+    Otherwise it's the title.
+    """
+    brn = book["record_details"].get("BRN")
+
+    if isinstance(brn, str):
+        return brn
+    else:
+        title: str = book["title"]
+        return title
+
+
+class BookStore:
+    """
+    The book data from every crawl, stored in a SQLite database.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the store, creating it if it doesn't exist already.
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """
+        Close the underlying database.
+        """
+        self._conn.close()
+
+    def add_crawl(self, book_data: BookData) -> None:
+        """
+        Save the results of a crawl.
+
+        If we've already saved a crawl that started at the same time,
+        it's replaced.
+        """
+        with self._conn:
+            cursor = self._conn.cursor()
+
+            row = cursor.execute(
+                "SELECT id FROM crawls WHERE generated_at = ?",
+                (book_data["generated_at"],),
+            ).fetchone()
+
+            if row is not None:
+                crawl_id = row[0]
+                cursor.execute(
+                    "DELETE FROM crawl_books WHERE crawl_id = ?", (crawl_id,)
+                )
+                cursor.execute(
+                    "DELETE FROM availability WHERE crawl_id = ?", (crawl_id,)
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO crawls(generated_at) VALUES (?)",
+                    (book_data["generated_at"],),
+                )
+                crawl_id = cursor.lastrowid
+
+            seen_book_ids = set()
+
+            for position, book in enumerate(book_data["books"]):
+                book_id = self._save_book(cursor, book)
+
+                cursor.execute(
+                    "INSERT INTO crawl_books VALUES (?, ?, ?)",
+                    (crawl_id, position, book_id),
+                )
+
+                # If the same book is on the list twice, we only need
+                # one copy of its availability.
+                if book_id in seen_book_ids:
+                    continue
+
+                seen_book_ids.add(book_id)
+
+                cursor.executemany(
+                    "INSERT INTO availability VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            crawl_id,
+                            book_id,
+                            i,
+                            av["location"],
+                            av["collection"],
+                            av["status"],
+                            av["call_number"],
+                        )
+                        for i, av in enumerate(book["availability"])
+                    ],
+                )
+
+    def _save_book(self, cursor: sqlite3.Cursor, book: Mapping[str, Any]) -> int:
+        """
+        Save the bibliographic data about a book, replacing anything
+        we'd saved before, and return its ID.
+        """
+        isbns = get_isbns(book["record_details"])
+
+        book_id: int = cursor.execute(
+            """
+            INSERT INTO books(key, title, author, publication_year, isbn, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                title = excluded.title,
+                author = excluded.author,
+                publication_year = excluded.publication_year,
+                isbn = excluded.isbn,
+                fetched_at = excluded.fetched_at
+            RETURNING id
+            """,
+            (
+                get_store_key(book),
+                book["title"],
+                book["author"],
+                book["publication_year"],
+                isbns[0] if isbns else None,
+                book.get("fetched_at"),
+            ),
+        ).fetchone()[0]
+
+        # Values in the record details are either a single string, or
+        # a list of strings (e.g. the summary), so we store them as JSON.
+        cursor.execute("DELETE FROM record_details WHERE book_id = ?", (book_id,))
+        cursor.executemany(
+            "INSERT INTO record_details VALUES (?, ?, ?)",
+            [
+                (book_id, field, dumps(value).decode("utf8"))
+                for field, value in book["record_details"].items()
+            ],
+        )
+
+        cursor.execute("DELETE FROM covers WHERE book_id = ?", (book_id,))
+        if book["image"] is not None:
+            cursor.execute(
+                "INSERT INTO covers VALUES (?, ?, ?)",
+                (book_id, book["image"]["url"], book["image"]["path"]),
+            )
+
+        return book_id
+
+    def _get_crawl_id(self, generated_at: str | None) -> int | None:
+        """
+        Return the ID of the crawl which started at `generated_at`,
+        or of the latest crawl if it's None.
+        """
+        if generated_at is None:
+            row = self._conn.execute(
+                "SELECT id FROM crawls ORDER BY generated_at DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT id FROM crawls WHERE generated_at = ?", (generated_at,)
+            ).fetchone()
+
+        return None if row is None else int(row[0])
+
+    def get_crawls(self) -> list[str]:
+        """
+        Return when every crawl in the store started, oldest first.
+        """
+        return [
+            generated_at
+            for (generated_at,) in self._conn.execute(
+                "SELECT generated_at FROM crawls ORDER BY generated_at"
+            )
+        ]
+
+    def export(self, generated_at: str | None = None) -> BookData:
+        """
+        Return the books from a crawl, in the same shape as `books.json`.
+
+        If `generated_at` is None, this is the latest crawl.  Older crawls
+        have their own availability, but the latest record details and
+        covers, because that's all we keep.
+        """
+        crawl_id = self._get_crawl_id(generated_at)
+
+        if crawl_id is None:
+            raise KeyError(generated_at)
+
+        (crawl_generated_at,) = self._conn.execute(
+            "SELECT generated_at FROM crawls WHERE id = ?", (crawl_id,)
+        ).fetchone()
+
+        record_details: dict[int, dict[str, Any]] = {}
+        for book_id, field, value in self._conn.execute(
+            """
+            SELECT record_details.book_id, field, value
+            FROM record_details
+            JOIN crawl_books ON crawl_books.book_id = record_details.book_id
+            WHERE crawl_id = ?
+            ORDER BY record_details.rowid
+            """,
+            (crawl_id,),
+        ):
+            record_details.setdefault(book_id, {})[field] = loads(value)
+
+        availability: dict[int, list[dict[str, str]]] = {}
+        for book_id, location, collection, status, call_number in self._conn.execute(
+            """
+            SELECT book_id, location, collection, status, call_number
+            FROM availability
+            WHERE crawl_id = ?
+            ORDER BY book_id, position
+            """,
+            (crawl_id,),
+        ):
+            availability.setdefault(book_id, []).append(
+                {
+                    "location": location,
+                    "collection": collection,
+                    "status": status,
+                    "call_number": call_number,
+                }
+            )
+
+        books = []
+
+        for row in self._conn.execute(
+            """
+            SELECT books.id, title, author, publication_year, fetched_at,
+                covers.book_id, covers.url, covers.path
+            FROM crawl_books
+            JOIN books ON books.id = crawl_books.book_id
+            LEFT JOIN covers ON covers.book_id = books.id
+            WHERE crawl_id = ?
+            ORDER BY position
+            """,
+            (crawl_id,),
+        ):
+            book_id, title, author, publication_year, fetched_at = row[:5]
+            cover_book_id, cover_url, cover_path = row[5:]
+
+            book: dict[str, Any] = {
+                "title": title,
+                "author": author,
+                "publication_year": publication_year,
+                "record_details": record_details.get(book_id, {}),
+                "image": (
+                    {"url": cover_url, "path": cover_path}
+                    if cover_book_id is not None
+                    else None
+                ),
+                "availability": availability.get(book_id, []),
+            }
+
+            # Books saved by older crawls don't have this field
+            if fetched_at is not None:
+                book["fetched_at"] = fetched_at
+
+            books.append(book)
+
+        return {"generated_at": crawl_generated_at, "books": books}
+
+    def get_branches_with_isbn(
+        self, isbn: str, *, status: str | None = "Available"
+    ) -> list[str]:
+        """
+        Return the branches which have a copy of the book with this ISBN
+        in the latest crawl.
+
+        If `status` is None, this includes copies which are on loan.
+        """
+        crawl_id = self._get_crawl_id(None)
+
+        query = """
+            SELECT DISTINCT location
+            FROM availability
+            JOIN books ON books.id = availability.book_id
+            WHERE books.isbn = ? AND crawl_id = ?
+        """
+        params: list[Any] = [isbn, crawl_id]
+
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+
+        return [
+            location
+            for (location,) in self._conn.execute(query + " ORDER BY 1", params)
+        ]
+
+    def count_books_at_branches(self, *, status: str = "Available") -> dict[str, int]:
+        """
+        Return how many books have a copy with the given status at each
+        branch, in the latest crawl.
+        """
+        return {
+            location: count
+            for location, count in self._conn.execute(
+                """
+                SELECT location, COUNT(DISTINCT book_id)
+                FROM availability
+                WHERE crawl_id = ? AND status = ?
+                GROUP BY location
+                """,
+                (self._get_crawl_id(None), status),
+            )
+        }
+
+    def get_availability_history(self, isbn: str) -> list[AvailabilitySnapshot]:
+        """
+        Return how many copies of the book with this ISBN were available
+        in every crawl, oldest first.
+
+        Crawls where the book wasn't on my list are left out.  If the
+        book was on the list twice in the same crawl, its copies are
+        only counted once.
+        """
+        return [
+            {"generated_at": generated_at, "available": available, "total": total}
+            for generated_at, available, total in self._conn.execute(
+                """
+                SELECT
+                    crawls.generated_at,
+                    COALESCE(SUM(availability.status = 'Available'), 0),
+                    COUNT(availability.book_id)
+                FROM (SELECT DISTINCT crawl_id, book_id FROM crawl_books) AS crawl_books
+                JOIN crawls ON crawls.id = crawl_books.crawl_id
+                JOIN books ON books.id = crawl_books.book_id
+                LEFT JOIN availability
+                    ON availability.crawl_id = crawl_books.crawl_id
+                    AND availability.book_id = crawl_books.book_id
+                WHERE books.isbn = ?
+                GROUP BY crawls.id
+                ORDER BY crawls.generated_at
+                """,
+                (isbn,),
+            )
+        ]
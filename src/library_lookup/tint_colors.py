@@ -0,0 +1,385 @@
+"""
+Code for choosing a tint colour to be associated with book covers.
+
+We find the dominant colours in each cover with k-means clustering,
+then pick the one that looks best against the white page background.
+That takes a while, so we save the colours in `colors.json`.
+Each colour is keyed by the SHA-256 hash of the cover, rather than its
+path, so if a cover gets re-downloaded with a different image, we'll
+choose a new colour rather than reusing the old one:
+
+    {
+      "3b1e0c…": "#6a72a7",
+      "4f9d21…": "#477785",
+      …
+    }
+
+"""
+
+from collections.abc import Iterable
+import colorsys
+import concurrent.futures
+import hashlib
+import os
+import re
+import time
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
+
+from .metrics import Metrics
+from .serialisation import read_json, write_json
+
+
+def from_hex(hs: str) -> tuple[int, int, int]:
+    """
+    Return an RGB tuple from a hex string, e.g. #ff0102 -> (255, 1, 2).
+    """
+    return int(hs[1:3], 16), int(hs[3:5], 16), int(hs[5:7], 16)
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Return the SHA-256 hash of a file, as a hex string.
+    """
+    with open(path, "rb") as in_file:
+        return hashlib.file_digest(in_file, "sha256").hexdigest()
+
+
+THUMBNAIL_SIZE = (100, 100)
+
+
+# The matrix and white point for converting linear sRGB to CIE XYZ
+_RGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def srgb_to_lab(rgb: NDArray[Any]) -> NDArray[np.float64]:
+    """
+    Convert an array of sRGB colours (0-255) to CIELAB, using
+    the D65 white point.
+    """
+    c = np.asarray(rgb, dtype=np.float64) / 255
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+
+    xyz = c @ _RGB_TO_XYZ.T / _D65_WHITE
+
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+
+    return np.stack(
+        [
+            116 * f[..., 1] - 16,
+            500 * (f[..., 0] - f[..., 1]),
+            200 * (f[..., 1] - f[..., 2]),
+        ],
+        axis=-1,
+    )
+
+
+def lab_to_srgb(lab: NDArray[Any]) -> NDArray[np.uint8]:
+    """
+    Convert an array of CIELAB colours back to sRGB (0-255).
+    """
+    lab = np.asarray(lab, dtype=np.float64)
+
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack([fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200], axis=-1)
+
+    xyz = np.where(f > 6 / 29, f**3, 3 * (6 / 29) ** 2 * (f - 4 / 29)) * _D65_WHITE
+
+    c = np.clip(xyz @ np.linalg.inv(_RGB_TO_XYZ).T, 0, 1)
+    c = np.where(c > 0.0031308, 1.055 * c ** (1 / 2.4) - 0.055, 12.92 * c)
+
+    return np.asarray(np.round(c * 255), dtype=np.uint8)
+
+
+def find_clusters(
+    points: NDArray[np.float64],
+    *,
+    weights: NDArray[np.float64],
+    k: int,
+    max_iterations: int = 50,
+) -> NDArray[np.float64]:
+    """
+    Group a set of weighted points into (at most) `k` clusters with
+    k-means, and return the centre of each cluster.
+
+    The starting centres are chosen with k-means++, using a fixed seed,
+    so the same points always give the same clusters.
+
+    :param points: The points to cluster, which should all be different.
+    :param weights: How many times each point appears.
+    :param k: The number of clusters.
+
+    """
+    rng = np.random.default_rng(seed=0)
+
+    k = min(k, len(points))
+
+    centres = np.empty((k, points.shape[1]))
+    centres[0] = points[rng.choice(len(points), p=weights / weights.sum())]
+    distances = ((points - centres[0]) ** 2).sum(axis=1)
+
+    for i in range(1, k):
+        p = weights * distances
+        centres[i] = points[rng.choice(len(points), p=p / p.sum())]
+        distances = np.minimum(distances, ((points - centres[i]) ** 2).sum(axis=1))
+
+    squared_norms = (points**2).sum(axis=1)[:, None]
+
+    for _ in range(max_iterations):
+        # Find the nearest centre to each point, using the fact that
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2
+        labels = (
+            squared_norms - 2 * points @ centres.T + (centres**2).sum(axis=1)
+        ).argmin(axis=1)
+
+        totals = np.bincount(labels, weights=weights, minlength=k)
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=weights * points[:, d], minlength=k)
+                for d in range(points.shape[1])
+            ],
+            axis=1,
+        )
+
+        # If a cluster ends up empty, leave its centre where it was
+        new_centres = np.where(
+            totals[:, None] > 0, sums / np.maximum(totals, 1)[:, None], centres
+        )
+
+        if np.allclose(new_centres, centres, atol=1e-3):
+            break
+
+        centres = new_centres
+
+    return centres
+
+
+def get_dominant_colours(path: str, *, max_colours: int = 12) -> list[str]:
+    """
+    Return the dominant colours in an image, as hex strings.
+
+    We look at a thumbnail rather than the full image, and cluster
+    the pixels in CIELAB space, where distances are closer to how
+    different two colours look.
+    """
+    with Image.open(path) as im:
+        im.draft("RGB", THUMBNAIL_SIZE)
+
+        thumbnail = im.convert("RGB")
+        thumbnail.thumbnail(THUMBNAIL_SIZE)
+
+    # Covers often have large areas of a single colour, so we only
+    # cluster the distinct colours, weighted by how often they appear.
+    pixels = np.asarray(thumbnail, dtype=np.uint32).reshape(-1, 3)
+    packed = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+
+    colours, counts = np.unique(packed, return_counts=True)
+    rgb = np.stack([colours >> 16, (colours >> 8) & 0xFF, colours & 0xFF], axis=1)
+
+    centres = find_clusters(
+        srgb_to_lab(rgb), weights=counts.astype(np.float64), k=max_colours
+    )
+
+    return ["#%02x%02x%02x" % tuple(c) for c in lab_to_srgb(centres)]
+
+
+def get_relative_luminance(hs: str) -> float:
+    """
+    Return the relative luminance of a colour, as defined by WCAG.
+
+    See https://www.w3.org/TR/WCAG21/#dfn-relative-luminance
+    """
+    r, g, b = (
+        c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+        for c in (x / 255 for x in from_hex(hs))
+    )
+
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def get_contrast_ratio(hs1: str, hs2: str) -> float:
+    """
+    Return the WCAG contrast ratio between two colours, from 1 to 21.
+    """
+    l1, l2 = sorted([get_relative_luminance(hs1), get_relative_luminance(hs2)])
+
+    return (l2 + 0.05) / (l1 + 0.05)
+
+
+def choose_best_colour_for_bg(colours: list[str], *, background: str) -> str:
+    """
+    Choose the colour which will look best against a background.
+
+    This is the most saturated colour with enough contrast to be used
+    for text on the background (WCAG AA, a ratio of 4.5:1).  If none of
+    the colours have enough contrast, we use black or white instead.
+    """
+    usable_colours = [c for c in colours if get_contrast_ratio(c, background) >= 4.5]
+
+    if not usable_colours:
+        return max(
+            ["#000000", "#ffffff"], key=lambda c: get_contrast_ratio(c, background)
+        )
+
+    return max(
+        usable_colours,
+        key=lambda c: colorsys.rgb_to_hsv(*(x / 255 for x in from_hex(c)))[1],
+    )
+
+
+def choose_tint_color_for_file(path: str) -> str:
+    """
+    Choose the tint colour for a file, ignoring the cache.
+    """
+    return choose_best_colour_for_bg(
+        get_dominant_colours(path, max_colours=12), background="#ffffff"
+    )
+
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _choose_tint_color_timed(path: str) -> tuple[str, float]:
+    """
+    Choose the tint colour for a file, and return it with how long it
+    took in seconds.
+
+    This runs in a worker process, so it can't record the time itself.
+    """
+    start = time.perf_counter()
+    color = choose_tint_color_for_file(path)
+    return color, time.perf_counter() - start
+
+
+class TintColorCache:
+    """
+    The tint colours for our book covers, saved in a JSON file.
+
+    The file is read once when the cache is created, and only written
+    when you call `save()`.
+    """
+
+    def __init__(
+        self, path: str = "colors.json", *, metrics: Metrics | None = None
+    ) -> None:
+        """
+        Load the saved tint colours, if there are any.
+
+        If `metrics` is set, record how long it takes to hash the covers
+        and to choose each new colour.
+        """
+        self.path = path
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.colors_by_hash: dict[str, str] = {}
+        self.is_modified = False
+
+        # Older versions of this file were keyed by the path to the
+        # cover, e.g. `covers/9780007548187.jpg`.  We convert them to
+        # hashes when the cover is on disk, but we keep the colours for
+        # covers we haven't downloaded yet, so we can convert them later
+        # rather than choosing a different colour.
+        self.colors_by_path: dict[str, str] = {}
+
+        try:
+            saved_colors: dict[str, str] = read_json(path)
+        except FileNotFoundError:
+            saved_colors = {}
+
+        for key, color in saved_colors.items():
+            if SHA256_RE.match(key):
+                self.colors_by_hash[key] = color
+            elif os.path.exists(key):
+                self.colors_by_hash[get_file_hash(key)] = color
+                self.is_modified = True
+            else:
+                self.colors_by_path[key] = color
+
+    def get_tint_colors(
+        self, paths: Iterable[str], *, max_workers: int | None = None
+    ) -> dict[str, str]:
+        """
+        Return the tint colour for every file in a list.
+
+        Any colours we don't already know are chosen in parallel, using
+        a pool of processes -- one per CPU, unless you set `max_workers`.
+        Covers are sent to the workers in batches, so we don't pay for
+        a round trip to another process for every cover.
+
+        :param paths: The files to look up.
+        :param max_workers: How many processes to use.  If this is 1,
+            the colours are chosen one-by-one in this process.
+
+        """
+        with self.metrics.span("hash_covers"):
+            hashes = {path: get_file_hash(path) for path in paths}
+
+        # If two covers have the same image, we only need to choose
+        # a colour once.
+        missing: dict[str, str] = {}
+
+        for path, file_hash in hashes.items():
+            if file_hash in self.colors_by_hash:
+                continue
+
+            # If we saved a colour for this path in an older version of
+            # the file, use it now that the cover is here.
+            if path in self.colors_by_path:
+                self.colors_by_hash[file_hash] = self.colors_by_path.pop(path)
+                self.is_modified = True
+            else:
+                missing.setdefault(file_hash, path)
+
+        if missing:
+            with self.metrics.span("tint_colors", files=len(missing)):
+                if max_workers == 1:
+                    results = [_choose_tint_color_timed(p) for p in missing.values()]
+                else:
+                    with concurrent.futures.ProcessPoolExecutor(
+                        max_workers
+                    ) as executor:
+                        results = list(
+                            executor.map(
+                                _choose_tint_color_timed,
+                                missing.values(),
+                                chunksize=16,
+                            )
+                        )
+
+            for file_hash, (color, elapsed) in zip(missing.keys(), results):
+                self.colors_by_hash[file_hash] = color
+                self.metrics.add_duration("choose_tint_color", elapsed)
+
+            self.is_modified = True
+
+        return {
+            path: self.colors_by_hash[file_hash] for path, file_hash in hashes.items()
+        }
+
+    def save(self) -> None:
+        """
+        Write the tint colours back to the JSON file, if they've changed.
+
+        Any colours keyed by path which we haven't converted yet are
+        kept as they are.
+
+        The file is replaced atomically, so it's never left half-written.
+        """
+        if not self.is_modified:
+            return
+
+        write_json(
+            self.path, {**self.colors_by_path, **self.colors_by_hash}, pretty=True
+        )
+
+        self.is_modified = False
@@ -0,0 +1,99 @@
+"""
+Prepare the book data from a crawl for display.
+
+This is a single pass over the books, which:
+
+*   removes copies held outside the Hertfordshire network, and strips
+    the " (Hertfordshire Libraries)" suffix from the other locations
+*   works out whether each book is a paperback or a hardback
+*   adds the size and tint colour of each cover, if we know it
+*   collects the branches which have a copy available
+
+"""
+
+from collections.abc import Iterable, Mapping
+from typing import Any, TypedDict
+
+from .cover_metadata import CoverMetadata
+
+
+NETWORK_SUFFIX = " (Hertfordshire Libraries)"
+
+
+class TransformedBooks(TypedDict):
+    """
+    The books ready for display, plus the branches with copies.
+    """
+
+    books: list[dict[str, Any]]
+    branches: set[str]
+
+
+def get_format(record_details: Mapping[str, Any]) -> str | None:
+    """
+    Return the format of a book, based on its ISBN, e.g.
+
+        9781472281074 (pbk)   ~> paperback
+        9780804692298 (hbk)   ~> hardback
+
+    """
+    isbn = record_details.get("ISBN", "")
+
+    if "pbk" in isbn:
+        return "paperback"
+    elif "hbk" in isbn:
+        return "hardback"
+    else:
+        return None
+
+
+def transform_books(
+    books: Iterable[Mapping[str, Any]],
+    *,
+    cover_metadata: Mapping[str, CoverMetadata] | None = None,
+) -> TransformedBooks:
+    """
+    Prepare the books from a crawl for display.
+
+    The original books aren't modified; each book in the output is
+    a new dict.
+
+    :param books: The books from `books.json`.
+    :param cover_metadata: The metadata for each cover, keyed by path.
+        Books whose covers aren't in here won't get a size or tint colour.
+
+    """
+    cover_metadata = cover_metadata or {}
+
+    transformed_books = []
+    branches = set()
+
+    for book in books:
+        availability = []
+
+        for av in book["availability"]:
+            if not av["location"].endswith(NETWORK_SUFFIX):
+                continue
+
+            location = av["location"].removesuffix(NETWORK_SUFFIX)
+            availability.append({**av, "location": location})
+
+            if av["status"] == "Available":
+                branches.add(location)
+
+        new_book = {
+            **book,
+            "availability": availability,
+            "format": get_format(book["record_details"]),
+        }
+
+        if book["image"] and book["image"]["path"] in cover_metadata:
+            metadata = cover_metadata[book["image"]["path"]]
+
+            new_book["tint_color"] = metadata["tint_color"]
+            new_book["image_width"] = metadata["width"]
+            new_book["image_height"] = metadata["height"]
+
+        transformed_books.append(new_book)
+
+    return {"books": transformed_books, "branches": branches}
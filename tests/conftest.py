@@ -0,0 +1,221 @@
+"""
+Shared fixtures for the tests.
+"""
+
+from collections.abc import Iterator
+import functools
+import http.cookies
+import http.server
+import importlib.util
+import os
+import threading
+import urllib.parse
+from typing import Any
+
+import pytest
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    A stand-in for the library website, which serves the pages
+    in `tests/fixtures`, plus a fake cover image service.
+
+    You can log in with the form on the homepage, and then click through
+    to a saved list with three books (`list_page_1.html` and
+    `list_page_2.html`).  The saved lists and the list pages are only
+    shown if you're logged in.  The last book doesn't have a cover.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # These are shared between all the GET requests made to the server;
+    # `cookies_seen` and `paths_requested` are in the same order.
+    client_ports: set[int] = set()
+    cookies_seen: list[str | None] = []
+    status_codes: list[int] = []
+    paths_requested: list[str] = []
+
+    # The session tokens for everyone who's logged in, and how many
+    # times anybody has logged in
+    sessions: set[str] = set()
+    logins = 0
+
+    # What we show on a page that needs you to log in if you're not
+    # logged in: either "redirect" to the homepage, "message" to say
+    # the session has expired, or "dashboard" to show a page which
+    # doesn't say anything about it.
+    logged_out_response = "redirect"
+
+    # Whether you have to be logged in to see the record details for
+    # a book, like on the real site.
+    record_pages_need_login = False
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        """
+        Record the status code of every response.
+        """
+        self.status_codes.append(code)
+        super().send_response(code, message)
+
+    def is_logged_in(self) -> bool:
+        """
+        Return True if the request has the cookie for a current session.
+        """
+        cookie: http.cookies.SimpleCookie = http.cookies.SimpleCookie()
+        cookie.load(self.headers.get("Cookie", ""))
+
+        return "SESSION" in cookie and cookie["SESSION"].value in self.sessions
+
+    def needs_login(self) -> bool:
+        """
+        Return True if you have to be logged in to see this page.
+        """
+        return (
+            self.path == "/saved_lists.html"
+            or self.path.startswith("/list_page_")
+            or (self.record_pages_need_login and self.path.startswith("/isbn_"))
+        )
+
+    def send_fixture(self, name: str, *, headers: dict[str, str] | None = None) -> None:
+        """
+        Send one of the HTML fixtures.
+
+        Links to `http://fixture-server` are rewritten to point at
+        this server.
+        """
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as in_file:
+            body = in_file.read().replace(
+                b"http://fixture-server", f"http://{self.headers['Host']}".encode()
+            )
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        for header_name, value in (headers or {}).items():
+            self.send_header(header_name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        """
+        Log in, and start a new session.
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        FixtureHandler.logins += 1
+
+        token = f"session{self.logins}"
+        self.sessions.add(token)
+
+        self.send_fixture(
+            "homepage_logged_in.html", headers={"Set-Cookie": f"SESSION={token}"}
+        )
+
+    def do_GET(self) -> None:
+        """
+        Serve a fixture, or a cover image.
+        """
+        self.client_ports.add(self.client_address[1])
+        self.cookies_seen.append(self.headers.get("Cookie"))
+        self.paths_requested.append(self.path)
+
+        if self.path == "/":
+            if self.is_logged_in():
+                self.send_fixture("homepage_logged_in.html")
+            else:
+                self.send_fixture("homepage.html")
+        elif self.needs_login() and not self.is_logged_in():
+            if self.logged_out_response == "redirect":
+                self.send_response(302)
+                self.send_header("Location", "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.logged_out_response == "dashboard":
+                self.send_fixture("dashboard.html")
+            else:
+                self.send_fixture("session_expired.html")
+        elif self.needs_login():
+            self.send_fixture(self.path.lstrip("/"))
+        elif self.path.startswith("/image-service.asp"):
+            # Like the real image service, send us to the cover for
+            # this ISBN, or a blank image if there isn't one.
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+
+            if "ISBN" in query:
+                location = f"/bds-images/l/123456/{query['ISBN'][0]}.jpg"
+            else:
+                location = "/bds-images/blank.gif"
+
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/bds-images/"):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", "4")
+            self.send_header("Set-Cookie", "tracker=123")
+            self.end_headers()
+            self.wfile.write(b"JPEG")
+        elif self.path == "/login":
+            self.send_response(200)
+            self.send_header("Set-Cookie", "session=refreshed")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            super().do_GET()
+
+    def log_message(self, *args: object) -> None:
+        """
+        Don't print a log line for every request.
+        """
+        pass
+
+
+@pytest.fixture
+def fixture_server() -> Iterator[str]:
+    """
+    Run a local HTTP server that serves `tests/fixtures`, and return
+    its base URL.
+    """
+    FixtureHandler.client_ports = set()
+    FixtureHandler.cookies_seen = []
+    FixtureHandler.status_codes = []
+    FixtureHandler.paths_requested = []
+    FixtureHandler.sessions = set()
+    FixtureHandler.logins = 0
+    FixtureHandler.logged_out_response = "redirect"
+    FixtureHandler.record_pages_need_login = False
+
+    handler = functools.partial(FixtureHandler, directory=FIXTURES_DIR)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}"
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture(scope="session")
+def get_book_data() -> Any:
+    """
+    Import `get_book_data.py`, which is a script rather than part of
+    the `library_lookup` package.
+    """
+    path = os.path.join(os.path.dirname(__file__), "..", "get_book_data.py")
+
+    spec = importlib.util.spec_from_file_location("get_book_data", path)
+    assert spec is not None and spec.loader is not None
+
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
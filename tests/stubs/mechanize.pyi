@@ -1,17 +1,28 @@
+from collections.abc import Iterator
 from typing import Any
 
 from mechanize._http import HTTPRefreshProcessor
 
 class FormNotFoundError(Exception): ...
 
-class Readable(str):
-    def read(self) -> str: ...
+class Readable:
+    def read(self) -> bytes: ...
 
 class FoundLink:
     @property
     def absolute_url(self) -> str: ...
 
+class Cookie:
+    name: str
+    value: str
+    domain: str
+
+class CookieJar:
+    def __iter__(self) -> Iterator[Cookie]: ...
+    def clear(self) -> None: ...
+
 class Browser:
+    def set_cookiejar(self, cookiejar: CookieJar) -> None: ...
     def set_handle_robots(self, flag: bool) -> None: ...
     def set_handle_redirect(self, flag: bool) -> None: ...
     def set_handle_refresh(
@@ -22,5 +33,6 @@ class Browser:
     def select_form(self, predicate: Any) -> None: ...
     def set_value(self, value: str, name: str) -> None: ...
     def submit(self) -> Readable: ...
-    def follow_link(self, text: str) -> str: ...
+    def follow_link(self, text: str) -> Readable: ...
+    def geturl(self) -> str: ...
     def find_link(self, text: str) -> FoundLink: ...
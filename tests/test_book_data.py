@@ -0,0 +1,207 @@
+"""
+Tests for `library_lookup.book_data`.
+"""
+
+import datetime
+import json
+import os
+from typing import Any
+
+import pytest
+
+from library_lookup.book_data import (
+    NdjsonBookWriter,
+    compact_ndjson,
+    get_book_key,
+    load_book_data,
+)
+
+
+def make_book(isbn: str, title: str = "Adulthood rites") -> dict[str, Any]:
+    """
+    Create a book in the shape stored in `books.json`.
+    """
+    return {
+        "title": title,
+        "record_details": {"ISBN": isbn, "Summary": ["A book — with “quotes”"]},
+        "image": {
+            "url": f"https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN={isbn}",
+            "path": None,
+        },
+        "availability": [],
+    }
+
+
+def test_get_book_key() -> None:
+    """
+    A book is identified by the ISBN in its cover URL.
+    """
+    assert get_book_key(make_book("9781472281074")) == "9781472281074"
+    assert get_book_key({"image": {"url": "https://example.com/blank.gif"}}) is None
+
+
+def test_get_book_key_without_an_isbn() -> None:
+    """
+    If there's no ISBN in the cover URL, a book is identified by its BRN.
+    """
+    book = {
+        "image": {"url": "https://example.com/blank.gif"},
+        "record_details": {"BRN": "2512994"},
+    }
+
+    assert get_book_key(book) == "BRN:2512994"
+
+
+def test_it_writes_and_reads_books(tmp_path: str) -> None:
+    """
+    Books written to an NDJSON file can be read back.
+    """
+    path = os.path.join(tmp_path, "books.ndjson")
+
+    with NdjsonBookWriter(path, generated_at="2024-07-02T09:00:00") as writer:
+        writer.write(make_book("1"))
+        writer.write(make_book("2"))
+
+    assert load_book_data(path) == {
+        "generated_at": "2024-07-02T09:00:00",
+        "books": [make_book("1"), make_book("2")],
+    }
+
+
+def test_it_resumes_an_interrupted_crawl(tmp_path: str) -> None:
+    """
+    If a crawl is interrupted, the next crawl skips the books which
+    were already written, and ignores any incomplete last line.
+    """
+    path = os.path.join(tmp_path, "books.ndjson")
+
+    with NdjsonBookWriter(path, generated_at="2024-07-02T09:00:00") as writer:
+        writer.write(make_book("1"))
+        writer.write(make_book("2"))
+
+    # Simulate a crash halfway through writing the third book
+    with open(path, "a") as out_file:
+        out_file.write(json.dumps(make_book("3"))[:20])
+
+    with NdjsonBookWriter(path, generated_at="2024-07-03T09:00:00") as writer:
+        assert writer.generated_at == "2024-07-02T09:00:00"
+        assert set(writer.completed_books) == {"1", "2"}
+
+        writer.write(make_book("1"))
+        writer.write(make_book("2"))
+        writer.write(make_book("3"))
+
+    assert load_book_data(path) == {
+        "generated_at": "2024-07-02T09:00:00",
+        "books": [make_book("1"), make_book("2"), make_book("3")],
+    }
+
+
+def test_it_doesnt_duplicate_books_without_an_isbn(tmp_path: str) -> None:
+    """
+    If a book without an ISBN was written before the crawl was
+    interrupted, it isn't written again when we resume.
+    """
+    path = os.path.join(tmp_path, "books.ndjson")
+
+    book = make_book("1")
+    book["image"]["url"] = "https://example.com/blank.gif"
+    book["record_details"]["BRN"] = "2512994"
+
+    with NdjsonBookWriter(path, generated_at="2024-07-02T09:00:00") as writer:
+        writer.write(book)
+
+    with NdjsonBookWriter(path, generated_at="2024-07-02T10:00:00") as writer:
+        writer.write(book)
+        writer.write(make_book("2"))
+
+    assert load_book_data(path)["books"] == [book, make_book("2")]
+
+
+def test_it_discards_an_old_interrupted_crawl(tmp_path: str) -> None:
+    """
+    If the interrupted crawl is older than `max_age`, we start again
+    rather than reusing its books.
+    """
+    path = os.path.join(tmp_path, "books.ndjson")
+
+    with NdjsonBookWriter(path, generated_at="2024-07-02T09:00:00") as writer:
+        writer.write(make_book("1"))
+
+    with NdjsonBookWriter(
+        path,
+        generated_at="2024-07-02T12:00:00",
+        max_age=datetime.timedelta(days=1),
+    ) as writer:
+        assert writer.is_resumed
+
+    with NdjsonBookWriter(
+        path,
+        generated_at="2024-07-05T09:00:00",
+        max_age=datetime.timedelta(days=1),
+    ) as writer:
+        assert not writer.is_resumed
+        assert writer.completed_books == {}
+        writer.write(make_book("2"))
+
+    assert load_book_data(path) == {
+        "generated_at": "2024-07-05T09:00:00",
+        "books": [make_book("2")],
+    }
+
+
+@pytest.mark.parametrize("book_count", [0, 1, 3])
+def test_compacting_matches_json_dumps(tmp_path: str, book_count: int) -> None:
+    """
+    Compacting an NDJSON file gives exactly the same `books.json`
+    as serialising all the books at once, with non-ASCII characters
+    written as-is.
+    """
+    ndjson_path = os.path.join(tmp_path, "books.ndjson")
+    json_path = os.path.join(tmp_path, "books.json")
+
+    books = [make_book(str(i), title=f"Book {i}") for i in range(book_count)]
+
+    with NdjsonBookWriter(ndjson_path, generated_at="2024-07-02T09:00:00") as writer:
+        for book in books:
+            writer.write(book)
+
+    compact_ndjson(ndjson_path, json_path)
+
+    with open(json_path, encoding="utf8") as in_file:
+        assert in_file.read() == json.dumps(
+            {"generated_at": "2024-07-02T09:00:00", "books": books},
+            indent=2,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+
+    assert load_book_data(json_path) == load_book_data(ndjson_path)
+    assert not os.path.exists(json_path + ".tmp")
+
+
+def test_compacting_replaces_the_saved_covers(tmp_path: str) -> None:
+    """
+    When we compact the NDJSON file, we can fill in the covers we
+    downloaded after the crawl.
+    """
+    ndjson_path = os.path.join(tmp_path, "books.ndjson")
+    json_path = os.path.join(tmp_path, "books.json")
+
+    books = [make_book("1"), make_book("2")]
+
+    with NdjsonBookWriter(ndjson_path, generated_at="2024-07-02T09:00:00") as writer:
+        for book in books:
+            writer.write(book)
+
+    image_url = books[0]["image"]["url"]
+
+    compact_ndjson(
+        ndjson_path,
+        json_path,
+        images={image_url: {"url": image_url, "path": "covers/1.jpg"}},
+    )
+
+    compacted_books = load_book_data(json_path)["books"]
+    assert compacted_books[0]["image"]["path"] == "covers/1.jpg"
+    assert compacted_books[1] == books[1]
@@ -0,0 +1,86 @@
+"""
+Tests for `library_lookup.checkpoint`.
+"""
+
+import os
+
+from library_lookup.checkpoint import CrawlCheckpoint
+
+
+def test_a_new_checkpoint_starts_at_the_beginning(tmp_path: str) -> None:
+    """
+    If there's no checkpoint file, we start from the first page.
+    """
+    checkpoint = CrawlCheckpoint(
+        os.path.join(tmp_path, "checkpoint.json"), list_count=100
+    )
+
+    assert checkpoint.pages_completed == 0
+    assert checkpoint.books_completed == 0
+
+
+def test_it_resumes_from_a_checkpoint(tmp_path: str) -> None:
+    """
+    A checkpoint records the pages we've completed, and can be
+    loaded by the next crawl.
+    """
+    path = os.path.join(tmp_path, "checkpoint.json")
+
+    checkpoint = CrawlCheckpoint(path, list_count=45)
+    checkpoint.complete_page(0, book_count=20)
+    checkpoint.complete_page(1, book_count=20)
+
+    resumed = CrawlCheckpoint(path, list_count=45)
+    assert resumed.pages_completed == 2
+    assert resumed.books_completed == 40
+
+    resumed.complete_page(2, book_count=5)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_it_remembers_the_url_of_the_next_page(tmp_path: str) -> None:
+    """
+    A checkpoint records the URL of the next page, so the next crawl
+    can go straight there.
+    """
+    path = os.path.join(tmp_path, "checkpoint.json")
+
+    checkpoint = CrawlCheckpoint(path, list_count=45)
+    checkpoint.complete_page(0, book_count=20, next_page_url="https://example/p2")
+
+    resumed = CrawlCheckpoint(path, list_count=45)
+    assert resumed.next_page_url == "https://example/p2"
+
+    resumed.complete_page(1, book_count=20)
+    assert CrawlCheckpoint(path, list_count=45).next_page_url is None
+
+
+def test_it_ignores_a_checkpoint_if_the_list_has_changed(tmp_path: str) -> None:
+    """
+    If the number of books in the list has changed, the pages may have
+    moved, so we start again from the first page.
+    """
+    path = os.path.join(tmp_path, "checkpoint.json")
+
+    checkpoint = CrawlCheckpoint(path, list_count=45)
+    checkpoint.complete_page(0, book_count=20)
+
+    resumed = CrawlCheckpoint(path, list_count=46)
+    assert resumed.pages_completed == 0
+    assert resumed.books_completed == 0
+
+
+def test_it_removes_a_checkpoint(tmp_path: str) -> None:
+    """
+    A checkpoint can be removed, and removing it twice is fine.
+    """
+    path = os.path.join(tmp_path, "checkpoint.json")
+
+    checkpoint = CrawlCheckpoint(path, list_count=45)
+    checkpoint.complete_page(0, book_count=20)
+    assert os.path.exists(path)
+
+    checkpoint.remove()
+    assert not os.path.exists(path)
+
+    checkpoint.remove()
@@ -0,0 +1,92 @@
+"""
+Tests for `library_lookup.cover_metadata`.
+"""
+
+import json
+import os
+
+from PIL import Image
+import pytest
+
+from library_lookup.cover_metadata import CoverMetadataIndex
+from library_lookup.tint_colors import TintColorCache, get_file_hash
+
+
+def create_cover(path: str, *, size: tuple[int, int]) -> TintColorCache:
+    """
+    Save a cover image, and return a tint colour cache which already
+    knows its colour.
+    """
+    Image.new("RGB", size, color="#1e52b8").save(path)
+
+    tint_colors = TintColorCache(os.path.join(os.path.dirname(path), "colors.json"))
+    tint_colors.colors_by_hash[get_file_hash(path)] = "#1e52b8"
+
+    return tint_colors
+
+
+def test_it_reads_and_remembers_cover_metadata(
+    tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    The first time we see a cover we read its header; after that, we
+    use the saved metadata without opening the image.
+    """
+    index_path = os.path.join(tmp_path, "cover_metadata.json")
+    cover = os.path.join(tmp_path, "cover.png")
+    tint_colors = create_cover(cover, size=(30, 40))
+
+    index = CoverMetadataIndex(index_path, tint_colors=tint_colors)
+    metadata = index.get_metadata([cover])[cover]
+    index.save()
+
+    assert metadata["width"] == 30
+    assert metadata["height"] == 40
+    assert metadata["format"] == "PNG"
+    assert metadata["tint_color"] == "#1e52b8"
+
+    def fail_open(*args: object) -> None:
+        raise AssertionError("the cover shouldn't be opened")
+
+    monkeypatch.setattr("PIL.Image.open", fail_open)
+
+    tint_colors = TintColorCache(os.path.join(tmp_path, "missing.json"))
+
+    index = CoverMetadataIndex(index_path, tint_colors=tint_colors)
+    assert index.get_metadata([cover]) == {cover: metadata}
+
+
+def test_it_rereads_a_changed_cover(tmp_path: str) -> None:
+    """
+    If a cover is replaced, we read the new image.
+    """
+    index_path = os.path.join(tmp_path, "cover_metadata.json")
+    cover = os.path.join(tmp_path, "cover.png")
+
+    tint_colors = create_cover(cover, size=(30, 40))
+    index = CoverMetadataIndex(index_path, tint_colors=tint_colors)
+    assert index.get_metadata([cover])[cover]["width"] == 30
+
+    index.tint_colors = create_cover(cover, size=(60, 80))
+    assert index.get_metadata([cover])[cover]["width"] == 60
+
+
+def test_it_forgets_deleted_covers(tmp_path: str) -> None:
+    """
+    When a cover is deleted, its metadata is dropped from the index.
+    """
+    index_path = os.path.join(tmp_path, "cover_metadata.json")
+    cover = os.path.join(tmp_path, "cover.png")
+    tint_colors = create_cover(cover, size=(30, 40))
+
+    index = CoverMetadataIndex(index_path, tint_colors=tint_colors)
+    index.get_metadata([cover])
+    index.save()
+
+    os.remove(cover)
+
+    index = CoverMetadataIndex(index_path, tint_colors=tint_colors)
+    index.save()
+
+    with open(index_path) as in_file:
+        assert json.load(in_file) == {}
@@ -0,0 +1,152 @@
+"""
+Tests for `library_lookup.downloaders`.
+"""
+
+import asyncio
+import datetime
+import os
+from typing import Any
+
+import pytest
+
+from library_lookup import downloaders, serialisation
+from library_lookup.downloaders import CoverStore, SavedImage
+from library_lookup.fetch import AsyncFetcher
+
+from conftest import FixtureHandler
+
+
+def test_it_downloads_a_cover_image(
+    fixture_server: str, tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    A cover image is saved using the filename after redirects, and
+    then found on disk rather than downloaded a second time.
+    """
+    monkeypatch.chdir(tmp_path)
+    image_url = f"{fixture_server}/image-service.asp?ISBN=9781472281074&SIZE=l"
+
+    covers = CoverStore()
+
+    async def download() -> None:
+        with AsyncFetcher() as fetcher:
+            image = await covers.download(image_url, fetcher=fetcher)
+            assert image == {
+                "url": image_url,
+                "path": "covers/9781472281074.jpg",
+            }
+
+            again = await covers.download(image_url, fetcher=fetcher)
+            assert again == image
+
+    asyncio.run(download())
+
+    # We only fetched the image once: one redirect, then the image
+    assert FixtureHandler.status_codes == [302, 200]
+
+    with open("covers/9781472281074.jpg", "rb") as in_file:
+        assert in_file.read() == b"JPEG"
+
+    assert os.listdir("covers") == ["9781472281074.jpg"]
+
+
+def test_it_finds_covers_saved_by_a_previous_run(tmp_path: str) -> None:
+    """
+    Covers already in the folder are indexed by ISBN, and half-written
+    downloads are ignored.
+    """
+    directory = os.path.join(tmp_path, "covers")
+    os.makedirs(directory)
+
+    for name in ("9781472281074.jpg", "9780804692298.png.tmp"):
+        with open(os.path.join(directory, name), "wb") as out_file:
+            out_file.write(b"image")
+
+    covers = CoverStore(directory)
+
+    assert covers.find_existing(
+        "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074"
+    ) == {
+        "url": "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074",
+        "path": os.path.join(directory, "9781472281074.jpg"),
+    }
+
+    assert (
+        covers.find_existing(
+            "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9780804692298"
+        )
+        is None
+    )
+
+
+def test_it_syncs_covers_in_parallel(
+    fixture_server: str, tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Syncing a list of covers returns a saved image for each URL,
+    in the same order.
+    """
+    monkeypatch.chdir(tmp_path)
+    image_urls = [
+        f"{fixture_server}/image-service.asp?ISBN=9781472281074&SIZE=l",
+        f"{fixture_server}/image-service.asp?ISBN=9781472281074&SIZE=m",
+    ]
+
+    async def sync() -> list[SavedImage]:
+        with AsyncFetcher(max_connections=2) as fetcher:
+            return await CoverStore().sync(image_urls, fetcher=fetcher)
+
+    images = asyncio.run(sync())
+
+    assert [image["url"] for image in images] == image_urls
+    assert {image["path"] for image in images} == {"covers/9781472281074.jpg"}
+
+
+def test_it_remembers_blank_covers(
+    fixture_server: str, tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    If a book doesn't have a cover, we remember that, and don't ask
+    for it again until the record is out of date.
+    """
+    monkeypatch.chdir(tmp_path)
+    image_urls = [
+        f"{fixture_server}/image-service.asp?SIZE=l&ERR=blank.gif",
+        f"{fixture_server}/image-service.asp?SIZE=m&ERR=blank.gif",
+    ]
+
+    # Count how many times we write `blank_covers.json`
+    writes = []
+
+    def write_json(path: str, obj: object, **kwargs: Any) -> None:
+        writes.append(path)
+        serialisation.write_json(path, obj, **kwargs)
+
+    monkeypatch.setattr(downloaders, "write_json", write_json)
+
+    async def sync(covers: CoverStore) -> list[SavedImage]:
+        with AsyncFetcher(max_connections=2) as fetcher:
+            return await covers.sync(image_urls, fetcher=fetcher)
+
+    blank_images = [{"url": url, "path": None} for url in image_urls]
+
+    assert asyncio.run(sync(CoverStore())) == blank_images
+    assert sorted(FixtureHandler.status_codes) == [200, 200, 302, 302]
+
+    # We found two blank covers, but only wrote the file once
+    assert writes == ["covers/blank_covers.json"]
+
+    # A new store reads the blank covers from disk, so it doesn't
+    # make any requests, or write the file again.
+    assert asyncio.run(sync(CoverStore())) == blank_images
+    assert sorted(FixtureHandler.status_codes) == [200, 200, 302, 302]
+    assert writes == ["covers/blank_covers.json"]
+
+    assert os.listdir("covers") == ["blank_covers.json"]
+
+    # If we found the blank covers a long time ago, we check again.
+    covers = CoverStore(blank_max_age=datetime.timedelta(seconds=0))
+    assert covers.find_existing(image_urls[0]) is None
+
+    asyncio.run(sync(covers))
+    assert len(FixtureHandler.status_codes) == 8
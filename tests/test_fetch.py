@@ -0,0 +1,136 @@
+"""
+Tests for `library_lookup.fetch`.
+"""
+
+import asyncio
+import os
+import socket
+import threading
+from typing import Any
+
+import bs4
+import pytest
+
+from library_lookup.fetch import AsyncFetcher, ConnectionPool, HTTPError, Response
+from library_lookup.parsers import parse_availability_info
+
+from conftest import FixtureHandler
+
+
+def test_it_fetches_pages_concurrently(fixture_server: str) -> None:
+    """
+    Multiple pages can be fetched at once, and come back in order.
+    """
+
+    async def fetch_all() -> list[bytes]:
+        with AsyncFetcher(max_connections=4) as fetcher:
+            responses = await asyncio.gather(
+                fetcher.get(f"{fixture_server}/availability.html"),
+                fetcher.get(f"{fixture_server}/isbn_9780804692298.html"),
+                fetcher.get(f"{fixture_server}/isbn_9781847442260.html"),
+            )
+
+        return [resp["body"] for resp in responses]
+
+    bodies = asyncio.run(fetch_all())
+
+    for body, name in zip(
+        bodies,
+        [
+            "availability.html",
+            "isbn_9780804692298.html",
+            "isbn_9781847442260.html",
+        ],
+    ):
+        with open(os.path.join("tests/fixtures", name), "rb") as in_file:
+            assert body == in_file.read()
+
+    soup = bs4.BeautifulSoup(bodies[0], "html.parser")
+    assert len(parse_availability_info(soup)) == 3
+
+
+def test_it_has_a_thread_for_every_connection() -> None:
+    """
+    We can have as many requests in flight as we have connections,
+    however many CPUs there are.
+    """
+    barrier = threading.Barrier(16, timeout=5)
+
+    def get_sync(url: str, **kwargs: Any) -> Response:
+        # This only returns once all 16 requests are running at once.
+        barrier.wait()
+
+        return {"url": url, "status": 200, "headers": {}, "set_cookie": [], "body": b""}
+
+    async def fetch_all() -> list[Response]:
+        with AsyncFetcher(max_connections=16) as fetcher:
+            setattr(fetcher, "get_sync", get_sync)
+
+            return await asyncio.gather(
+                *(fetcher.get(f"https://example.com/{i}") for i in range(16))
+            )
+
+    assert len(asyncio.run(fetch_all())) == 16
+
+
+def test_it_reuses_connections(fixture_server: str) -> None:
+    """
+    Requests made one after another reuse the same connection.
+    """
+    with AsyncFetcher(max_connections=1) as fetcher:
+        for _ in range(3):
+            fetcher.get_sync(f"{fixture_server}/availability.html")
+
+    assert len(FixtureHandler.client_ports) == 1
+
+
+def test_it_throws_on_an_http_error(fixture_server: str) -> None:
+    """
+    A 404 response throws an `HTTPError`.
+    """
+    with AsyncFetcher() as fetcher:
+        with pytest.raises(HTTPError) as exc:
+            fetcher.get_sync(f"{fixture_server}/doesnotexist.html")
+
+    assert exc.value.response["status"] == 404
+
+
+def test_it_only_sends_cookies_to_the_cookie_host(fixture_server: str) -> None:
+    """
+    Session cookies are sent to the cookie host, but not anywhere else,
+    and new cookies from that host are remembered.
+    """
+    with AsyncFetcher(cookie_host="127.0.0.1:1", cookies={"session": "abc"}) as fetcher:
+        fetcher.get_sync(f"{fixture_server}/availability.html")
+
+    host = fixture_server.replace("http://", "")
+
+    with AsyncFetcher(cookie_host=host, cookies={"session": "abc"}) as fetcher:
+        fetcher.get_sync(f"{fixture_server}/availability.html")
+        fetcher.get_sync(f"{fixture_server}/login")
+        fetcher.get_sync(f"{fixture_server}/availability.html")
+
+    assert FixtureHandler.cookies_seen == [
+        None,
+        "session=abc",
+        "session=abc",
+        "session=refreshed",
+    ]
+
+
+def test_a_hung_server_times_out() -> None:
+    """
+    If a server never responds, the request times out rather than
+    waiting forever, and it frees its place in the pool.
+    """
+    # This socket accepts connections, but never reads or writes anything.
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        url = f"http://127.0.0.1:{server.getsockname()[1]}/"
+
+        pool = ConnectionPool(max_connections=1, timeout=0.1)
+
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                pool.request("GET", url, headers={}, body=None)
+
+        pool.close()
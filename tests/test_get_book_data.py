@@ -0,0 +1,317 @@
+"""
+Tests for `get_book_data.py`, which crawl the fake library website
+served by the `fixture_server` fixture.
+"""
+
+from collections.abc import Iterator
+import contextlib
+import gc
+import os
+from typing import Any
+
+import pytest
+
+from conftest import FixtureHandler
+from library_lookup.checkpoint import CrawlCheckpoint
+from library_lookup.serialisation import read_json
+from library_lookup.session import SessionFile
+
+
+# mechanize never closes the connections it uses to log in, so their
+# sockets are only closed when they're garbage collected.  Don't let
+# that fail the tests; see `crawl`.
+pytestmark = pytest.mark.filterwarnings("ignore:unclosed <socket:ResourceWarning")
+
+
+@contextlib.contextmanager
+def open_browser(get_book_data: Any, base_url: str, **kwargs: Any) -> Iterator[Any]:
+    """
+    Log in to the library website, and close the browser afterwards.
+    """
+    browser = get_book_data.LibraryBrowser(
+        base_url=base_url, username="card", password="password", **kwargs
+    )
+
+    try:
+        yield browser
+    finally:
+        browser.fetcher.close()
+        browser.browser.close()
+
+        del browser
+        gc.collect()
+
+
+def crawl(
+    get_book_data: Any,
+    base_url: str,
+    *,
+    checkpoint: CrawlCheckpoint | None = None,
+    **kwargs: Any,
+) -> list[dict[str, Any]]:
+    """
+    Log in to the library website, and fetch every book in my
+    default list (or the books after the checkpoint, if there is one).
+    """
+    with open_browser(get_book_data, base_url, **kwargs) as browser:
+        default_list = browser.get_default_list()
+        return list(
+            browser.get_books_in_list(default_list["url"], checkpoint=checkpoint)
+        )
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> str:
+    """
+    Run the test in a temporary directory, so covers and other files
+    saved by the crawl are thrown away afterwards.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_concurrent_and_sequential_crawls_get_the_same_books(
+    get_book_data: Any, fixture_server: str
+) -> None:
+    """
+    Fetching books concurrently gives the same books, in the same
+    order, as fetching them one at a time.
+    """
+    sequential_books = crawl(get_book_data, fixture_server, workers=1)
+    concurrent_books = crawl(get_book_data, fixture_server, workers=8)
+
+    for book in sequential_books + concurrent_books:
+        del book["fetched_at"]
+
+    assert [b["title"] for b in sequential_books] == [
+        "The first phone call from heaven",
+        "Voyager to inner lands",
+        "A book without an ISBN",
+    ]
+    assert concurrent_books == sequential_books
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_a_concurrent_crawl_uses_the_login_session(
+    get_book_data: Any, fixture_server: str
+) -> None:
+    """
+    In concurrent mode, every page is fetched with the session cookies
+    from logging in, and every book is fetched.
+    """
+    books = crawl(get_book_data, fixture_server, workers=8)
+
+    assert len(books) == 3
+
+    requests = list(zip(FixtureHandler.paths_requested, FixtureHandler.cookies_seen))
+
+    list_page_requests = [r for r in requests if r[0].startswith("/list_page_")]
+    record_requests = [r for r in requests if r[0].startswith("/isbn_")]
+
+    assert [path for path, _ in list_page_requests] == [
+        "/list_page_1.html",
+        "/list_page_2.html",
+    ]
+    assert len(record_requests) == 3
+
+    for _, cookie in list_page_requests + record_requests:
+        assert cookie is not None
+        assert "SESSION=session1" in cookie
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_it_resumes_from_a_checkpoint_without_fetching_done_pages(
+    get_book_data: Any, fixture_server: str
+) -> None:
+    """
+    If the checkpoint says we've done the first page, we go straight
+    to the second page, and only fetch the books on it.
+    """
+    checkpoint = CrawlCheckpoint("checkpoint.json", list_count=3)
+    checkpoint.complete_page(
+        0, book_count=2, next_page_url=f"{fixture_server}/list_page_2.html"
+    )
+
+    books = crawl(get_book_data, fixture_server, checkpoint=checkpoint)
+
+    assert [b["title"] for b in books] == ["A book without an ISBN"]
+    assert "/list_page_1.html" not in FixtureHandler.paths_requested
+    assert checkpoint.pages_completed == 2
+    assert checkpoint.books_completed == 3
+    assert checkpoint.next_page_url is None
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_it_follows_the_list_if_the_checkpoint_url_doesnt_work(
+    get_book_data: Any, fixture_server: str
+) -> None:
+    """
+    If the URL in the checkpoint doesn't open a page of the list, e.g.
+    because it was tied to an old session, we follow the "Next" links
+    from the first page, and skip the books on the pages we've done.
+    """
+    checkpoint = CrawlCheckpoint("checkpoint.json", list_count=3)
+    checkpoint.complete_page(0, book_count=2, next_page_url=f"{fixture_server}/")
+
+    books = crawl(get_book_data, fixture_server, checkpoint=checkpoint)
+
+    assert [b["title"] for b in books] == ["A book without an ISBN"]
+    assert [
+        path
+        for path in FixtureHandler.paths_requested
+        if path.startswith("/list_page_")
+    ] == ["/list_page_1.html", "/list_page_2.html"]
+    assert not any(
+        path.startswith("/isbn_9780804692298")
+        for path in FixtureHandler.paths_requested
+    )
+    assert checkpoint.pages_completed == 2
+    assert os.path.exists("checkpoint.json")
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_it_downloads_covers_after_the_crawl(
+    get_book_data: Any, fixture_server: str
+) -> None:
+    """
+    The crawl doesn't download any covers; they're all downloaded
+    together afterwards, and a blank cover is remembered.
+    """
+    with open_browser(get_book_data, fixture_server, workers=8) as browser:
+        default_list = browser.get_default_list()
+        books = list(browser.get_books_in_list(default_list["url"]))
+
+        assert not any(
+            path.startswith("/image-service.asp")
+            for path in FixtureHandler.paths_requested
+        )
+        assert all(book["image"]["path"] is None for book in books)
+
+        images = browser.download_covers(book["image"]["url"] for book in books)
+
+    assert [images[book["image"]["url"]]["path"] for book in books] == [
+        "covers/9781847442260.jpg",
+        "covers/9780804692298.jpg",
+        None,
+    ]
+    assert sorted(os.listdir("covers")) == [
+        "9780804692298.jpg",
+        "9781847442260.jpg",
+        "blank_covers.json",
+    ]
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+def test_it_reuses_a_saved_session(get_book_data: Any, fixture_server: str) -> None:
+    """
+    If there's a saved session, the next browser doesn't log in, and
+    only opens my saved lists to get the current size of the list.
+    """
+    session_file = SessionFile("session.json")
+
+    crawl(get_book_data, fixture_server, session_file=session_file)
+    assert FixtureHandler.sessions == {"session1"}
+
+    # We don't save the size of the list, which could change.
+    assert read_json("session.json")["saved_lists_url"] == (
+        f"{fixture_server}/saved_lists.html"
+    )
+    assert "default_list" not in read_json("session.json")
+
+    FixtureHandler.paths_requested.clear()
+
+    with open_browser(
+        get_book_data, fixture_server, session_file=session_file
+    ) as browser:
+        default_list = browser.get_default_list()
+        books = list(browser.get_books_in_list(default_list["url"]))
+
+    assert default_list == {"count": 3, "url": f"{fixture_server}/list_page_1.html"}
+    assert len(books) == 3
+
+    assert FixtureHandler.sessions == {"session1"}
+    assert FixtureHandler.paths_requested.count("/saved_lists.html") == 1
+    assert "/" not in FixtureHandler.paths_requested
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+@pytest.mark.parametrize("logged_out_response", ["redirect", "message"])
+def test_it_logs_in_if_the_saved_session_has_expired(
+    get_book_data: Any, fixture_server: str, logged_out_response: str
+) -> None:
+    """
+    If the saved session has expired, we notice before we start the
+    crawl, log in again, and save the new session.
+    """
+    FixtureHandler.logged_out_response = logged_out_response
+
+    session_file = SessionFile("session.json")
+    session_file.save(
+        base_url=fixture_server,
+        cookies={"SESSION": "expired"},
+        saved_lists_url=f"{fixture_server}/saved_lists.html",
+    )
+
+    books = crawl(get_book_data, fixture_server, session_file=session_file)
+
+    assert len(books) == 3
+    assert FixtureHandler.sessions == {"session1"}
+
+    saved_session = session_file.load(base_url=fixture_server)
+    assert saved_session is not None
+    assert saved_session["cookies"]["SESSION"] == "session1"
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+@pytest.mark.parametrize("logged_out_response", ["redirect", "message"])
+def test_it_logs_in_again_if_the_session_expires_during_a_crawl(
+    get_book_data: Any, fixture_server: str, logged_out_response: str
+) -> None:
+    """
+    If the session expires part way through a crawl, we log in again
+    and carry on, whether we're sent back to the homepage or told
+    that the session has expired.
+    """
+    FixtureHandler.logged_out_response = logged_out_response
+
+    with open_browser(get_book_data, fixture_server, workers=8) as browser:
+        default_list = browser.get_default_list()
+
+        # Log everybody out
+        FixtureHandler.sessions.clear()
+
+        books = list(browser.get_books_in_list(default_list["url"]))
+        counters = browser.metrics.summary()["counters"]
+
+    assert [b["title"] for b in books] == [
+        "The first phone call from heaven",
+        "Voyager to inner lands",
+        "A book without an ISBN",
+    ]
+    assert FixtureHandler.sessions == {"session2"}
+    assert counters["session_expired"] == 1
+
+
+@pytest.mark.usefixtures("in_tmp_path")
+@pytest.mark.parametrize("logged_out_response", ["redirect", "message", "dashboard"])
+def test_it_logs_in_again_if_a_record_page_is_missing(
+    get_book_data: Any, fixture_server: str, logged_out_response: str
+) -> None:
+    """
+    If we get a record page that doesn't have the record details, we
+    log in again and retry, even if the page doesn't say why.
+    """
+    with open_browser(get_book_data, fixture_server) as browser:
+        browser.get_default_list()
+
+        FixtureHandler.logged_out_response = logged_out_response
+        FixtureHandler.record_pages_need_login = True
+        FixtureHandler.sessions.clear()
+
+        record_details = browser.get_record_details("/isbn_9780804692298.html")
+        counters = browser.metrics.summary()["counters"]
+
+    assert record_details["ISBN"] == "9780804692298"
+    assert FixtureHandler.sessions == {"session2"}
+    assert counters["session_expired"] == 1
@@ -0,0 +1,199 @@
+"""
+Tests for `library_lookup.http_cache`.
+"""
+
+import datetime
+import os
+
+import pytest
+
+from library_lookup.fetch import Response
+from library_lookup.http_cache import (
+    CachingFetcher,
+    NotInCacheError,
+    ResponseCache,
+    get_ttl,
+    normalise_url,
+)
+
+from conftest import FixtureHandler
+
+
+@pytest.mark.parametrize(
+    ["url", "normalised_url"],
+    [
+        (
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142",
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/70566229",
+        ),
+        (
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/347793/70566229",
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/70566229",
+        ),
+        (
+            "https://HERTS.spydus.co.uk/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/313828/71369607?NREC=20",
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/71369607?NREC=20",
+        ),
+        (
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/ENQ/WPAC/BIBENQ?SETLVL=&BRN=2512994",
+            "https://herts.spydus.co.uk/cgi-bin/spydus.exe/ENQ/WPAC/BIBENQ?BRN=2512994&SETLVL=",
+        ),
+        (
+            "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&SIZE=l&DBM=1ipoizw9i9eq&ERR=blank.gif",
+            "https://www.bibdsl.co.uk/xmla/image-service.asp?ERR=blank.gif&ISBN=9781472281074&SIZE=l",
+        ),
+    ],
+)
+def test_normalise_url(url: str, normalised_url: str) -> None:
+    """
+    Tests for `normalise_url`.
+    """
+    assert normalise_url(url) == normalised_url
+
+
+def test_record_details_live_longer_than_availability() -> None:
+    """
+    Record details are cached for longer than availability.
+    """
+    record_ttl = get_ttl("/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142")
+    availability_ttl = get_ttl("/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/347793/70566229")
+
+    assert record_ttl > availability_ttl
+
+
+def test_it_stores_responses(tmp_path: str) -> None:
+    """
+    A response can be stored and retrieved, including by a URL from
+    a different session.
+    """
+    cache = ResponseCache(os.path.join(tmp_path, "cache.sqlite"))
+
+    resp: Response = {
+        "url": "https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/1/2,3",
+        "status": 200,
+        "headers": {"content-type": "text/html"},
+        "set_cookie": [],
+        "body": b"<html>hello world</html>",
+    }
+    cache.put(resp["url"], resp)
+
+    cached = cache.get(
+        "https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/4/2,5"
+    )
+    assert cached is not None
+
+    cached_response, age = cached
+    assert cached_response == resp
+    assert age < datetime.timedelta(seconds=5)
+
+    assert cache.get("https://herts.spydus.co.uk/not-cached") is None
+
+    cache.close()
+
+
+def test_it_deletes_responses(tmp_path: str) -> None:
+    """
+    A response can be deleted, including by a URL from a different session.
+    """
+    cache = ResponseCache(os.path.join(tmp_path, "cache.sqlite"))
+
+    resp: Response = {
+        "url": "https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/1/2,3",
+        "status": 200,
+        "headers": {"content-type": "text/html"},
+        "set_cookie": [],
+        "body": b"<p>Session must be logged in to display this page</p>",
+    }
+    cache.put(resp["url"], resp)
+
+    cache.delete("https://herts.spydus.co.uk/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/4/2")
+    assert cache.get(resp["url"]) is None
+
+    cache.close()
+
+
+class TestCachingFetcher:
+    """
+    Tests for `CachingFetcher`.
+    """
+
+    def test_fresh_responses_come_from_the_cache(
+        self, fixture_server: str, tmp_path: str
+    ) -> None:
+        """
+        If a response is fresh, we don't make a second request.
+        """
+        cache = ResponseCache(os.path.join(tmp_path, "cache.sqlite"))
+        url = f"{fixture_server}/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/1/2"
+
+        with CachingFetcher(cache=cache) as fetcher:
+            cache.put(
+                url,
+                {
+                    "url": url,
+                    "status": 200,
+                    "headers": {},
+                    "set_cookie": [],
+                    "body": b"cached",
+                },
+            )
+
+            assert fetcher.get_sync(url)["body"] == b"cached"
+
+        assert FixtureHandler.cookies_seen == []
+        cache.close()
+
+    def test_stale_responses_are_revalidated(
+        self, fixture_server: str, tmp_path: str
+    ) -> None:
+        """
+        If a response is stale, we make a conditional request, and
+        reuse the cached body if it hasn't changed.
+        """
+        cache = ResponseCache(os.path.join(tmp_path, "cache.sqlite"))
+        url = f"{fixture_server}/availability.html"
+
+        with CachingFetcher(cache=cache) as fetcher:
+            first = fetcher.get_sync(url)
+            assert first["status"] == 200
+            assert "last-modified" in first["headers"]
+
+            # Make the cached response look old
+            with cache._conn:
+                cache._conn.execute("UPDATE responses SET stored_at = 0")
+
+            second = fetcher.get_sync(url)
+            assert second == first
+
+        assert FixtureHandler.status_codes == [200, 304]
+
+        cached = cache.get(url)
+        assert cached is not None
+        assert cached[1] < datetime.timedelta(seconds=5)
+
+        cache.close()
+
+    def test_offline_replays_from_the_cache(
+        self, fixture_server: str, tmp_path: str
+    ) -> None:
+        """
+        In offline mode, responses come from the cache however old they
+        are, and missing responses throw an error.
+        """
+        cache = ResponseCache(os.path.join(tmp_path, "cache.sqlite"))
+        url = f"{fixture_server}/availability.html"
+
+        with CachingFetcher(cache=cache) as fetcher:
+            online = fetcher.get_sync(url)
+
+        with cache._conn:
+            cache._conn.execute("UPDATE responses SET stored_at = 0")
+
+        with CachingFetcher(cache=cache, offline=True) as fetcher:
+            assert fetcher.get_sync(url) == online
+
+            with pytest.raises(NotInCacheError):
+                fetcher.get_sync(f"{fixture_server}/isbn_9780804692298.html")
+
+        assert FixtureHandler.status_codes == [200]
+        cache.close()
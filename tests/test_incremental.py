@@ -0,0 +1,189 @@
+"""
+Tests for `library_lookup.incremental`.
+"""
+
+import datetime
+import json
+import os
+from typing import Any
+
+import pytest
+
+from library_lookup.incremental import PreviousCrawl, get_isbns
+
+
+def make_book(
+    *, isbn: str | list[str], image_path: str | None = None, **kwargs: Any
+) -> dict[str, Any]:
+    """
+    Create a book in the shape stored in `books.json`.
+    """
+    return {
+        "title": "Adulthood rites",
+        "record_details": {
+            "ISBN": isbn,
+            "BRN": "1234",
+            "Bookmark link": "https://herts.spydus.co.uk/cgi-bin/spydus.exe/ENQ/WPAC/BIBENQ?SETLVL=&BRN=1234",
+        },
+        "image": {
+            "url": "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&SIZE=l",
+            "path": image_path,
+        },
+        "availability": [],
+        **kwargs,
+    }
+
+
+@pytest.mark.parametrize(
+    ["isbn", "expected"],
+    [
+        ("9780804692298", ["9780804692298"]),
+        (
+            ["9781847442260 (hbk)", "9781405517386 (ePub ebook)"],
+            ["9781847442260", "9781405517386"],
+        ),
+    ],
+)
+def test_get_isbns(isbn: str | list[str], expected: list[str]) -> None:
+    """
+    Tests for `get_isbns`.
+    """
+    assert get_isbns({"ISBN": isbn}) == expected
+
+
+def test_get_isbns_without_isbn() -> None:
+    """
+    A book without an ISBN has no ISBNs.
+    """
+    assert get_isbns({"Main title": "A book without an ISBN"}) == []
+
+
+class TestPreviousCrawl:
+    """
+    Tests for `PreviousCrawl`.
+    """
+
+    def test_it_finds_a_book_by_isbn(self) -> None:
+        """
+        A book can be found by any of its ISBNs, or by the ISBN in
+        the URL of its cover image.
+        """
+        crawl = PreviousCrawl(
+            [make_book(isbn=["9781847442260 (hbk)", "9781405517386 (ePub ebook)"])],
+            generated_at=datetime.datetime.now(),
+            max_age=datetime.timedelta(days=30),
+        )
+
+        for key in ["9781847442260", "9781405517386", "9781472281074"]:
+            cached_book = crawl.lookup(key)
+            assert cached_book is not None
+            assert cached_book["record_details"]["BRN"] == "1234"
+
+        assert crawl.lookup("9780000000000") is None
+        assert crawl.lookup(None) is None
+
+    def test_it_finds_a_book_by_bookmark_link(self) -> None:
+        """
+        A book can be found by its bookmark link.
+        """
+        crawl = PreviousCrawl(
+            [make_book(isbn="9781847442260")],
+            generated_at=datetime.datetime.now(),
+            max_age=datetime.timedelta(days=30),
+        )
+
+        assert (
+            crawl.lookup(
+                "https://herts.spydus.co.uk/cgi-bin/spydus.exe/ENQ/WPAC/BIBENQ?SETLVL=&BRN=1234"
+            )
+            is not None
+        )
+
+    def test_it_skips_expired_books(self) -> None:
+        """
+        A book whose record details are older than the max age is
+        not reused.
+        """
+        now = datetime.datetime.now()
+
+        crawl = PreviousCrawl(
+            [
+                make_book(
+                    isbn="9781111111111",
+                    fetched_at=(now - datetime.timedelta(days=10)).isoformat(),
+                ),
+                make_book(
+                    isbn="9782222222222",
+                    fetched_at=(now - datetime.timedelta(days=1)).isoformat(),
+                ),
+            ],
+            generated_at=now,
+            max_age=datetime.timedelta(days=7),
+        )
+
+        assert crawl.lookup("9781111111111") is None
+        assert crawl.lookup("9782222222222") is not None
+
+    def test_it_uses_generated_at_for_old_books(self) -> None:
+        """
+        If a book doesn't record when it was fetched, the time of the
+        previous crawl is used instead.
+        """
+        crawl = PreviousCrawl(
+            [make_book(isbn="9781847442260")],
+            generated_at=datetime.datetime.now() - datetime.timedelta(days=10),
+            max_age=datetime.timedelta(days=7),
+        )
+
+        assert crawl.lookup("9781847442260") is None
+
+    def test_it_skips_books_whose_cover_is_missing(self, tmp_path: str) -> None:
+        """
+        A book isn't reused if its cover image has been deleted.
+        """
+        existing_cover = os.path.join(tmp_path, "9781111111111.jpg")
+        with open(existing_cover, "wb") as out_file:
+            out_file.write(b"JPEG")
+
+        crawl = PreviousCrawl(
+            [
+                make_book(isbn="9781111111111", image_path=existing_cover),
+                make_book(
+                    isbn="9782222222222",
+                    image_path=os.path.join(tmp_path, "9782222222222.jpg"),
+                ),
+            ],
+            generated_at=datetime.datetime.now(),
+            max_age=datetime.timedelta(days=7),
+        )
+
+        assert crawl.lookup("9781111111111") is not None
+        assert crawl.lookup("9782222222222") is None
+
+    def test_it_loads_a_file(self, tmp_path: str) -> None:
+        """
+        A previous crawl can be loaded from a JSON file.
+        """
+        path = os.path.join(tmp_path, "books.json")
+
+        with open(path, "w") as out_file:
+            out_file.write(
+                json.dumps(
+                    {
+                        "generated_at": datetime.datetime.now().isoformat(),
+                        "books": [make_book(isbn="9781847442260")],
+                    }
+                )
+            )
+
+        crawl = PreviousCrawl.from_file(path, max_age=datetime.timedelta(days=7))
+        assert crawl.lookup("9781847442260") is not None
+
+    def test_a_missing_file_is_empty(self, tmp_path: str) -> None:
+        """
+        If there's no previous crawl, nothing is reused.
+        """
+        crawl = PreviousCrawl.from_file(
+            os.path.join(tmp_path, "books.json"), max_age=datetime.timedelta(days=7)
+        )
+        assert crawl.books_by_key == {}
@@ -0,0 +1,133 @@
+"""
+Tests for `library_lookup.metrics`.
+"""
+
+import os
+
+import pytest
+
+from library_lookup.fetch import AsyncFetcher, HTTPError
+from library_lookup.metrics import Metrics, get_histogram, get_request_kind
+from library_lookup.serialisation import read_json
+
+
+@pytest.mark.parametrize(
+    ["url", "kind"],
+    [
+        ("/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142", "record"),
+        ("/cgi-bin/spydus.exe/XHLD/WPAC/ALLENQ/347793/70566229", "availability"),
+        ("/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/313828/71369607?NREC=20", "list"),
+        ("https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=978", "cover"),
+        ("https://www.bibdsl.co.uk/bds-images/l/123456/978.jpg", "cover"),
+        ("https://herts.spydus.co.uk/", "other"),
+    ],
+)
+def test_get_request_kind(url: str, kind: str) -> None:
+    """
+    Tests for `get_request_kind`.
+    """
+    assert get_request_kind(url) == kind
+
+
+def test_get_histogram() -> None:
+    """
+    Durations are counted in the right buckets, and empty buckets
+    are left out.
+    """
+    assert get_histogram([0.0005, 0.0009, 0.003, 0.045, 60]) == {
+        "<1ms": 2,
+        "<5ms": 1,
+        "<50ms": 1,
+        ">=10000ms": 1,
+    }
+
+
+def test_it_summarises_spans() -> None:
+    """
+    The summary has the count, bytes and percentiles of every span,
+    plus the counters.
+    """
+    metrics = Metrics()
+
+    for _ in range(10):
+        with metrics.span("request:record") as span:
+            span.bytes = 100
+
+    metrics.add_duration("choose_tint_color", 0.5)
+    metrics.add_duration("choose_tint_color", 1.5)
+    metrics.count("retries")
+    metrics.count("retries")
+
+    summary = metrics.summary()
+
+    assert summary["spans"]["request:record"]["count"] == 10
+    assert summary["spans"]["request:record"]["bytes"] == 1000
+    assert summary["spans"]["choose_tint_color"]["total"] == 2.0
+    assert summary["spans"]["choose_tint_color"]["max"] == 1.5
+    assert summary["spans"]["choose_tint_color"]["p50"] == 1.5
+    assert summary["counters"] == {"retries": 2}
+
+
+def test_it_records_a_span_if_there_is_an_error() -> None:
+    """
+    A span is recorded even if the code inside it throws an exception.
+    """
+    metrics = Metrics()
+
+    with pytest.raises(ValueError):
+        with metrics.span("parse:record"):
+            raise ValueError
+
+    assert metrics.summary()["spans"]["parse:record"]["count"] == 1
+
+
+def test_it_writes_a_trace(tmp_path: str) -> None:
+    """
+    The trace file has an event for every span, in the Chrome trace
+    event format.
+    """
+    metrics = Metrics(trace=True)
+
+    with metrics.span("login"):
+        with metrics.span("request:other", url="/") as span:
+            span.bytes = 5
+
+    path = os.path.join(tmp_path, "trace.json")
+    metrics.write_trace(path)
+
+    events = read_json(path)["traceEvents"]
+
+    assert [e["name"] for e in events] == ["request:other", "login"]
+    assert all(e["ph"] == "X" for e in events)
+    assert events[0]["args"] == {"url": "/", "bytes": 5}
+    assert events[1]["ts"] <= events[0]["ts"]
+    assert events[1]["dur"] >= events[0]["dur"]
+
+
+def test_it_only_writes_a_trace_if_asked(tmp_path: str) -> None:
+    """
+    We don't keep the individual spans unless `trace` is True, so we
+    can't write a trace file.
+    """
+    with pytest.raises(ValueError):
+        Metrics().write_trace(os.path.join(tmp_path, "trace.json"))
+
+
+def test_the_fetcher_records_requests(fixture_server: str) -> None:
+    """
+    The fetcher records the size of every request, including redirects,
+    and counts HTTP errors.
+    """
+    metrics = Metrics()
+
+    with AsyncFetcher(metrics=metrics) as fetcher:
+        fetcher.get_sync(f"{fixture_server}/image-service.asp?ISBN=9781472281074")
+
+        with pytest.raises(HTTPError):
+            fetcher.get_sync(f"{fixture_server}/doesnotexist.html")
+
+    summary = metrics.summary()
+
+    assert summary["spans"]["request:cover"]["count"] == 2
+    assert summary["spans"]["request:cover"]["bytes"] == 4
+    assert summary["counters"] == {"http_errors": 1}
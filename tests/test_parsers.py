@@ -5,21 +5,30 @@ Tests for `library_lookup.parsers`.
 import os
 
 import bs4
+import pytest
 
 from library_lookup.parsers import (
+    AVAILABILITY_REGIONS,
+    RECORD_DETAILS_REGIONS,
+    get_available_backends,
     get_cover_image_url,
     get_url_of_next_page,
+    make_soup,
     parse_availability_info,
     parse_record_details,
 )
 
 
-def get_fixture(fixture_name: str) -> bs4.BeautifulSoup:
+def get_fixture(
+    fixture_name: str,
+    backend: str = "html.parser",
+    parse_only: bs4.SoupStrainer | None = None,
+) -> bs4.BeautifulSoup:
     """
     Read a fixture as BeautifulSoup from `tests/fixtures`.
     """
     with open(os.path.join("tests/fixtures", fixture_name)) as in_file:
-        return bs4.BeautifulSoup(in_file.read(), "html.parser")
+        return make_soup(in_file.read(), backend=backend, parse_only=parse_only)
 
 
 class TestParseAvailabilityInfo:
@@ -174,3 +183,114 @@ def test_get_cover_image_url() -> None:
         get_cover_image_url(img_elem)
         == "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&SIZE=l&DBM=1ipoizw9i9eqiwirork2o1o4j12nreflvemxskafsqa&ERR=blank.gif&SSL=true%2A%2A"
     )
+
+
+@pytest.mark.parametrize("backend", get_available_backends())
+class TestParserBackends:
+    """
+    Every parser backend gives the same results as html.parser.
+    """
+
+    def test_parse_availability_info(self, backend: str) -> None:
+        """
+        `parse_availability_info` gives the same result with every backend.
+        """
+        assert parse_availability_info(
+            get_fixture("availability.html", backend=backend)
+        ) == parse_availability_info(get_fixture("availability.html"))
+
+    @pytest.mark.parametrize(
+        "fixture_name", ["isbn_9780804692298.html", "isbn_9781847442260.html"]
+    )
+    def test_parse_record_details(self, backend: str, fixture_name: str) -> None:
+        """
+        `parse_record_details` gives the same result with every backend.
+        """
+        url = "/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142"
+
+        assert parse_record_details(
+            get_fixture(fixture_name, backend=backend), url=url
+        ) == parse_record_details(get_fixture(fixture_name), url=url)
+
+    def test_get_url_of_next_page(self, backend: str) -> None:
+        """
+        `get_url_of_next_page` gives the same result with every backend.
+        """
+        soup = make_soup(
+            """
+            <nav class="prvnxt result-pages-prvnxt">
+              <ul class="list-inline mb-0">
+                <li class="list-inline-item nxt">
+                  <a href="/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/313828/71369607?NREC=20">
+                  Next page of search results
+                  </a>
+                </li>
+              </ul>
+            </nav>
+            """,
+            backend=backend,
+        )
+
+        assert (
+            get_url_of_next_page(soup)
+            == "/cgi-bin/spydus.exe/SET/WPAC/ALLENQ/313828/71369607?NREC=20"
+        )
+
+    def test_get_cover_image_url(self, backend: str) -> None:
+        """
+        `get_cover_image_url` gives the same result with every backend.
+        """
+        soup = make_soup(
+            """
+            <img longdesc="https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&amp;SIZE=s">
+            """,
+            backend=backend,
+        )
+        img_elem = soup.find("img")
+        assert isinstance(img_elem, bs4.Tag)
+
+        assert (
+            get_cover_image_url(img_elem)
+            == "https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=9781472281074&SIZE=l"
+        )
+
+
+@pytest.mark.parametrize("backend", get_available_backends())
+class TestPartialParsing:
+    """
+    Parsing only the regions each parser needs gives the same results
+    as parsing the whole page.
+    """
+
+    def test_parse_availability_info(self, backend: str) -> None:
+        """
+        `parse_availability_info` only needs `AVAILABILITY_REGIONS`.
+        """
+        strained_soup = get_fixture(
+            "availability.html", backend=backend, parse_only=AVAILABILITY_REGIONS
+        )
+        full_soup = get_fixture("availability.html")
+
+        assert len(strained_soup.find_all()) < len(full_soup.find_all())
+        assert parse_availability_info(strained_soup) == parse_availability_info(
+            full_soup
+        )
+
+    @pytest.mark.parametrize(
+        "fixture_name", ["isbn_9780804692298.html", "isbn_9781847442260.html"]
+    )
+    def test_parse_record_details(self, backend: str, fixture_name: str) -> None:
+        """
+        `parse_record_details` only needs `RECORD_DETAILS_REGIONS`.
+        """
+        url = "/cgi-bin/spydus.exe/FULL/WPAC/ALLENQ/347793/70566229,142"
+
+        strained_soup = get_fixture(
+            fixture_name, backend=backend, parse_only=RECORD_DETAILS_REGIONS
+        )
+        full_soup = get_fixture(fixture_name)
+
+        assert len(strained_soup.find_all()) < len(full_soup.find_all())
+        assert parse_record_details(strained_soup, url=url) == parse_record_details(
+            full_soup, url=url
+        )
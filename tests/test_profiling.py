@@ -0,0 +1,80 @@
+"""
+Tests for `library_lookup.profiling`.
+"""
+
+import json
+import os
+import pstats
+
+from library_lookup.metrics import Metrics
+from library_lookup.profiling import Profiler, get_profile_name
+
+
+def test_get_profile_name() -> None:
+    """
+    Stage names are turned into safe filenames.
+    """
+    assert get_profile_name("render") == "render.prof"
+    assert get_profile_name("parse:record") == "parse_record.prof"
+
+
+def test_it_saves_a_profile_for_each_stage(tmp_path: str) -> None:
+    """
+    Each stage is saved as a `.prof` file, and the profile includes
+    the functions called inside the stage.
+    """
+    profiler = Profiler(os.path.join(tmp_path, "profiles"))
+
+    with profiler.stage("encode"):
+        json.dumps({"books": list(range(100))})
+
+    stats = pstats.Stats(os.path.join(tmp_path, "profiles", "encode.prof"))
+
+    assert "dumps" in stats.get_stats_profile().func_profiles
+
+
+def test_it_combines_repeated_stages(tmp_path: str) -> None:
+    """
+    If a stage runs more than once, the profile includes every run.
+    """
+    profiler = Profiler(str(tmp_path))
+
+    for _ in range(3):
+        with profiler.stage("encode"):
+            json.dumps([1, 2, 3])
+
+    func_profiles = profiler.stats["encode"].get_stats_profile().func_profiles
+
+    assert func_profiles["dumps"].ncalls == "3"
+
+
+def test_a_nested_stage_is_part_of_the_outer_stage(tmp_path: str) -> None:
+    """
+    If a stage starts inside another, it's included in the outer
+    stage's profile rather than getting its own.
+    """
+    profiler = Profiler(str(tmp_path))
+
+    with profiler.stage("crawl"):
+        with profiler.stage("login"):
+            json.dumps([1, 2, 3])
+
+    assert os.listdir(tmp_path) == ["crawl.prof"]
+
+    func_profiles = profiler.stats["crawl"].get_stats_profile().func_profiles
+    assert "dumps" in func_profiles
+
+
+def test_metrics_profiles_stages_but_not_spans(tmp_path: str) -> None:
+    """
+    If the metrics have a profiler, stages are profiled and timed, and
+    spans are only timed.
+    """
+    metrics = Metrics(profiler=Profiler(str(tmp_path)))
+
+    with metrics.stage("render"):
+        with metrics.span("parse:record"):
+            pass
+
+    assert os.listdir(tmp_path) == ["render.prof"]
+    assert set(metrics.summary()["spans"]) == {"render", "parse:record"}
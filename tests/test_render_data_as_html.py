@@ -2,9 +2,20 @@
 Tests for `library_lookup.parsers`.
 """
 
+import os
+
 import pytest
 
-from library_lookup.render_data_as_html import display_author_name
+from library_lookup.render_data_as_html import (
+    create_jinja_environment,
+    display_author_name,
+    display_title,
+    get_branch_bitset,
+    get_client_book_data,
+    get_sort_title,
+    rgba,
+    write_hashed_json,
+)
 
 
 @pytest.mark.parametrize(
@@ -22,3 +33,153 @@ def test_display_author_name(label: str, display_label: str) -> None:
     Tests for `display_author_name`.
     """
     assert display_author_name(label) == display_label
+
+
+def test_filters_are_memoised() -> None:
+    """
+    Repeated calls to the filters are served from a cache.
+    """
+    display_title.cache_clear()
+
+    assert display_title("the left hand of darkness") == "The Left Hand of Darkness"
+    assert display_title("the left hand of darkness") == "The Left Hand of Darkness"
+
+    assert display_title.cache_info().hits == 1
+    assert rgba("#ff0102", 0.5) == "rgba(255, 1, 2, 0.5)"
+
+
+def test_it_caches_compiled_templates(tmp_path: str) -> None:
+    """
+    Compiled templates are saved to the bytecode cache, and the filters
+    are available in templates.
+    """
+    template_dir = os.path.join(tmp_path, "templates")
+    cache_dir = os.path.join(tmp_path, "cache")
+
+    os.makedirs(template_dir)
+    with open(os.path.join(template_dir, "book.html"), "w") as out_file:
+        out_file.write("{{ title | titlecase }} by {{ author | author_name }}")
+
+    env = create_jinja_environment(template_dir, bytecode_cache_dir=cache_dir)
+    template = env.get_template("book.html")
+
+    assert (
+        template.render(title="kindred", author="Butler, Octavia E., 1947-2006")
+        == "Kindred by Octavia E. Butler"
+    )
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_get_client_book_data() -> None:
+    """
+    Only the fields used by `library_lookup.js` are kept, plus a bitset
+    and count for the branches with copies of each book.
+    """
+    book = {
+        "title": "Kindred",
+        "record_details": {"BRN": "1234", "Summary": ["A long summary"]},
+        "availability": [
+            {
+                "location": "Ware Library",
+                "status": "Available",
+                "collection": "Fiction",
+                "call_number": "General fiction pbk",
+                "status_since": None,
+            },
+            {
+                "location": "Radlett Library",
+                "status": "On loan",
+                "collection": "Fiction",
+                "call_number": "General fiction pbk",
+                "status_since": None,
+            },
+        ],
+    }
+
+    assert get_client_book_data(
+        [book], branches={"Ware Library", "Radlett Library"}
+    ) == {
+        "branches": ["Radlett Library", "Ware Library"],
+        "branch_counts": [0, 1],
+        "books": [
+            {
+                "brn": "1234",
+                "branches": [0b10],
+                "copies": [
+                    {
+                        "location": "Ware Library",
+                        "collection": "Fiction",
+                        "call_number": "General fiction pbk",
+                        "branch": 1,
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def test_get_branch_bitset() -> None:
+    """
+    Bitsets with more than 32 branches are split into 32-bit words.
+    """
+    assert get_branch_bitset([], branch_count=0) == []
+    assert get_branch_bitset([0, 2], branch_count=3) == [0b101]
+    assert get_branch_bitset([31, 32, 40], branch_count=41) == [2**31, 0b100000001]
+
+
+@pytest.mark.parametrize(
+    ["title", "sort_title"],
+    [
+        ("The Left Hand of Darkness", "left hand of darkness"),
+        ("Theory of Bastards", "theory of bastards"),
+    ],
+)
+def test_get_sort_title(title: str, sort_title: str) -> None:
+    """
+    Tests for `get_sort_title`.
+    """
+    assert get_sort_title(title) == sort_title
+
+
+def test_write_hashed_json(tmp_path: str) -> None:
+    """
+    The file name changes with the contents, and only the previous
+    version of the file is kept.
+    """
+    name1 = write_hashed_json([1, 2, 3], directory=str(tmp_path), prefix="books")
+    name2 = write_hashed_json([1, 2, 3], directory=str(tmp_path), prefix="books")
+    assert name1 == name2
+
+    with open(os.path.join(tmp_path, name1)) as in_file:
+        assert in_file.read() == "[1,2,3]"
+
+    # Make the first version look older, so we know which is newest
+    # even if the files are written in the same instant.
+    os.utime(os.path.join(tmp_path, name1), (1000, 1000))
+
+    name3 = write_hashed_json([4, 5, 6], directory=str(tmp_path), prefix="books")
+    assert name3 != name1
+    assert sorted(os.listdir(tmp_path)) == sorted([name1, name3])
+
+    os.utime(os.path.join(tmp_path, name3), (2000, 2000))
+
+    name4 = write_hashed_json([7, 8, 9], directory=str(tmp_path), prefix="books")
+    assert sorted(os.listdir(tmp_path)) == sorted([name3, name4])
+
+
+def test_write_hashed_json_keeps_a_version_it_writes_again(tmp_path: str) -> None:
+    """
+    If we write a version which already exists, it becomes the newest
+    version, and isn't deleted.
+    """
+    name1 = write_hashed_json([1, 2, 3], directory=str(tmp_path), prefix="books")
+    os.utime(os.path.join(tmp_path, name1), (1000, 1000))
+
+    name2 = write_hashed_json([4, 5, 6], directory=str(tmp_path), prefix="books")
+    os.utime(os.path.join(tmp_path, name2), (2000, 2000))
+
+    assert (
+        write_hashed_json([1, 2, 3], directory=str(tmp_path), prefix="books", keep=1)
+        == name1
+    )
+    assert os.listdir(tmp_path) == [name1]
@@ -0,0 +1,105 @@
+"""
+Tests for `library_lookup.serialisation`.
+"""
+
+import json
+import os
+import stat
+from typing import Any
+
+import pytest
+
+from library_lookup.serialisation import (
+    dumps,
+    get_available_json_backends,
+    loads,
+    read_json,
+    write_json,
+)
+
+
+DATA: Any = {
+    "generated_at": "2024-07-02T09:00:00",
+    "books": [
+        {
+            "title": "A Cuban girl's guide to tea and tomorrow",
+            "record_details": {"Summary": ["A book — with “quotes”"], "BRN": "1"},
+            "image": {"url": "https://example.com/cover.jpg", "path": None},
+            "availability": [],
+            "tags": {},
+            "publication_year": 2020,
+        }
+    ],
+}
+
+
+def test_stdlib_json_is_always_available() -> None:
+    """
+    The standard library backend is always available, as a fallback.
+    """
+    assert get_available_json_backends()[-1] == "json"
+
+
+@pytest.mark.parametrize("backend", get_available_json_backends())
+def test_pretty_output_matches_json_dumps(backend: str) -> None:
+    """
+    Pretty output is the same as the standard library, with sorted keys
+    and two-space indents.
+    """
+    assert dumps(DATA, pretty=True, backend=backend) == json.dumps(
+        DATA, indent=2, sort_keys=True, ensure_ascii=False
+    ).encode("utf8")
+
+
+@pytest.mark.parametrize("pretty", [True, False])
+def test_backends_agree(pretty: bool) -> None:
+    """
+    Every backend gives the same output.
+    """
+    outputs = {
+        dumps(DATA, pretty=pretty, backend=backend)
+        for backend in get_available_json_backends()
+    }
+
+    assert len(outputs) == 1
+
+
+@pytest.mark.parametrize("backend", get_available_json_backends())
+@pytest.mark.parametrize("pretty", [True, False])
+def test_it_round_trips_a_file(tmp_path: str, backend: str, pretty: bool) -> None:
+    """
+    Data written to a file can be read back, and the file matches the
+    output of `dumps`.
+    """
+    path = os.path.join(tmp_path, "books.json")
+
+    write_json(path, DATA, pretty=pretty, backend=backend)
+
+    assert read_json(path, backend=backend) == DATA
+    assert not os.path.exists(path + ".tmp")
+
+    with open(path, "rb") as in_file:
+        assert in_file.read() == dumps(DATA, pretty=pretty, backend=backend)
+
+    assert loads(dumps(DATA, backend=backend), backend=backend) == DATA
+
+
+@pytest.mark.parametrize("backend", get_available_json_backends())
+@pytest.mark.parametrize("pretty", [True, False])
+def test_it_writes_a_file_with_permissions(
+    tmp_path: str, backend: str, pretty: bool
+) -> None:
+    """
+    If you pass a mode, the file is created with those permissions,
+    even if there was a leftover temporary file with wider permissions.
+    """
+    path = os.path.join(tmp_path, "session.json")
+
+    with open(path + ".tmp", "w") as out_file:
+        out_file.write("leftover")
+    os.chmod(path + ".tmp", 0o644)
+
+    write_json(path, DATA, pretty=pretty, backend=backend, mode=0o600)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert read_json(path, backend=backend) == DATA
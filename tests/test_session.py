@@ -0,0 +1,86 @@
+"""
+Tests for `library_lookup.session`.
+"""
+
+import os
+import stat
+
+from library_lookup.session import SessionFile, is_session_expired
+
+
+BASE_URL = "https://herts.spydus.co.uk"
+
+
+def test_it_saves_and_loads_a_session(tmp_path: str) -> None:
+    """
+    A saved session can be loaded again.
+    """
+    session_file = SessionFile(os.path.join(tmp_path, "session.json"))
+
+    assert session_file.load(base_url=BASE_URL) is None
+
+    session_file.save(
+        base_url=BASE_URL,
+        cookies={"SESSION": "abc123"},
+        saved_lists_url=f"{BASE_URL}/cgi-bin/spydus.exe/PGM/WPAC/SETS",
+    )
+
+    session = session_file.load(base_url=BASE_URL)
+
+    assert session is not None
+    assert session["cookies"] == {"SESSION": "abc123"}
+    assert session["saved_lists_url"] == f"{BASE_URL}/cgi-bin/spydus.exe/PGM/WPAC/SETS"
+
+
+def test_only_the_current_user_can_read_a_session(tmp_path: str) -> None:
+    """
+    The session file has permissions 0600, even if there was a leftover
+    temporary file with wider permissions.
+    """
+    path = os.path.join(tmp_path, "session.json")
+
+    with open(path + ".tmp", "w") as out_file:
+        out_file.write("leftover")
+    os.chmod(path + ".tmp", 0o644)
+
+    SessionFile(path).save(base_url=BASE_URL, cookies={}, saved_lists_url=BASE_URL)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_it_ignores_a_session_for_another_website(tmp_path: str) -> None:
+    """
+    A session saved for one website isn't used for another.
+    """
+    session_file = SessionFile(os.path.join(tmp_path, "session.json"))
+    session_file.save(base_url=BASE_URL, cookies={}, saved_lists_url=BASE_URL)
+
+    assert session_file.load(base_url="http://127.0.0.1:8000") is None
+
+
+def test_it_ignores_a_corrupted_session(tmp_path: str) -> None:
+    """
+    If the session file isn't valid JSON, we ignore it and log in again.
+    """
+    path = os.path.join(tmp_path, "session.json")
+
+    with open(path, "w") as out_file:
+        out_file.write('{"base_url": ')
+
+    assert SessionFile(path).load(base_url=BASE_URL) is None
+
+
+def test_is_session_expired() -> None:
+    """
+    We can spot the pages Spydus serves when we need to log in again.
+    """
+    assert is_session_expired(
+        b"<html><body><p>Session must be logged in to display this page</p>"
+        b"</body></html>"
+    )
+    assert is_session_expired(
+        b'<html><body><form id="frmLogin" action="/login" method="post">'
+        b"</form></body></html>"
+    )
+    assert not is_session_expired(b"<html><body><p>Record details</p></body></html>")
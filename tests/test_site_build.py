@@ -0,0 +1,79 @@
+"""
+Tests for `library_lookup.site_build`.
+"""
+
+import os
+
+from library_lookup.site_build import IncrementalCopier
+
+
+def write_file(path: str, contents: str) -> None:
+    """
+    Write a text file.
+    """
+    with open(path, "w") as out_file:
+        out_file.write(contents)
+
+
+def read_file(path: str) -> str:
+    """
+    Read a text file.
+    """
+    with open(path) as in_file:
+        return in_file.read()
+
+
+class TestIncrementalCopier:
+    """
+    Tests for `IncrementalCopier`.
+    """
+
+    def test_it_skips_unchanged_files(self, tmp_path: str) -> None:
+        """
+        A file is copied once, and skipped on the next build.
+        """
+        src = os.path.join(tmp_path, "style.css")
+        dst = os.path.join(tmp_path, "_html_style.css")
+        write_file(src, "body { color: red; }")
+
+        copier = IncrementalCopier()
+        copier.copy(src, dst)
+        assert copier.linked == [dst]
+        assert read_file(dst) == "body { color: red; }"
+
+        copier = IncrementalCopier()
+        copier.copy(src, dst)
+        assert copier.unchanged == [dst]
+        assert copier.summary() == "0 copied, 0 linked, 1 unchanged, 0 removed"
+
+    def test_it_replaces_changed_files(self, tmp_path: str) -> None:
+        """
+        If the source is replaced, the new version is copied.
+        """
+        src = os.path.join(tmp_path, "style.css")
+        dst = os.path.join(tmp_path, "_html_style.css")
+        write_file(src, "body { color: red; }")
+
+        IncrementalCopier(use_hardlinks=False).copy(src, dst)
+
+        write_file(src + ".new", "body { color: blue; }")
+        os.replace(src + ".new", src)
+
+        copier = IncrementalCopier(use_hardlinks=False)
+        copier.copy(src, dst)
+        assert copier.copied == [dst]
+        assert read_file(dst) == "body { color: blue; }"
+        assert not os.path.exists(dst + ".tmp")
+
+    def test_it_prunes_files(self, tmp_path: str) -> None:
+        """
+        Files which aren't in the list to keep are deleted.
+        """
+        for name in ("1.jpg", "2.jpg"):
+            write_file(os.path.join(tmp_path, name), name)
+
+        copier = IncrementalCopier()
+        copier.prune(str(tmp_path), keep={"1.jpg"})
+
+        assert os.listdir(tmp_path) == ["1.jpg"]
+        assert copier.removed == [os.path.join(tmp_path, "2.jpg")]
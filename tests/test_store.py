@@ -0,0 +1,169 @@
+"""
+Tests for `library_lookup.store`.
+"""
+
+import os
+from typing import Any
+
+import pytest
+
+from library_lookup.book_data import BookData
+from library_lookup.store import BookStore
+
+
+def make_book(brn: str, **kwargs: Any) -> dict[str, Any]:
+    """
+    Create a book in the shape stored in `books.json`.
+    """
+    book = {
+        "title": f"Book {brn}",
+        "author": "Butler, Octavia E.",
+        "publication_year": "2022",
+        "record_details": {
+            "Main title": f"Book {brn} / Octavia E. Butler.",
+            "ISBN": [f"978{brn:0>10} (pbk)", "9780000000000 (ebk)"],
+            "Summary": ["The second book in the Xenogenesis trilogy — “quoted”."],
+            "BRN": brn,
+        },
+        "image": {
+            "url": f"https://www.bibdsl.co.uk/xmla/image-service.asp?ISBN=978{brn:0>10}",
+            "path": f"covers/978{brn:0>10}.jpg",
+        },
+        "availability": [
+            {
+                "location": "Ware Library",
+                "collection": "Fiction",
+                "status": "Available",
+                "call_number": "General fiction pbk",
+            },
+            {
+                "location": "Radlett Library",
+                "collection": "Fiction",
+                "status": "On loan",
+                "call_number": "General fiction pbk",
+            },
+        ],
+        "fetched_at": "2024-07-02T09:00:00",
+    }
+    book.update(kwargs)
+
+    return book
+
+
+@pytest.fixture
+def store(tmp_path: str) -> BookStore:
+    """
+    Return an empty store.
+    """
+    return BookStore(os.path.join(tmp_path, "books.sqlite"))
+
+
+def test_it_exports_the_same_data(store: BookStore) -> None:
+    """
+    Exporting a crawl gives back exactly the data that was saved.
+    """
+    older_book = make_book("2")
+    del older_book["fetched_at"]
+
+    book_data: BookData = {
+        "generated_at": "2024-07-02T09:00:00",
+        "books": [
+            make_book("1"),
+            older_book,
+            make_book("3", image=None, availability=[], author=None),
+        ],
+    }
+
+    store.add_crawl(book_data)
+
+    assert store.export() == book_data
+    assert store.export("2024-07-02T09:00:00") == book_data
+
+
+def test_it_keeps_every_crawl(store: BookStore) -> None:
+    """
+    Each crawl has its own availability, and we can see how it changes.
+    """
+    store.add_crawl({"generated_at": "2024-07-01T09:00:00", "books": [make_book("1")]})
+    store.add_crawl(
+        {
+            "generated_at": "2024-07-02T09:00:00",
+            "books": [make_book("1", availability=[]), make_book("2")],
+        }
+    )
+
+    assert store.get_crawls() == ["2024-07-01T09:00:00", "2024-07-02T09:00:00"]
+    assert store.export("2024-07-01T09:00:00")["books"] == [make_book("1")]
+    assert len(store.export()["books"]) == 2
+
+    assert store.get_availability_history("9780000000001") == [
+        {"generated_at": "2024-07-01T09:00:00", "available": 1, "total": 2},
+        {"generated_at": "2024-07-02T09:00:00", "available": 0, "total": 0},
+    ]
+
+
+def test_it_counts_a_book_on_the_list_twice_once(store: BookStore) -> None:
+    """
+    If a book is on the list twice in the same crawl, we only count
+    its copies once.
+    """
+    store.add_crawl(
+        {
+            "generated_at": "2024-07-01T09:00:00",
+            "books": [make_book("1"), make_book("2"), make_book("1")],
+        }
+    )
+
+    assert store.get_availability_history("9780000000001") == [
+        {"generated_at": "2024-07-01T09:00:00", "available": 1, "total": 2},
+    ]
+
+
+def test_it_replaces_a_crawl_with_the_same_timestamp(store: BookStore) -> None:
+    """
+    Saving the same crawl twice doesn't duplicate any data.
+    """
+    book_data: BookData = {
+        "generated_at": "2024-07-02T09:00:00",
+        "books": [make_book("1"), make_book("2")],
+    }
+
+    store.add_crawl(book_data)
+    store.add_crawl(book_data)
+
+    assert store.get_crawls() == ["2024-07-02T09:00:00"]
+    assert store.export() == book_data
+
+
+def test_it_finds_branches_with_a_book(store: BookStore) -> None:
+    """
+    We can find the branches which have a book, and count the books
+    available at each branch.
+    """
+    store.add_crawl(
+        {
+            "generated_at": "2024-07-02T09:00:00",
+            "books": [make_book("1"), make_book("2")],
+        }
+    )
+
+    assert store.get_branches_with_isbn("9780000000001") == ["Ware Library"]
+    assert store.get_branches_with_isbn("9780000000001", status=None) == [
+        "Radlett Library",
+        "Ware Library",
+    ]
+    assert store.get_branches_with_isbn("9789999999999") == []
+
+    assert store.count_books_at_branches() == {"Ware Library": 2}
+
+
+def test_exporting_a_missing_crawl_is_an_error(store: BookStore) -> None:
+    """
+    Exporting from an empty store, or a crawl that doesn't exist, is
+    a KeyError.
+    """
+    with pytest.raises(KeyError):
+        store.export()
+
+    with pytest.raises(KeyError):
+        store.export("2024-07-02T09:00:00")
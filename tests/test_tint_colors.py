@@ -0,0 +1,251 @@
+"""
+Tests for `library_lookup.tint_colors`.
+"""
+
+import json
+import os
+
+import numpy as np
+from PIL import Image
+import pytest
+
+from library_lookup import tint_colors
+from library_lookup.tint_colors import (
+    TintColorCache,
+    choose_best_colour_for_bg,
+    choose_tint_color_for_file,
+    from_hex,
+    get_contrast_ratio,
+    get_dominant_colours,
+    get_file_hash,
+    lab_to_srgb,
+    srgb_to_lab,
+)
+
+
+def write_file(path: str, contents: bytes) -> str:
+    """
+    Write a file, and return its path.
+    """
+    with open(path, "wb") as out_file:
+        out_file.write(contents)
+
+    return path
+
+
+@pytest.fixture
+def chosen_paths(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """
+    Replace the colour chooser with a fake that picks a colour
+    based on the file contents, and record which files it's run on.
+    """
+    paths: list[str] = []
+
+    def fake_choose_tint_color_for_file(path: str) -> str:
+        paths.append(path)
+        with open(path, "rb") as in_file:
+            return "#" + in_file.read().hex()[:6]
+
+    monkeypatch.setattr(
+        tint_colors, "choose_tint_color_for_file", fake_choose_tint_color_for_file
+    )
+
+    return paths
+
+
+def test_from_hex() -> None:
+    """
+    Tests for `from_hex`.
+    """
+    assert from_hex("#ff0102") == (255, 1, 2)
+
+
+def test_lab_round_trip() -> None:
+    """
+    Converting sRGB colours to CIELAB and back gives the same colours.
+    """
+    rgb = np.array([[0, 0, 0], [255, 255, 255], [255, 0, 0], [18, 52, 86]])
+
+    assert (lab_to_srgb(srgb_to_lab(rgb)) == rgb).all()
+    assert srgb_to_lab(np.array([255, 255, 255])) == pytest.approx(
+        [100, 0, 0], abs=0.01
+    )
+
+
+@pytest.mark.parametrize(
+    ["hs1", "hs2", "ratio"],
+    [
+        ("#000000", "#ffffff", 21),
+        ("#ffffff", "#ffffff", 1),
+        ("#777777", "#ffffff", 4.48),
+    ],
+)
+def test_get_contrast_ratio(hs1: str, hs2: str, ratio: float) -> None:
+    """
+    Tests for `get_contrast_ratio`.
+    """
+    assert get_contrast_ratio(hs1, hs2) == pytest.approx(ratio, abs=0.01)
+
+
+def test_choose_best_colour_for_bg() -> None:
+    """
+    We pick the most saturated colour with enough contrast, or black
+    if none of the colours will show up on white.
+    """
+    assert (
+        choose_best_colour_for_bg(
+            ["#ffff00", "#333333", "#b00020", "#203060"], background="#ffffff"
+        )
+        == "#b00020"
+    )
+
+    assert choose_best_colour_for_bg(["#ffff00"], background="#ffffff") == "#000000"
+
+
+def test_get_dominant_colours(tmp_path: str) -> None:
+    """
+    The dominant colours of an image are found in-process.
+
+    Resizing the image blends the pixels along the edge between the two
+    colours, so we may get a few extra colours -- but we should always
+    find something close to the colours in the image.
+    """
+    path = os.path.join(tmp_path, "cover.png")
+
+    im = Image.new("RGB", (300, 400), color="#f4e9d8")
+    im.paste("#1e52b8", (0, 0, 300, 100))
+    im.save(path)
+
+    def distance(hs1: str, hs2: str) -> float:
+        return float(np.linalg.norm(np.subtract(from_hex(hs1), from_hex(hs2))))
+
+    colours = get_dominant_colours(path)
+    assert len(colours) <= 12
+
+    for expected in ("#1e52b8", "#f4e9d8"):
+        assert min(distance(c, expected) for c in colours) < 8
+
+    assert distance(choose_tint_color_for_file(path), "#1e52b8") < 8
+
+
+def test_it_only_chooses_each_colour_once(
+    tmp_path: str, chosen_paths: list[str]
+) -> None:
+    """
+    Colours are chosen once per image, then read from the cache file.
+    """
+    cache_path = os.path.join(tmp_path, "colors.json")
+    red = write_file(os.path.join(tmp_path, "red.jpg"), b"\xff\x00\x00")
+    green = write_file(os.path.join(tmp_path, "green.jpg"), b"\x00\xff\x00")
+    also_red = write_file(os.path.join(tmp_path, "also_red.jpg"), b"\xff\x00\x00")
+
+    cache = TintColorCache(cache_path)
+    colors = cache.get_tint_colors([red, green, also_red], max_workers=1)
+    cache.save()
+
+    assert colors == {red: "#ff0000", green: "#00ff00", also_red: "#ff0000"}
+    assert chosen_paths == [red, green]
+
+    colors = TintColorCache(cache_path).get_tint_colors([red, green], max_workers=1)
+
+    assert colors == {red: "#ff0000", green: "#00ff00"}
+    assert chosen_paths == [red, green]
+
+    with open(cache_path) as in_file:
+        assert json.load(in_file) == {
+            get_file_hash(red): "#ff0000",
+            get_file_hash(green): "#00ff00",
+        }
+
+
+def test_a_changed_image_gets_a_new_colour(
+    tmp_path: str, chosen_paths: list[str]
+) -> None:
+    """
+    If a cover is replaced with a different image, we don't reuse
+    the colour of the old image.
+    """
+    cache_path = os.path.join(tmp_path, "colors.json")
+    cover = write_file(os.path.join(tmp_path, "cover.jpg"), b"\xff\x00\x00")
+
+    cache = TintColorCache(cache_path)
+    assert cache.get_tint_colors([cover], max_workers=1) == {cover: "#ff0000"}
+
+    write_file(cover, b"\x00\x00\xff")
+    assert cache.get_tint_colors([cover], max_workers=1) == {cover: "#0000ff"}
+
+
+def test_it_reads_colours_keyed_by_path(tmp_path: str, chosen_paths: list[str]) -> None:
+    """
+    A cache file from before colours were keyed by hash is converted.
+    Colours for covers which aren't on disk yet are kept, and converted
+    when the cover is downloaded.
+    """
+    cache_path = os.path.join(tmp_path, "colors.json")
+    cover = write_file(os.path.join(tmp_path, "cover.jpg"), b"\xff\x00\x00")
+    missing_cover = os.path.join(tmp_path, "missing.jpg")
+
+    with open(cache_path, "w") as out_file:
+        out_file.write(json.dumps({cover: "#123456", missing_cover: "#abcdef"}))
+
+    cache = TintColorCache(cache_path)
+    assert cache.get_tint_colors([cover], max_workers=1) == {cover: "#123456"}
+    assert chosen_paths == []
+
+    cache.save()
+
+    with open(cache_path) as in_file:
+        assert json.load(in_file) == {
+            get_file_hash(cover): "#123456",
+            missing_cover: "#abcdef",
+        }
+
+    # Now the missing cover has been downloaded
+    write_file(missing_cover, b"\x00\x00\xff")
+
+    cache = TintColorCache(cache_path)
+    assert cache.get_tint_colors([missing_cover], max_workers=1) == {
+        missing_cover: "#abcdef"
+    }
+    assert chosen_paths == []
+
+    cache.save()
+
+    with open(cache_path) as in_file:
+        assert json.load(in_file) == {
+            get_file_hash(cover): "#123456",
+            get_file_hash(missing_cover): "#abcdef",
+        }
+
+
+def test_it_doesnt_rewrite_colours_keyed_by_path_without_covers(
+    tmp_path: str,
+) -> None:
+    """
+    If none of the covers in an old cache file are on disk, e.g. in
+    a fresh checkout, the file is left alone.
+    """
+    cache_path = os.path.join(tmp_path, "colors.json")
+
+    with open(cache_path, "w") as out_file:
+        out_file.write(json.dumps({"covers/missing.jpg": "#abcdef"}))
+
+    cache = TintColorCache(cache_path)
+    assert cache.get_tint_colors([]) == {}
+    cache.save()
+
+    with open(cache_path) as in_file:
+        assert json.load(in_file) == {"covers/missing.jpg": "#abcdef"}
+
+
+def test_it_doesnt_write_an_unchanged_cache(tmp_path: str) -> None:
+    """
+    If we didn't choose any new colours, the cache file isn't written.
+    """
+    cache_path = os.path.join(tmp_path, "colors.json")
+
+    cache = TintColorCache(cache_path)
+    assert cache.get_tint_colors([]) == {}
+    cache.save()
+
+    assert not os.path.exists(cache_path)
@@ -0,0 +1,108 @@
+"""
+Tests for `library_lookup.transform`.
+"""
+
+from typing import Any
+
+import pytest
+
+from library_lookup.cover_metadata import CoverMetadata
+from library_lookup.transform import get_format, transform_books
+
+
+def make_copy(location: str, status: str = "Available") -> dict[str, Any]:
+    """
+    Create a copy of a book, in the shape stored in `books.json`.
+    """
+    return {
+        "location": location,
+        "status": status,
+        "collection": "Fiction",
+        "call_number": "General fiction pbk",
+        "status_since": None,
+    }
+
+
+@pytest.mark.parametrize(
+    ["isbn", "book_format"],
+    [
+        ("9781472281074 (pbk)", "paperback"),
+        ("9780804692298 (hbk)", "hardback"),
+        ("9780804692298", None),
+    ],
+)
+def test_get_format(isbn: str, book_format: str | None) -> None:
+    """
+    Tests for `get_format`.
+    """
+    assert get_format({"ISBN": isbn}) == book_format
+
+
+def test_get_format_with_no_isbn() -> None:
+    """
+    A book with no ISBN has no format.
+    """
+    assert get_format({}) is None
+
+
+def test_transform_books() -> None:
+    """
+    Copies outside the network are removed, the network suffix is
+    stripped, and we collect the branches with an available copy.
+    """
+    book = {
+        "title": "Kindred",
+        "record_details": {"ISBN": "9781472281074 (pbk)"},
+        "image": {"url": "https://example.com/cover.jpg", "path": "covers/1.jpg"},
+        "availability": [
+            make_copy("Ware Library (Hertfordshire Libraries)"),
+            make_copy("Radlett Library (Hertfordshire Libraries)", status="On loan"),
+            make_copy("Luton Central Library"),
+        ],
+    }
+
+    metadata: CoverMetadata = {
+        "mtime_ns": 0,
+        "size": 100,
+        "width": 300,
+        "height": 460,
+        "format": "JPEG",
+        "tint_color": "#1e52b8",
+    }
+
+    result = transform_books([book], cover_metadata={"covers/1.jpg": metadata})
+
+    assert result["branches"] == {"Ware Library"}
+    assert result["books"] == [
+        {
+            **book,
+            "availability": [
+                make_copy("Ware Library"),
+                make_copy("Radlett Library", status="On loan"),
+            ],
+            "format": "paperback",
+            "tint_color": "#1e52b8",
+            "image_width": 300,
+            "image_height": 460,
+        }
+    ]
+
+    # The original book isn't modified
+    assert len(book["availability"]) == 3
+
+
+def test_transform_books_without_a_cover() -> None:
+    """
+    A book without a saved cover doesn't get a size or tint colour.
+    """
+    book = {
+        "title": "Kindred",
+        "record_details": {},
+        "image": {"url": "https://example.com/blank.gif", "path": None},
+        "availability": [],
+    }
+
+    result = transform_books([book])
+
+    assert result["books"] == [{**book, "format": None}]
+    assert result["branches"] == set()